@@ -1,79 +1,37 @@
 # --------------------- BLOCO 1: Setup e Autenticação ---------------------
 import streamlit as st
 import sqlite3
-import bcrypt
-import pandas as pd
-import io
-from fpdf import FPDF
-from datetime import datetime
+
+from centesimais import analises, autenticacao, calculos, replicatas
+from centesimais.composicao import carregar_composicao, contar_amostras
+from centesimais.conexao import obter_banco
 
 # --------------------- BANCO DE DADOS ---------------------
-conn = sqlite3.connect("banco.db", check_same_thread=False)
-cursor = conn.cursor()
-
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS usuarios (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    nome TEXT,
-    email TEXT UNIQUE,
-    senha_hash TEXT,
-    tipo TEXT
-)
-''')
-
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS analises (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    usuario_id INTEGER,
-    nome_amostra TEXT,
-    parametro TEXT,
-    valor1 REAL,
-    valor2 REAL,
-    valor3 REAL,
-    media REAL,
-    desvio_padrao REAL,
-    coef_var REAL,
-    data TEXT,
-    FOREIGN KEY(usuario_id) REFERENCES usuarios(id)
-)
-''')
-
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS anotacoes (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    usuario_id INTEGER,
-    titulo TEXT,
-    conteudo TEXT,
-    data TEXT,
-    FOREIGN KEY(usuario_id) REFERENCES usuarios(id)
-)
-''')
-
-conn.commit()
+banco = obter_banco("banco.db")
 
 # --------------------- FUNÇÕES DE LOGIN ---------------------
 
 def hash_senha(senha):
-    return bcrypt.hashpw(senha.encode("utf-8"), bcrypt.gensalt())
+    return autenticacao.obter_pool().gerar_hash(senha)
 
 def verificar_senha(senha, senha_hash):
-    return bcrypt.checkpw(senha.encode("utf-8"), senha_hash)
+    return autenticacao.obter_pool().verificar(senha, senha_hash)
 
 def cadastrar_usuario(nome, email, senha, tipo="padrao"):
     try:
         senha_hash = hash_senha(senha)
-        cursor.execute("INSERT INTO usuarios (nome, email, senha_hash, tipo) VALUES (?, ?, ?, ?)",
-                       (nome, email, senha_hash, tipo))
-        conn.commit()
+        banco.gravar("INSERT INTO usuarios (nome, email, senha_hash, tipo) VALUES (?, ?, ?, ?)",
+                     (nome, email, senha_hash, tipo))
         return True
     except sqlite3.IntegrityError:
         return False
 
 def autenticar(email, senha):
-    cursor.execute("SELECT id, nome, senha_hash, tipo FROM usuarios WHERE email = ?", (email,))
-    dados = cursor.fetchone()
-    if dados and verificar_senha(senha, dados[2]):
-        return {'id': dados[0], 'nome': dados[1], 'tipo': dados[3]}
+    dados = autenticacao.autenticar(banco, email, senha)
+    if dados:
+        # Token assinado na URL: recarregar a página não exige nova verificação bcrypt
+        st.query_params["sessao"] = autenticacao.emitir_token(banco, dados)
+        return {'id': dados['id'], 'nome': dados['nome'], 'tipo': dados['tipo']}
     return None
 
 # --------------------- TELAS DE LOGIN E CADASTRO ---------------------
@@ -83,7 +41,11 @@ def tela_login():
     email = st.text_input("Email")
     senha = st.text_input("Senha", type="password")
     if st.button("Entrar"):
-        user = autenticar(email, senha)
+        try:
+            user = autenticar(email, senha)
+        except autenticacao.ServidorOcupado as erro:
+            st.warning(str(erro))
+            return
         if user:
             st.session_state['user'] = user
             st.rerun()
@@ -96,7 +58,12 @@ def tela_cadastro():
     email = st.text_input("Email")
     senha = st.text_input("Senha", type="password")
     if st.button("Cadastrar"):
-        if cadastrar_usuario(nome, email, senha):
+        try:
+            cadastrado = cadastrar_usuario(nome, email, senha)
+        except autenticacao.ServidorOcupado as erro:
+            st.warning(str(erro))
+            return
+        if cadastrado:
             st.success("Cadastro realizado. Faça login.")
         else:
             st.error("Email já cadastrado.")
@@ -131,13 +98,22 @@ def menu_principal():
 
     st.sidebar.markdown(f"👤 **Usuário:** {user['nome']}")
     if st.sidebar.button("🚪 Logout"):
+        autenticacao.encerrar_sessoes(banco, user['id'])
         del st.session_state['user']
+        st.query_params.clear()
         if 'pagina' in st.session_state:
             del st.session_state['pagina']
         st.rerun()
 
 # --------------------- EXECUÇÃO PRINCIPAL ---------------------
 
+if 'user' not in st.session_state and "sessao" in st.query_params:
+    dados = autenticacao.validar_token(banco, st.query_params["sessao"])
+    if dados:
+        st.session_state['user'] = {'id': dados['id'], 'nome': dados['nome'], 'tipo': dados['tipo']}
+    else:
+        del st.query_params["sessao"]
+
 if 'user' not in st.session_state:
     menu = st.sidebar.radio("Acesso", ["Login", "Cadastro"])
     if menu == "Login":
@@ -147,17 +123,24 @@ if 'user' not in st.session_state:
 else:
     menu_principal()
 
-# --------------------- BLOCO 3: Módulo de Análises - Umidade (Triplicata) ---------------------
+# --------------------- BLOCO 3: Módulo de Análises - Umidade (Replicatas) ---------------------
+
+def numero_replicatas(chave):
+    """Quantas repetições o formulário coleta: de duplicata até REPLICATAS_MAXIMAS."""
+    return int(st.number_input("Número de repetições", min_value=replicatas.REPLICATAS_MINIMAS,
+                               max_value=replicatas.REPLICATAS_MAXIMAS, value=replicatas.REPLICATAS_PADRAO,
+                               step=1, key=f"{chave}_n_replicatas"))
 
 def nova_analise_umidade(usuario):
-    st.header("🔬 Coleta de Dados — Umidade (triplicata)")
-    st.markdown("Método AOAC 925.10 — Secagem em estufa a 105 °C até peso constante.")
+    st.header("🔬 Coleta de Dados — Umidade (replicatas)")
+    st.markdown("Método AOAC 925.10 — Secagem em estufa a 105 °C até peso constante.")
 
     nome_amostra = st.text_input("Nome da Amostra")
     coleta_completa = True
-    dados = []
+    leituras = {campo: [] for campo in calculos.CAMPOS["Umidade"]}
 
-    for i in range(1, 4):
+    n_replicatas = numero_replicatas("umidade")
+    for i in range(1, n_replicatas + 1):
         st.subheader(f"🧪 Repetição {i}")
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -168,231 +151,162 @@ def nova_analise_umidade(usuario):
             apos_secagem = st.number_input(f"Peso após secagem (g) - R{i}", key=f"seca{i}", step=0.001)
 
         if cadinho and com_amostra and apos_secagem:
-            peso_umida = com_amostra - cadinho
-            peso_seca = apos_secagem - cadinho
-            umidade = round((peso_umida - peso_seca) / peso_umida * 100, 2) if peso_umida else 0
-            dados.append(umidade)
-
+            leituras["peso_cadinho"].append(cadinho)
+            leituras["peso_cadinho_amostra"].append(com_amostra)
+            leituras["peso_cadinho_seco"].append(apos_secagem)
         else:
             coleta_completa = False
 
-    if coleta_completa and nome_amostra and len(dados) == 3:
-        media = round(sum(dados) / 3, 2)
-        desvio = round(pd.Series(dados).std(ddof=1), 2)
-        cv = round((desvio / media) * 100 if media else 0, 2)
-        data = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        # 🔒 Salvamento automático
-        cursor.execute("""
-            INSERT INTO analises (
-                usuario_id, nome_amostra, parametro, valor1, valor2, valor3,
-                media, desvio_padrao, coef_var, data
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            usuario['id'], nome_amostra, "Umidade",
-            dados[0], dados[1], dados[2],
-            media, desvio, cv, data
-        ))
-        conn.commit()
-
-        st.success("✔️ Coleta concluída e salva com sucesso!")
+    if coleta_completa and nome_amostra:
+        resultado = calculos.calcular("Umidade", leituras, preencher=0)
+        salvar_analise(usuario, nome_amostra, "Umidade", resultado)
         st.subheader("📈 Resultados")
-        st.write(f"Valores individuais: {dados}")
-        st.write(f"Média: **{media}%**, DP: **{desvio}**, CV: **{cv}%**")
+        st.write(f"Valores individuais: {resultado.replicatas[0].tolist()}")
     else:
         st.info("Preencha todos os campos de todas as repetições para concluir.")
         # --------------------- CINZAS (AOAC 923.03) ---------------------
 def nova_analise_cinzas(usuario):
-    st.header("🔬 Coleta de Dados — Cinzas (triplicata)")
-    st.markdown("Método AOAC 923.03 — Incineração em mufla a 550 °C.")
+    st.header("🔬 Coleta de Dados — Cinzas (replicatas)")
+    st.markdown("Método AOAC 923.03 — Incineração em mufla a 550 °C.")
 
     nome_amostra = st.text_input("Nome da Amostra", key="cinzas_nome")
     coleta_completa = True
-    resultados = []
+    leituras = {campo: [] for campo in calculos.CAMPOS["Cinzas"]}
 
-    for i in range(1, 4):
+    n_replicatas = numero_replicatas("cinzas")
+    for i in range(1, n_replicatas + 1):
         st.subheader(f"🧪 Repetição {i}")
         cadinho = st.number_input(f"Peso do cadinho vazio (g) - R{i}", key=f"cinz_cad{i}", step=0.001)
         com_amostra = st.number_input(f"Peso com amostra úmida (g) - R{i}", key=f"cinz_amost{i}", step=0.001)
         com_cinzas = st.number_input(f"Peso após incineração (g) - R{i}", key=f"cinz_final{i}", step=0.001)
 
         if cadinho and com_amostra and com_cinzas:
-            peso_amostra = com_amostra - cadinho
-            peso_cinzas = com_cinzas - cadinho
-            teor = round((peso_cinzas / peso_amostra) * 100, 2) if peso_amostra else 0
-            resultados.append(teor)
+            leituras["peso_cadinho"].append(cadinho)
+            leituras["peso_cadinho_amostra"].append(com_amostra)
+            leituras["peso_cadinho_cinzas"].append(com_cinzas)
         else:
             coleta_completa = False
 
-    if coleta_completa and nome_amostra and len(resultados) == 3:
-        salvar_analise(usuario, nome_amostra, "Cinzas", resultados)
+    if coleta_completa and nome_amostra:
+        salvar_analise(usuario, nome_amostra, "Cinzas", calculos.calcular("Cinzas", leituras, preencher=0))
 
 # --------------------- PROTEÍNAS (AOAC 920.87) ---------------------
 def nova_analise_proteinas(usuario):
-    st.header("🔬 Coleta de Dados — Proteínas (triplicata)")
+    st.header("🔬 Coleta de Dados — Proteínas (replicatas)")
     st.markdown("Método AOAC 920.87 — Determinação de nitrogênio (Kjeldahl), fator 6.25")
 
     nome_amostra = st.text_input("Nome da Amostra", key="prot_nome")
-    resultados = []
+    teores_n = []
     coleta_completa = True
 
-    for i in range(1, 4):
+    n_replicatas = numero_replicatas("proteinas")
+    for i in range(1, n_replicatas + 1):
         teor_n = st.number_input(f"Teor de nitrogênio (%) - R{i}", key=f"prot_n{i}", step=0.01)
         if teor_n:
-            prot = round(teor_n * 6.25, 2)
-            resultados.append(prot)
+            teores_n.append(teor_n)
         else:
             coleta_completa = False
 
-    if coleta_completa and nome_amostra and len(resultados) == 3:
-        salvar_analise(usuario, nome_amostra, "Proteínas", resultados)
+    if coleta_completa and nome_amostra:
+        resultado = calculos.estatisticas(calculos.proteinas_por_nitrogenio(teores_n))
+        salvar_analise(usuario, nome_amostra, "Proteínas", resultado)
 
 # --------------------- LIPÍDIOS (AOAC 920.39) ---------------------
 def nova_analise_lipidios(usuario):
-    st.header("🔬 Coleta de Dados — Lipídios (triplicata)")
+    st.header("🔬 Coleta de Dados — Lipídios (replicatas)")
     st.markdown("Método AOAC 920.39 — Extração com solvente e evaporação da fração etérea.")
 
     nome_amostra = st.text_input("Nome da Amostra", key="lip_nome")
     coleta_completa = True
-    resultados = []
+    leituras = {campo: [] for campo in calculos.CAMPOS["Lipídios"]}
 
-    for i in range(1, 4):
+    n_replicatas = numero_replicatas("lipidios")
+    for i in range(1, n_replicatas + 1):
         amostra = st.number_input(f"Peso da amostra (g) - R{i}", key=f"lip_amo{i}", step=0.001)
         frasco = st.number_input(f"Peso do frasco vazio (g) - R{i}", key=f"lip_fras{i}", step=0.001)
         com_res = st.number_input(f"Frasco + extrato (g) - R{i}", key=f"lip_final{i}", step=0.001)
 
         if amostra and frasco and com_res:
-            extrato = com_res - frasco
-            lip = round((extrato / amostra) * 100, 2)
-            resultados.append(lip)
+            leituras["peso_amostra"].append(amostra)
+            leituras["peso_frasco_vazio"].append(frasco)
+            leituras["peso_frasco_lipidios"].append(com_res)
         else:
             coleta_completa = False
 
-    if coleta_completa and nome_amostra and len(resultados) == 3:
-        salvar_analise(usuario, nome_amostra, "Lipídios", resultados)
+    if coleta_completa and nome_amostra:
+        salvar_analise(usuario, nome_amostra, "Lipídios", calculos.calcular("Lipídios", leituras, preencher=0))
 
 # --------------------- FIBRAS (AOAC 985.29) ---------------------
 def nova_analise_fibras(usuario):
-    st.header("🔬 Coleta de Dados — Fibras (triplicata)")
+    st.header("🔬 Coleta de Dados — Fibras (replicatas)")
     st.markdown("Método AOAC 985.29 — Digestão enzimática + resíduo seco.")
 
     nome_amostra = st.text_input("Nome da Amostra", key="fib_nome")
     coleta_completa = True
-    resultados = []
+    leituras = {campo: [] for campo in calculos.CAMPOS["Fibras Totais"]}
 
-    for i in range(1, 4):
+    n_replicatas = numero_replicatas("fibras")
+    for i in range(1, n_replicatas + 1):
         peso_amostra = st.number_input(f"Peso da amostra (g) - R{i}", key=f"fib_am{i}", step=0.001)
         cadinho = st.number_input(f"Peso do cadinho vazio (g) - R{i}", key=f"fib_cad{i}", step=0.001)
         peso_final = st.number_input(f"Peso final com resíduo (g) - R{i}", key=f"fib_final{i}", step=0.001)
 
         if peso_amostra and cadinho and peso_final:
-            res = peso_final - cadinho
-            fibra = round((res / peso_amostra) * 100, 2)
-            resultados.append(fibra)
+            leituras["peso_residuo"].append(peso_final - cadinho)
+            leituras["correcao_proteina"].append(0.0)
+            leituras["correcao_cinzas"].append(0.0)
+            leituras["peso_amostra"].append(peso_amostra)
         else:
             coleta_completa = False
 
-    if coleta_completa and nome_amostra and len(resultados) == 3:
-        salvar_analise(usuario, nome_amostra, "Fibras", resultados)
+    if coleta_completa and nome_amostra:
+        salvar_analise(usuario, nome_amostra, "Fibras", calculos.calcular("Fibras Totais", leituras, preencher=0))
 
 # --------------------- SALVAMENTO PADRÃO PARA TODAS AS ANÁLISES ---------------------
-def salvar_analise(usuario, nome_amostra, parametro, valores):
-    media = round(sum(valores) / 3, 2)
-    desvio = round(pd.Series(valores).std(ddof=1), 2)
-    cv = round((desvio / media) * 100 if media else 0, 2)
-    data = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    cursor.execute("""
-        INSERT INTO analises (
-            usuario_id, nome_amostra, parametro,
-            valor1, valor2, valor3,
-            media, desvio_padrao, coef_var, data
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        usuario['id'], nome_amostra, parametro,
-        valores[0], valores[1], valores[2],
-        media, desvio, cv, data
-    ))
-    conn.commit()
-    st.success(f"✔️ {parametro} salva com sucesso! Média: {media}% | CV: {cv}%")
+def salvar_analise(usuario, nome_amostra, parametro, resultado):
+    linha = analises.registrar_resultado(banco, usuario['id'], nome_amostra, parametro, resultado)
+    st.success(f"✔️ {parametro} salva com sucesso! Média: {linha['media']}% | CV: {linha['coef_var']}%")
     # --------------------- BLOCO 5: Painel por Amostra + Cálculo Carboidratos/VET ---------------------
 
-def calcular_carboidratos(amostra, usuario_id):
-    # Recupera os parâmetros de uma amostra
-    cursor.execute("""
-        SELECT parametro, media FROM analises
-        WHERE usuario_id = ? AND nome_amostra = ?
-    """, (usuario_id, amostra))
-    linhas = cursor.fetchall()
-    dados = {param: valor for param, valor in linhas}
-
-    obrigatorios = ["Umidade", "Cinzas", "Proteínas", "Lipídios", "Fibras"]
-
-    if all(p in dados for p in obrigatorios):
-        soma = sum(dados[p] for p in obrigatorios)
-        carbo = round(100 - soma, 2)
-
-        # Evita duplicidade
-        cursor.execute("""
-            SELECT 1 FROM analises
-            WHERE usuario_id = ? AND nome_amostra = ? AND parametro = 'Carboidratos'
-        """, (usuario_id, amostra))
-        if cursor.fetchone() is None:
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            cursor.execute("""
-                INSERT INTO analises (
-                    usuario_id, nome_amostra, parametro,
-                    valor1, valor2, valor3,
-                    media, desvio_padrao, coef_var, data
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                usuario_id, amostra, "Carboidratos",
-                carbo, carbo, carbo, carbo, 0.00, 0.00, now
-            ))
-            conn.commit()
-        return carbo
-    return None
+ROTULOS_COMPOSICAO = {
+    "nome_amostra": "Amostra",
+    "umidade": "Umidade (%)",
+    "cinzas": "Cinzas (%)",
+    "proteinas": "Proteínas (%)",
+    "lipidios": "Lipídios (%)",
+    "fibras": "Fibras (%)",
+    "carboidratos": "Carboidratos (%)",
+    "vet": "VET (kcal/100g)",
+}
 
 def painel_amostras(usuario):
     st.header("📋 Painel de Análises por Amostra")
 
-    cursor.execute("""
-        SELECT DISTINCT nome_amostra FROM analises
-        WHERE usuario_id = ?
-        ORDER BY nome_amostra
-    """, (usuario['id'],))
-    amostras = [linha[0] for linha in cursor.fetchall()]
-
-    if not amostras:
+    with banco.leitura() as conn:
+        total = contar_amostras(conn, usuario['id'])
+    if not total:
         st.info("Nenhuma amostra registrada.")
         return
 
-    for amostra in amostras:
-        st.subheader(f"🧪 {amostra}")
-        calcular_carboidratos(amostra, usuario['id'])  # tenta calcular carboidratos
-
-        cursor.execute("""
-            SELECT parametro, media FROM analises
-            WHERE usuario_id = ? AND nome_amostra = ?
-        """, (usuario['id'], amostra))
-        registros = cursor.fetchall()
-        dados = {param: round(media, 2) for param, media in registros}
-
-        df = pd.DataFrame(dados.items(), columns=["Parâmetro", "Média (%)"])
-        st.dataframe(df, use_container_width=True)
+    col1, col2 = st.columns(2)
+    with col1:
+        por_pagina = st.selectbox("Amostras por página", [25, 50, 100, 250], key="painel_por_pagina")
+    paginas = -(-total // por_pagina)
+    with col2:
+        pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, step=1, key="painel_pagina")
 
-        if all(p in dados for p in ["Proteínas", "Lipídios", "Carboidratos"]):
-            vet = round(dados["Proteínas"] * 4 + dados["Carboidratos"] * 4 + dados["Lipídios"] * 9, 2)
-            st.success(f"🔥 VET: **{vet} kcal/100g**")
-        else:
-            st.warning("VET não pode ser calculado (faltam parâmetros).")
+    # Uma única consulta agrupada traz a página inteira; carboidratos e VET são calculados em bloco
+    with banco.leitura() as conn:
+        df = carregar_composicao(conn, usuario['id'], limite=por_pagina, deslocamento=(pagina - 1) * por_pagina)
+    st.caption(f"{total} amostras — exibindo {len(df)} nesta página. VET vazio indica parâmetros faltantes.")
+    st.dataframe(df.rename(columns=ROTULOS_COMPOSICAO), use_container_width=True, hide_index=True)
 # --------------------- BLOCO 6: Exportação Geral e por Parâmetro ---------------------
 
 def exportar_geral(usuario):
     st.subheader("📤 Exportar Todas as Análises")
-    df = pd.read_sql_query(
+    df = banco.consultar(
         "SELECT * FROM analises WHERE usuario_id = ? ORDER BY data DESC",
-        conn, params=(usuario['id'],)
+        (usuario['id'],), usuario['id']
     )
 
     if df.empty:
@@ -404,38 +318,17 @@ def exportar_geral(usuario):
     col1, col2 = st.columns(2)
 
     with col1:
-        buffer_xlsx = io.BytesIO()
-        df.to_excel(buffer_xlsx, index=False, sheet_name='Analises')
-        st.download_button(
-            label="📥 Baixar Excel",
-            data=buffer_xlsx.getvalue(),
-            file_name="analises_completas.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        botao_relatorio("geral", "excel", "analises_completas.xlsx", usuario['id'])
 
     with col2:
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=10)
-        for _, row in df.iterrows():
-            pdf.cell(190, 10, txt=f"{row['nome_amostra']} - {row['parametro']} ({row['data']})", ln=True)
-            pdf.cell(190, 10, txt=f"R1: {row['valor1']}  R2: {row['valor2']}  R3: {row['valor3']} | Média: {row['media']}% | CV: {row['coef_var']}%", ln=True)
-            pdf.ln(4)
-        buffer_pdf = io.BytesIO()
-        pdf.output(buffer_pdf)
-        st.download_button(
-            label="📄 Baixar PDF",
-            data=buffer_pdf.getvalue(),
-            file_name="relatorio_analises.pdf",
-            mime="application/pdf"
-        )
+        botao_relatorio("geral", "pdf", "relatorio_analises.pdf", usuario['id'])
 
 def exportar_por_parametro(usuario):
     st.subheader("📤 Exportar por Tipo de Análise")
 
-    df = pd.read_sql_query(
+    df = banco.consultar(
         "SELECT * FROM analises WHERE usuario_id = ? ORDER BY nome_amostra, parametro, data DESC",
-        conn, params=(usuario['id'],)
+        (usuario['id'],), usuario['id']
     )
 
     if df.empty:
@@ -453,31 +346,32 @@ def exportar_por_parametro(usuario):
     col1, col2 = st.columns(2)
 
     with col1:
-        buffer_xlsx = io.BytesIO()
-        df_filtrado.to_excel(buffer_xlsx, index=False, sheet_name=parametro)
-        st.download_button(
-            label="📥 Baixar Excel",
-            data=buffer_xlsx.getvalue(),
-            file_name=f"{parametro}_analises.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        botao_relatorio(parametro, "excel", f"{parametro}_analises.xlsx", usuario['id'], parametro)
 
     with col2:
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=10)
-        for _, row in df_filtrado.iterrows():
-            pdf.cell(190, 10, txt=f"{row['nome_amostra']} ({row['data']}) - {parametro}", ln=True)
-            pdf.cell(190, 10, txt=f"Valores: {row['valor1']}, {row['valor2']}, {row['valor3']} | Média: {row['media']} | CV: {row['coef_var']}%", ln=True)
-            pdf.ln(4)
-        buffer_pdf = io.BytesIO()
-        pdf.output(buffer_pdf)
-        st.download_button(
-            label="📄 Baixar PDF",
-            data=buffer_pdf.getvalue(),
-            file_name=f"{parametro}_analises.pdf",
-            mime="application/pdf"
-        )
+        botao_relatorio(parametro, "pdf", f"{parametro}_analises.pdf", usuario['id'], parametro)
+
+def botao_relatorio(chave, formato, nome_arquivo, usuario_id, parametro=None):
+    # Relatório gerado em fluxo num arquivo temporário, só quando solicitado
+    rotulo = "PDF" if formato == "pdf" else "Excel"
+    if st.button(f"📄 Gerar {rotulo}", key=f"gerar_{formato}_{chave}"):
+        from centesimais.relatorios import exportar_excel, exportar_pdf  # openpyxl só ao gerar
+
+        if formato == "pdf":
+            titulo = f"Relatório de Análises — {parametro}" if parametro else "Relatório de Análises"
+            st.session_state[f"{formato}_{chave}"] = exportar_pdf(banco, usuario_id, parametro, titulo)
+        else:
+            st.session_state[f"{formato}_{chave}"] = exportar_excel(banco, usuario_id, parametro)
+    caminho = st.session_state.get(f"{formato}_{chave}")
+    if caminho is not None and caminho.exists():
+        with open(caminho, "rb") as arquivo:
+            st.download_button(
+                label=f"📥 Baixar {rotulo}",
+                data=arquivo,
+                file_name=nome_arquivo,
+                mime="application/pdf" if formato == "pdf" else
+                     "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
 
 # --------------------- BLOCO FINAL: Módulo de Relatórios (integração no menu) ---------------------
 
@@ -7,73 +7,30 @@ st.set_page_config(
     layout="wide"
 )
 
-# Demais imports e código abaixo
+# Demais imports e código abaixo. Só o necessário para a tela de login: pandas, NumPy,
+# openpyxl e o gerador de relatórios são importados dentro das páginas que os usam,
+# na primeira vez em que são abertas (depois o Python reaproveita o módulo já carregado).
 import sqlite3
-import pandas as pd
-import numpy as np
-import statistics
 from datetime import datetime
-import bcrypt
-from fpdf import FPDF
-from io import BytesIO
-from openpyxl import Workbook
 
-# ---------------------- BLOCO 2: CONEXÃO COM BANCO DE DADOS E CRIAÇÃO DAS TABELAS ----------------------
-DB_PATH = "banco.db"
-conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-cursor = conn.cursor()
-
-# Tabela de usuários
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS usuarios (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    nome TEXT NOT NULL,
-    email TEXT UNIQUE NOT NULL,
-    senha TEXT NOT NULL,
-    tipo TEXT NOT NULL DEFAULT 'usuario'
-)
-''')
-
-# Tabela de análises
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS analises (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    usuario_id INTEGER,
-    nome_amostra TEXT,
-    parametro TEXT,
-    valor1 REAL,
-    valor2 REAL,
-    valor3 REAL,
-    media REAL,
-    desvio_padrao REAL,
-    coef_var REAL,
-    data TEXT,
-    FOREIGN KEY(usuario_id) REFERENCES usuarios(id)
-)
-''')
-
-# Tabela de anotações
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS anotacoes (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    usuario_id INTEGER,
-    titulo TEXT,
-    texto TEXT,
-    data TEXT,
-    FOREIGN KEY(usuario_id) REFERENCES usuarios(id)
-)
-''')
+from centesimais.autenticacao import (ServidorOcupado, autenticar, emitir_token, encerrar_sessoes, obter_pool,
+                                      validar_token)
+from centesimais.conexao import obter_banco
 
-conn.commit()
+# ---------------------- BLOCO 2: CONEXÃO COM BANCO DE DADOS E MIGRAÇÕES ----------------------
+DB_PATH = "banco.db"
+# Conexões compartilhadas pelo processo: pool de leitura + escritor único, em modo WAL.
+# Na primeira abertura as migrações pendentes são aplicadas (tabelas, índices, gatilhos).
+banco = obter_banco(DB_PATH)
 
 # ---------------------- BLOCO 3: FUNÇÕES AUXILIARES DE SEGURANÇA (CRIPTOGRAFIA) ----------------------
 def criptografar_senha(senha: str) -> bytes:
-    """Criptografa uma senha em formato seguro usando bcrypt."""
-    return bcrypt.hashpw(senha.encode("utf-8"), bcrypt.gensalt())
+    """Criptografa uma senha com bcrypt no pool limitado (custo em CENTESIMAIS_BCRYPT_CUSTO)."""
+    return obter_pool().gerar_hash(senha)
 
 def verificar_senha(senha: str, senha_hash: bytes) -> bool:
     """Verifica se a senha fornecida corresponde ao hash armazenado."""
-    return bcrypt.checkpw(senha.encode("utf-8"), senha_hash)
+    return obter_pool().verificar(senha, senha_hash)
 
 # ---------------------- BLOCO 4: INTERFACE DE AUTENTICAÇÃO (LOGIN & CADASTRO DE USUÁRIOS) ----------------------
 
@@ -89,9 +46,8 @@ def cadastrar_usuario():
     if cadastrar:
         senha_hash = criptografar_senha(senha)
         try:
-            cursor.execute("INSERT INTO usuarios (nome, email, senha, tipo) VALUES (?, ?, ?, ?)",
-                           (nome, email, senha_hash, tipo))
-            conn.commit()
+            banco.gravar("INSERT INTO usuarios (nome, email, senha_hash, tipo) VALUES (?, ?, ?, ?)",
+                         (nome, email, senha_hash, tipo))
             st.success("Usuário cadastrado com sucesso!")
         except sqlite3.IntegrityError:
             st.error("Email já cadastrado.")
@@ -104,8 +60,8 @@ def login():
         entrar = st.form_submit_button("Entrar")
 
     if entrar:
-        cursor.execute("SELECT * FROM usuarios WHERE email = ?", (email,))
-        user = cursor.fetchone()
+        with banco.leitura() as conn:
+            user = conn.execute("SELECT * FROM usuarios WHERE email = ?", (email,)).fetchone()
         if user and verificar_senha(senha, user[3]):
             st.session_state['user'] = {
                 'id': user[0],
@@ -153,6 +109,7 @@ def menu_analises(usuario):
         "Lipídios",
         "Fibras Totais",
         "Carboidratos por Diferença",
+        "Importar Lote (CSV/XLSX)",
         "Ver Análises Finalizadas",
         "Minhas Anotações",
         "Relatórios"
@@ -170,6 +127,8 @@ def menu_analises(usuario):
         analise_fibras(usuario)
     elif opcao == "Carboidratos por Diferença":
         analise_carboidratos(usuario)
+    elif opcao == "Importar Lote (CSV/XLSX)":
+        importar_lote(usuario)
     elif opcao == "Ver Análises Finalizadas":
         analises_finalizadas(usuario)
     elif opcao == "Minhas Anotações":
@@ -189,13 +148,14 @@ def cadastrar_usuario():
 
     if st.button("Cadastrar", key="botao_cadastro"):
         if nome and email and senha:
-            senha_hash = bcrypt.hashpw(senha.encode(), bcrypt.gensalt())
             try:
-                cursor.execute("INSERT INTO usuarios (nome, email, senha, tipo) VALUES (?, ?, ?, ?)", (nome, email, senha_hash, tipo))
-                conn.commit()
+                senha_hash = criptografar_senha(senha)
+                banco.gravar("INSERT INTO usuarios (nome, email, senha_hash, tipo) VALUES (?, ?, ?, ?)", (nome, email, senha_hash, tipo))
                 st.success("Usuário cadastrado com sucesso!")
             except sqlite3.IntegrityError:
                 st.error("Este e-mail já está cadastrado.")
+            except ServidorOcupado as erro:
+                st.warning(str(erro))
         else:
             st.warning("Por favor, preencha todos os campos.")
 
@@ -205,23 +165,38 @@ def login():
     senha = st.text_input("Senha", type="password", key="login_senha")
 
     if st.button("Entrar", key="botao_login"):
-        cursor.execute("SELECT * FROM usuarios WHERE email = ?", (email,))
-        user = cursor.fetchone()
-        if user and bcrypt.checkpw(senha.encode(), user[3]):
-            st.session_state['usuario'] = {
-                "id": user[0],
-                "nome": user[1],
-                "email": user[2],
-                "tipo": user[4]
-            }
+        try:
+            user = autenticar(banco, email, senha)
+        except ServidorOcupado as erro:
+            st.warning(str(erro))
+            return
+        if user:
+            iniciar_sessao(user)
             st.success("Login realizado com sucesso!")
-            st.experimental_rerun()
+            st.rerun()
         else:
             st.error("Email ou senha incorretos.")
 
+def iniciar_sessao(user):
+    st.session_state['usuario'] = {
+        "id": user["id"],
+        "nome": user["nome"],
+        "email": user["email"],
+        "tipo": user["tipo"]
+    }
+    # Token assinado na URL: recarregar a página não exige nova verificação bcrypt
+    st.query_params["sessao"] = emitir_token(banco, user)
+
 # ---------------------- BLOCO 9: SISTEMA DE AUTENTICAÇÃO E ROTEAMENTO ----------------------
 
 def tela_autenticacao():
+    if 'usuario' not in st.session_state and "sessao" in st.query_params:
+        user = validar_token(banco, st.query_params["sessao"])
+        if user:
+            iniciar_sessao(user)
+        else:
+            del st.query_params["sessao"]
+
     if 'usuario' not in st.session_state:
         opcao = st.radio("Bem-vindo! Escolha uma opção:", ["Entrar", "Cadastrar"], key="selecao_autenticacao")
         if opcao == "Entrar":
@@ -232,8 +207,10 @@ def tela_autenticacao():
         usuario = st.session_state['usuario']
         st.sidebar.success(f"Logado como: {usuario['nome']} ({usuario['tipo']})")
         if st.sidebar.button("🚪 Sair", key="botao_sair"):
+            encerrar_sessoes(banco, usuario['id'])  # o token que ficou no histórico do navegador deixa de valer
             st.session_state.clear()
-            st.experimental_rerun()
+            st.query_params.clear()
+            st.rerun()
 
         if usuario['tipo'] == "admin":
             menu_admin(usuario)
@@ -255,223 +232,172 @@ def menu_usuario(usuario):
 
 def menu_admin(usuario):
     st.sidebar.header("🛠️ Painel do Administrador")
-    opcao = st.sidebar.radio("Escolha uma opção:", ["Painel Geral", "Anotações", "Relatórios"], key="menu_admin")
+    opcao = st.sidebar.radio(
+        "Escolha uma opção:", ["Painel Geral", "Controle de Qualidade", "Cartas de Controle", "Anotações", "Relatórios"],
+        key="menu_admin"
+    )
 
     if opcao == "Painel Geral":
         painel_admin()
+    elif opcao == "Controle de Qualidade":
+        controle_qualidade()
+    elif opcao == "Cartas de Controle":
+        cartas_controle()
     elif opcao == "Anotações":
         modulo_anotacoes(usuario)
     elif opcao == "Relatórios":
         modulo_relatorios(usuario)
-# ---------------------- BLOCO 10: EXECUÇÃO PRINCIPAL DO SISTEMA ----------------------
+# ---------------------- BLOCO 11: ANÁLISE DE UMIDADE ----------------------
+def registrar_analise(usuario, nome_amostra, parametro, resultado, mensagem):
+    """Grava as replicatas calculadas por centesimais.calculos e exibe suas estatísticas."""
+    from centesimais.analises import registrar_resultado
 
-if __name__ == "__main__":
- #   tela_autenticacao()
+    linha = registrar_resultado(banco, usuario['id'], nome_amostra, parametro, resultado)
+    st.success(mensagem)
+    st.metric("Média", f"{linha['media']}%")
+    st.metric("Desvio Padrão", f"{linha['desvio_padrao']}%")
+    st.metric("Coef. de Variação", f"{linha['coef_var']}%")
+
+def numero_replicatas(chave):
+    """Quantas replicatas o formulário coleta: de duplicata até REPLICATAS_MAXIMAS."""
+    from centesimais.replicatas import REPLICATAS_MAXIMAS, REPLICATAS_MINIMAS, REPLICATAS_PADRAO
+
+    return int(st.number_input("Número de replicatas", min_value=REPLICATAS_MINIMAS, max_value=REPLICATAS_MAXIMAS,
+                               value=REPLICATAS_PADRAO, step=1, key=f"{chave}_n_replicatas"))
+
+def exibir_estimativas(marcadores, resultado, rotulo):
+    for i, (marcador, valor) in enumerate(zip(marcadores, resultado.replicatas[0]), start=1):
+        marcador.markdown(f"🔹 {rotulo} ({i}): `{valor} %`")
 
-# ---------------------- BLOCO 11: ANÁLISE DE UMIDADE ----------------------
 def analise_umidade(usuario):
+    from centesimais import calculos
+
     st.subheader("🔬 Nova Análise: Umidade (Estufa - AOAC)")
     nome_amostra = st.text_input("Nome da Amostra", key="umidade_nome")
 
-    st.markdown("### Coleta de dados brutos para triplicata")
-    triplicata = []
+    st.markdown("### Coleta de Dados das Replicatas")
+    n_replicatas = numero_replicatas("umidade")
+    leituras = {campo: [] for campo in calculos.CAMPOS["Umidade"]}
+    marcadores = []
 
-    for i in range(1, 4):
+    for i in range(1, n_replicatas + 1):
         st.markdown(f"**🔁 Medida {i}**")
-        peso_cadinho_vazio = st.number_input(f"Peso do cadinho vazio (g) [{i}]", key=f"cad_um_{i}", step=0.0001)
-        peso_cadinho_amostra = st.number_input(f"Peso do cadinho + amostra antes da estufa (g) [{i}]", key=f"cad_amu_{i}", step=0.0001)
-        peso_cadinho_seco = st.number_input(f"Peso do cadinho + amostra seca (g) [{i}]", key=f"cad_sec_{i}", step=0.0001)
+        leituras["peso_cadinho"].append(st.number_input(f"Peso do cadinho vazio (g) [{i}]", key=f"cad_um_{i}", step=0.0001))
+        leituras["peso_cadinho_amostra"].append(st.number_input(f"Peso do cadinho + amostra antes da estufa (g) [{i}]", key=f"cad_amu_{i}", step=0.0001))
+        leituras["peso_cadinho_seco"].append(st.number_input(f"Peso do cadinho + amostra seca (g) [{i}]", key=f"cad_sec_{i}", step=0.0001))
+        marcadores.append(st.empty())
 
-        peso_umida = peso_cadinho_amostra - peso_cadinho_vazio
-        peso_seca = peso_cadinho_seco - peso_cadinho_vazio
-        umidade = ((peso_umida - peso_seca) / peso_umida) * 100 if peso_umida > 0 else 0
-        triplicata.append(round(umidade, 2))
-
-        st.markdown(f"🔹 Umidade estimada ({i}): `{round(umidade, 2)} %`")
+    resultado = calculos.calcular("Umidade", leituras, preencher=0)
+    exibir_estimativas(marcadores, resultado, "Umidade estimada")
 
     if st.button("Calcular Estatísticas e Salvar Umidade"):
-        media = round(np.mean(triplicata), 2)
-        desvio = round(statistics.stdev(triplicata), 2) if len(set(triplicata)) > 1 else 0.0
-        coef_var = round((desvio / media) * 100, 2) if media != 0 else 0.0
-        data = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        cursor.execute("""
-            INSERT INTO analises (usuario_id, nome_amostra, parametro, valor1, valor2, valor3, media, desvio_padrao, coef_var, data)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (usuario['id'], nome_amostra, "Umidade",
-              triplicata[0], triplicata[1], triplicata[2],
-              media, desvio, coef_var, data))
-        conn.commit()
-
-        st.success("Análise de umidade registrada com sucesso!")
-        st.metric("Média", f"{media}%")
-        st.metric("Desvio Padrão", f"{desvio}%")
-        st.metric("Coef. de Variação", f"{coef_var}%")
+        registrar_analise(usuario, nome_amostra, "Umidade", resultado, "Análise de umidade registrada com sucesso!")
 
 # ---------------------- BLOCO ANÁLISE: CINZAS (AOAC) ----------------------
 def analise_cinzas(usuario):
+    from centesimais import calculos
+
     st.subheader("🧪 Análise de Cinzas - Método AOAC")
 
     nome_amostra = st.text_input("Nome da Amostra", key="cinzas_nome_amostra")
 
-    st.markdown("### Coleta de Dados para Triplicata")
+    st.markdown("### Coleta de Dados das Replicatas")
+    n_replicatas = numero_replicatas("cinzas")
 
-    triplicata = []
-    for i in range(1, 4):
+    leituras = {campo: [] for campo in calculos.CAMPOS["Cinzas"]}
+    marcadores = []
+    for i in range(1, n_replicatas + 1):
         st.markdown(f"**🔁 Medida {i}**")
-        peso_cadinho = st.number_input(f"Peso do cadinho vazio (g) [{i}]", key=f"cinzas_cadinho_vazio_{i}", step=0.0001, format="%.4f")
-        peso_cadinho_amostra = st.number_input(f"Peso do cadinho + amostra seca (g) [{i}]", key=f"cinzas_cadinho_amostra_{i}", step=0.0001, format="%.4f")
-        peso_cadinho_cinzas = st.number_input(f"Peso do cadinho + cinzas (g) [{i}]", key=f"cinzas_cadinho_cinza_{i}", step=0.0001, format="%.4f")
+        leituras["peso_cadinho"].append(st.number_input(f"Peso do cadinho vazio (g) [{i}]", key=f"cinzas_cadinho_vazio_{i}", step=0.0001, format="%.4f"))
+        leituras["peso_cadinho_amostra"].append(st.number_input(f"Peso do cadinho + amostra seca (g) [{i}]", key=f"cinzas_cadinho_amostra_{i}", step=0.0001, format="%.4f"))
+        leituras["peso_cadinho_cinzas"].append(st.number_input(f"Peso do cadinho + cinzas (g) [{i}]", key=f"cinzas_cadinho_cinza_{i}", step=0.0001, format="%.4f"))
+        marcadores.append(st.empty())
 
-        peso_amostra = peso_cadinho_amostra - peso_cadinho
-        peso_cinzas = peso_cadinho_cinzas - peso_cadinho
-
-        cinzas = (peso_cinzas / peso_amostra) * 100 if peso_amostra > 0 else 0
-        triplicata.append(round(cinzas, 2))
-
-        st.markdown(f"🔹 Cinzas estimadas ({i}): `{round(cinzas, 2)} %`")
+    resultado = calculos.calcular("Cinzas", leituras, preencher=0)
+    exibir_estimativas(marcadores, resultado, "Cinzas estimadas")
 
     if st.button("Calcular e Salvar Análise de Cinzas", key="btn_salvar_cinzas"):
-        media = round(np.mean(triplicata), 2)
-        desvio = round(statistics.stdev(triplicata), 2) if len(set(triplicata)) > 1 else 0.0
-        coef_var = round((desvio / media) * 100, 2) if media != 0 else 0.0
-        data = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        cursor.execute("""
-            INSERT INTO analises (usuario_id, nome_amostra, parametro, valor1, valor2, valor3, media, desvio_padrao, coef_var, data)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (usuario['id'], nome_amostra, "Cinzas",
-              triplicata[0], triplicata[1], triplicata[2],
-              media, desvio, coef_var, data))
-        conn.commit()
-
-        st.success("✅ Análise de cinzas registrada com sucesso!")
-        st.metric("Média", f"{media}%")
-        st.metric("Desvio Padrão", f"{desvio}%")
-        st.metric("Coef. de Variação", f"{coef_var}%")
+        registrar_analise(usuario, nome_amostra, "Cinzas", resultado, "✅ Análise de cinzas registrada com sucesso!")
 
 # ---------------------- BLOCO ANÁLISE: PROTEÍNAS (KJELDAHL - AOAC) ----------------------
 def analise_proteinas(usuario):
+    from centesimais import calculos
+
     st.subheader("🧪 Análise de Proteínas - Método Kjeldahl")
 
     nome_amostra = st.text_input("Nome da Amostra", key="proteina_nome_amostra")
     fator_conv = st.number_input("Fator de conversão (ex: 6.25)", value=6.25, step=0.01, key="fator_kjeldahl")
 
-    st.markdown("### Coleta de Dados para Triplicata")
+    st.markdown("### Coleta de Dados das Replicatas")
+    n_replicatas = numero_replicatas("proteinas")
 
-    triplicata = []
-    for i in range(1, 4):
+    leituras = {campo: [] for campo in calculos.CAMPOS["Proteínas"]}
+    marcadores = []
+    for i in range(1, n_replicatas + 1):
         st.markdown(f"**🔁 Medida {i}**")
-        volume_HCl = st.number_input(f"Volume de HCl (mL) [{i}]", key=f"prot_hcl_{i}", step=0.01)
-        branco = st.number_input(f"Volume de branco (mL) [{i}]", key=f"prot_branco_{i}", step=0.01)
-        normalidade = st.number_input(f"Normalidade do HCl (N) [{i}]", key=f"prot_n_{i}", step=0.01)
-        peso_amostra = st.number_input(f"Peso da amostra (g) [{i}]", key=f"prot_peso_{i}", step=0.0001)
-
-        if peso_amostra > 0:
-            nitrogenio = ((volume_HCl - branco) * normalidade * 14.007) / (peso_amostra * 1000)
-            proteinas = nitrogenio * fator_conv
-        else:
-            proteinas = 0
+        leituras["volume_hcl"].append(st.number_input(f"Volume de HCl (mL) [{i}]", key=f"prot_hcl_{i}", step=0.01))
+        leituras["volume_branco"].append(st.number_input(f"Volume de branco (mL) [{i}]", key=f"prot_branco_{i}", step=0.01))
+        leituras["normalidade"].append(st.number_input(f"Normalidade do HCl (N) [{i}]", key=f"prot_n_{i}", step=0.01))
+        leituras["peso_amostra"].append(st.number_input(f"Peso da amostra (g) [{i}]", key=f"prot_peso_{i}", step=0.0001))
+        marcadores.append(st.empty())
 
-        triplicata.append(round(proteinas, 2))
-        st.markdown(f"🔹 Proteína estimada ({i}): `{round(proteinas, 2)} %`")
+    leituras["fator"] = fator_conv
+    resultado = calculos.calcular("Proteínas", leituras, preencher=0)
+    exibir_estimativas(marcadores, resultado, "Proteína estimada")
 
     if st.button("Calcular e Salvar Análise de Proteínas", key="btn_salvar_proteinas"):
-        media = round(np.mean(triplicata), 2)
-        desvio = round(statistics.stdev(triplicata), 2) if len(set(triplicata)) > 1 else 0.0
-        coef_var = round((desvio / media) * 100, 2) if media != 0 else 0.0
-        data = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        cursor.execute("""
-            INSERT INTO analises (usuario_id, nome_amostra, parametro, valor1, valor2, valor3, media, desvio_padrao, coef_var, data)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (usuario['id'], nome_amostra, "Proteínas",
-              triplicata[0], triplicata[1], triplicata[2],
-              media, desvio, coef_var, data))
-        conn.commit()
-
-        st.success("✅ Análise de proteínas registrada com sucesso!")
-        st.metric("Média", f"{media}%")
-        st.metric("Desvio Padrão", f"{desvio}%")
-        st.metric("Coef. de Variação", f"{coef_var}%")
+        registrar_analise(usuario, nome_amostra, "Proteínas", resultado, "✅ Análise de proteínas registrada com sucesso!")
 
 # ---------------------- BLOCO ANÁLISE: LIPÍDIOS (EXTRAÇÃO ETÉREA - AOAC) ----------------------
 def analise_lipidios(usuario):
+    from centesimais import calculos
+
     st.subheader("🧪 Análise de Lipídios - Extração Etérea (Soxhlet)")
 
     nome_amostra = st.text_input("Nome da Amostra", key="lipidios_nome_amostra")
-    st.markdown("### Coleta de Dados para Triplicata")
+    st.markdown("### Coleta de Dados das Replicatas")
+    n_replicatas = numero_replicatas("lipidios")
 
-    triplicata = []
-    for i in range(1, 4):
+    leituras = {campo: [] for campo in calculos.CAMPOS["Lipídios"]}
+    marcadores = []
+    for i in range(1, n_replicatas + 1):
         st.markdown(f"**🔁 Medida {i}**")
-        peso_frasco_vazio = st.number_input(f"Peso do frasco vazio (g) [{i}]", key=f"lip_frasco_vazio_{i}", step=0.0001)
-        peso_frasco_com_lip = st.number_input(f"Peso do frasco com lipídios (g) [{i}]", key=f"lip_frasco_com_lip_{i}", step=0.0001)
-        peso_amostra = st.number_input(f"Peso da amostra (g) [{i}]", key=f"lip_peso_amostra_{i}", step=0.0001)
-
-        peso_lipidios = peso_frasco_com_lip - peso_frasco_vazio
-        lipidios = (peso_lipidios / peso_amostra) * 100 if peso_amostra > 0 else 0
+        leituras["peso_frasco_vazio"].append(st.number_input(f"Peso do frasco vazio (g) [{i}]", key=f"lip_frasco_vazio_{i}", step=0.0001))
+        leituras["peso_frasco_lipidios"].append(st.number_input(f"Peso do frasco com lipídios (g) [{i}]", key=f"lip_frasco_com_lip_{i}", step=0.0001))
+        leituras["peso_amostra"].append(st.number_input(f"Peso da amostra (g) [{i}]", key=f"lip_peso_amostra_{i}", step=0.0001))
+        marcadores.append(st.empty())
 
-        triplicata.append(round(lipidios, 2))
-        st.markdown(f"🔹 Lipídios estimados ({i}): `{round(lipidios, 2)} %`")
+    resultado = calculos.calcular("Lipídios", leituras, preencher=0)
+    exibir_estimativas(marcadores, resultado, "Lipídios estimados")
 
     if st.button("Calcular e Salvar Análise de Lipídios", key="btn_salvar_lipidios"):
-        media = round(np.mean(triplicata), 2)
-        desvio = round(statistics.stdev(triplicata), 2) if len(set(triplicata)) > 1 else 0.0
-        coef_var = round((desvio / media) * 100, 2) if media != 0 else 0.0
-        data = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        cursor.execute("""
-            INSERT INTO analises (usuario_id, nome_amostra, parametro, valor1, valor2, valor3, media, desvio_padrao, coef_var, data)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (usuario['id'], nome_amostra, "Lipídios",
-              triplicata[0], triplicata[1], triplicata[2],
-              media, desvio, coef_var, data))
-        conn.commit()
-
-        st.success("✅ Análise de lipídios registrada com sucesso!")
-        st.metric("Média", f"{media}%")
-        st.metric("Desvio Padrão", f"{desvio}%")
-        st.metric("Coef. de Variação", f"{coef_var}%")
+        registrar_analise(usuario, nome_amostra, "Lipídios", resultado, "✅ Análise de lipídios registrada com sucesso!")
 
 # ---------------------- BLOCO ANÁLISE: FIBRAS TOTAIS (AOAC 985.29) ----------------------
 def analise_fibras(usuario):
+    from centesimais import calculos
+
     st.subheader("🧪 Análise de Fibras Totais - AOAC 985.29 (Digestão Enzimática)")
 
     nome_amostra = st.text_input("Nome da Amostra", key="fibras_nome_amostra")
-    st.markdown("### Coleta de Dados para Triplicata")
+    st.markdown("### Coleta de Dados das Replicatas")
+    n_replicatas = numero_replicatas("fibras")
 
-    triplicata = []
-    for i in range(1, 4):
+    leituras = {campo: [] for campo in calculos.CAMPOS["Fibras Totais"]}
+    marcadores = []
+    for i in range(1, n_replicatas + 1):
         st.markdown(f"**🔁 Medida {i}**")
-        peso_residuo = st.number_input(f"Peso do resíduo (g) [{i}]", key=f"fibra_residuo_{i}", step=0.0001)
-        correcao_proteina = st.number_input(f"Correção de proteína (g) [{i}]", key=f"fibra_proteina_{i}", step=0.0001)
-        correcao_cinzas = st.number_input(f"Correção de cinzas (g) [{i}]", key=f"fibra_cinzas_{i}", step=0.0001)
-        peso_amostra = st.number_input(f"Peso da amostra (g) [{i}]", key=f"fibra_amostra_{i}", step=0.0001)
-
-        fibra_total = ((peso_residuo - correcao_proteina - correcao_cinzas) / peso_amostra) * 100 if peso_amostra > 0 else 0
-        triplicata.append(round(fibra_total, 2))
+        leituras["peso_residuo"].append(st.number_input(f"Peso do resíduo (g) [{i}]", key=f"fibra_residuo_{i}", step=0.0001))
+        leituras["correcao_proteina"].append(st.number_input(f"Correção de proteína (g) [{i}]", key=f"fibra_proteina_{i}", step=0.0001))
+        leituras["correcao_cinzas"].append(st.number_input(f"Correção de cinzas (g) [{i}]", key=f"fibra_cinzas_{i}", step=0.0001))
+        leituras["peso_amostra"].append(st.number_input(f"Peso da amostra (g) [{i}]", key=f"fibra_amostra_{i}", step=0.0001))
+        marcadores.append(st.empty())
 
-        st.markdown(f"🔹 Fibras estimadas ({i}): `{round(fibra_total, 2)} %`")
+    resultado = calculos.calcular("Fibras Totais", leituras, preencher=0)
+    exibir_estimativas(marcadores, resultado, "Fibras estimadas")
 
     if st.button("Calcular e Salvar Análise de Fibras", key="btn_salvar_fibras"):
-        media = round(np.mean(triplicata), 2)
-        desvio = round(statistics.stdev(triplicata), 2) if len(set(triplicata)) > 1 else 0.0
-        coef_var = round((desvio / media) * 100, 2) if media != 0 else 0.0
-        data = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        cursor.execute("""
-            INSERT INTO analises (usuario_id, nome_amostra, parametro, valor1, valor2, valor3, media, desvio_padrao, coef_var, data)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (usuario['id'], nome_amostra, "Fibras Totais",
-              triplicata[0], triplicata[1], triplicata[2],
-              media, desvio, coef_var, data))
-        conn.commit()
-
-        st.success("✅ Análise de fibras registrada com sucesso!")
-        st.metric("Média", f"{media}%")
-        st.metric("Desvio Padrão", f"{desvio}%")
-        st.metric("Coef. de Variação", f"{coef_var}%")
+        registrar_analise(usuario, nome_amostra, "Fibras Totais", resultado, "✅ Análise de fibras registrada com sucesso!")
 
 # ---------------------- BLOCO ANÁLISE: CARBOIDRATOS POR DIFERENÇA ----------------------
 def analise_carboidratos(usuario):
@@ -487,21 +413,54 @@ def analise_carboidratos(usuario):
     fibras = st.number_input("Fibras Totais (%)", step=0.01, key="carb_fibras")
 
     if st.button("Calcular e Salvar Carboidratos", key="btn_salvar_carb"):
-        soma = umidade + cinzas + proteinas + lipidios + fibras
-        carboidratos = round(100 - soma, 2)
-        data = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        from centesimais.analises import carboidratos_por_diferenca, registrar_carboidratos
 
-        cursor.execute("""
-            INSERT INTO analises (usuario_id, nome_amostra, parametro, media, data)
-            VALUES (?, ?, ?, ?, ?)
-        """, (usuario['id'], nome_amostra, "Carboidratos por Diferença", carboidratos, data))
-        conn.commit()
+        carboidratos = carboidratos_por_diferenca(umidade, cinzas, proteinas, lipidios, fibras)
+        registrar_carboidratos(banco, usuario['id'], nome_amostra, carboidratos)
 
         st.success("✅ Cálculo de carboidratos registrado com sucesso!")
         st.metric("Carboidratos", f"{carboidratos}%")
 
+# ---------------------- BLOCO IMPORTAÇÃO: LOTE DE LEITURAS (CSV/XLSX) ----------------------
+def importar_lote(usuario):
+    import pandas as pd
+    from centesimais.importacao import PARAMETROS, importar_arquivo
+
+    st.subheader("📥 Importação em Lote de Leituras (CSV/XLSX)")
+    st.markdown(
+        "Uma linha por repetição, com as colunas `amostra`, `parametro` e as leituras brutas do método. "
+        "Para Proteínas, a coluna `fator` é opcional (padrão 6.25)."
+    )
+    colunas = pd.DataFrame(
+        [(parametro, ", ".join(campos)) for parametro, campos in PARAMETROS.items()],
+        columns=["Parâmetro", "Colunas de leitura"]
+    )
+    st.dataframe(colunas, use_container_width=True, hide_index=True)
+
+    arquivo = st.file_uploader("Arquivo de leituras", type=["csv", "xlsx"], key="arquivo_lote")
+    if arquivo is not None and st.button("Importar lote", key="btn_importar_lote"):
+        try:
+            # Lê e calcula fora da trava do escritor; só o INSERT entra em banco.escrita
+            resultado = importar_arquivo(banco, usuario['id'], arquivo)
+        except ValueError as erro:
+            st.error(f"Arquivo inválido: {erro}")
+            return
+
+        st.success(f"✅ {resultado.analises_inseridas} análises importadas em {resultado.segundos:.2f} s.")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Linhas lidas", resultado.linhas_lidas)
+        col2.metric("Linhas rejeitadas", len(resultado.rejeitadas))
+        col3.metric("Linhas por segundo", f"{resultado.linhas_por_segundo:,.0f}")
+
+        if not resultado.rejeitadas.empty:
+            st.warning("Algumas linhas foram rejeitadas e não entraram no lote:")
+            st.dataframe(resultado.rejeitadas, use_container_width=True, hide_index=True)
+
 # ---------------------- BLOCO VISUALIZAÇÃO: ANÁLISES FINALIZADAS ----------------------
 def analises_finalizadas(usuario):
+    from centesimais.analises import adicionar_replicata, atualizar_media, excluir_analise
+    from centesimais.replicatas import formatar as formatar_replicatas
+
     st.subheader("📊 Análises Finalizadas")
 
     parametros_disponiveis = [
@@ -517,19 +476,19 @@ def analises_finalizadas(usuario):
         query += " AND parametro = ?"
         params.append(filtro_param)
 
-    df = pd.read_sql_query(query, conn, params=params)
+    df = banco.consultar(query, params, usuario['id'])
 
     if df.empty:
         st.info("Nenhuma análise encontrada.")
         return
 
-    df_exibicao = df[['id', 'nome_amostra', 'parametro', 'valor1', 'valor2', 'valor3', 'media', 'desvio_padrao', 'coef_var', 'data']].copy()
+    df_exibicao = df[['id', 'nome_amostra', 'parametro', 'n_replicatas', 'media', 'desvio_padrao', 'coef_var', 'data']].copy()
+    df_exibicao.insert(3, 'replicatas', df['replicatas'].map(formatar_replicatas))
     df_exibicao = df_exibicao.rename(columns={
         'nome_amostra': 'Amostra',
         'parametro': 'Análise',
-        'valor1': 'V1',
-        'valor2': 'V2',
-        'valor3': 'V3',
+        'replicatas': 'Replicatas',
+        'n_replicatas': 'n',
         'media': 'Média',
         'desvio_padrao': 'DP',
         'coef_var': 'CV (%)',
@@ -541,19 +500,36 @@ def analises_finalizadas(usuario):
     with st.expander("🧹 Excluir Análise"):
         id_excluir = st.number_input("ID da análise a excluir:", min_value=1, step=1, key="excluir_id")
         if st.button("Excluir", key="btn_excluir"):
-            cursor.execute("DELETE FROM analises WHERE id = ? AND usuario_id = ?", (id_excluir, usuario['id']))
-            conn.commit()
-            st.success("Análise excluída com sucesso!")
+            if excluir_analise(banco, usuario['id'], id_excluir):
+                st.success("Análise excluída com sucesso!")
+            else:
+                st.warning("Nenhuma análise sua com esse ID.")
+
+    with st.expander("➕ Adicionar Replicata"):
+        id_replicata = st.number_input("ID da análise:", min_value=1, step=1, key="replicata_id")
+        nova_replicata = st.number_input("Resultado da nova replicata (%):", step=0.01, key="nova_replicata")
+        if st.button("Adicionar replicata", key="btn_adicionar_replicata"):
+            try:
+                linha = adicionar_replicata(banco, usuario['id'], id_replicata, nova_replicata)
+            except ValueError as erro:
+                st.warning(f"Não foi possível adicionar: {erro}.")
+            else:
+                if linha is None:
+                    st.warning("Nenhuma análise sua com replicatas e esse ID.")
+                else:
+                    st.success(f"Replicata adicionada: n = {len(linha['replicatas'])}, média {linha['media']}%, "
+                               f"DP {linha['desvio_padrao']}%, CV {linha['coef_var']}%.")
 
     with st.expander("📝 Editar Média da Análise"):
         id_editar = st.number_input("ID da análise a editar:", min_value=1, step=1, key="editar_id")
         novo_valor = st.number_input("Novo valor médio (%):", step=0.01, key="novo_valor_media")
         if st.button("Salvar edição", key="btn_editar_media"):
-            cursor.execute("UPDATE analises SET media = ? WHERE id = ? AND usuario_id = ?", (novo_valor, id_editar, usuario['id']))
-            conn.commit()
-            st.success("Valor médio atualizado com sucesso!")
+            if atualizar_media(banco, usuario['id'], id_editar, novo_valor):
+                st.success("Valor médio atualizado com sucesso!")
+            else:
+                st.warning("Nenhuma análise sua com esse ID.")
 
-# ---------------------- BLOCO RELATÓRIOS: EXPORTAÇÃO EM PDF E EXCEL ----------------------
+# ---------------------- BLOCO RELATÓRIOS: EXPORTAÇÃO EM PDF, EXCEL E PARQUET ----------------------
 def modulo_relatorios(usuario):
     st.subheader("📄 Relatórios de Análises")
     aba = st.radio("Escolha uma opção:", ["Exportar Todas as Análises", "Exportar por Tipo de Análise"], key="opcao_relatorio")
@@ -565,28 +541,19 @@ def modulo_relatorios(usuario):
 
 
 def exportar_geral(usuario):
-    df = pd.read_sql_query("SELECT * FROM analises WHERE usuario_id = ?", conn, params=(usuario['id'],))
-    if df.empty:
+    total = banco.consultar("SELECT COUNT(*) AS total FROM analises WHERE usuario_id = ?", (usuario['id'],), usuario['id'])
+    if total['total'].iloc[0] == 0:
         st.info("Nenhuma análise cadastrada.")
         return
 
-    st.download_button(
-        label="📥 Baixar Excel",
-        data=converter_excel(df),
-        file_name="analises_geral.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-
-    st.download_button(
-        label="📥 Baixar PDF",
-        data=converter_pdf(df),
-        file_name="analises_geral.pdf",
-        mime="application/pdf"
-    )
+    baixar_relatorio("geral", "excel", "analises_geral.xlsx", usuario_id=usuario['id'])
+    baixar_relatorio("geral", "pdf", "analises_geral.pdf", usuario_id=usuario['id'])
+    st.caption("Parquet: colunas tipadas (replicatas como lista, data como timestamp) para pandas, Polars ou DuckDB.")
+    baixar_relatorio("geral", "parquet", "analises_geral.parquet", usuario_id=usuario['id'])
 
 
 def exportar_por_parametro(usuario):
-    df = pd.read_sql_query("SELECT DISTINCT parametro FROM analises WHERE usuario_id = ?", conn, params=(usuario['id'],))
+    df = banco.consultar("SELECT DISTINCT parametro FROM analises WHERE usuario_id = ?", (usuario['id'],), usuario['id'])
     parametros = df['parametro'].tolist()
 
     if not parametros:
@@ -594,52 +561,84 @@ def exportar_por_parametro(usuario):
         return
 
     escolha = st.selectbox("Selecione o parâmetro:", parametros, key="parametro_exportacao")
-    df_filtrado = pd.read_sql_query(
-        "SELECT * FROM analises WHERE usuario_id = ? AND parametro = ?",
-        conn, params=(usuario['id'], escolha)
-    )
 
-    st.download_button(
-        label="📥 Baixar Excel",
-        data=converter_excel(df_filtrado),
-        file_name=f"analise_{escolha}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+    chave = f"parametro_{escolha}"
+    baixar_relatorio(chave, "excel", f"analise_{escolha}.xlsx", usuario_id=usuario['id'], parametro=escolha)
+    baixar_relatorio(chave, "pdf", f"analise_{escolha}.pdf", usuario_id=usuario['id'], parametro=escolha,
+                     titulo=f"Relatório de Análises — {escolha}")
+
+    st.markdown("#### 📦 Todos os parâmetros de uma vez")
+    baixar_pacote(f"usuario_{usuario['id']}", "relatorios_por_parametro.zip", usuario_id=usuario['id'])
+
+
+# formato -> (rótulo, tipo MIME)
+FORMATOS_RELATORIO = {
+    "excel": ("Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "pdf": ("PDF", "application/pdf"),
+    "parquet": ("Parquet", "application/vnd.apache.parquet"),
+}
+
+
+def baixar_relatorio(chave, formato, nome_arquivo, usuario_id=None, parametro=None, titulo="Relatório de Análises"):
+    """Gera o relatório em fluxo (arquivo temporário) sob demanda e o serve pelo caminho."""
+    from centesimais.relatorios import exportar_excel, exportar_pdf
+
+    rotulo, mime = FORMATOS_RELATORIO[formato]
+    if st.button(f"📄 Gerar {rotulo}", key=f"gerar_{formato}_{chave}"):
+        with st.spinner("Gerando relatório..."):
+            if formato == "pdf":
+                caminho = exportar_pdf(banco, usuario_id, parametro, titulo)
+            elif formato == "parquet":
+                from centesimais.colunar import exportar_parquet
+
+                caminho = exportar_parquet(banco, usuario_id, parametro)
+            else:
+                caminho = exportar_excel(banco, usuario_id, parametro)
+            st.session_state[f"{formato}_{chave}"] = caminho
+
+    caminho = st.session_state.get(f"{formato}_{chave}")
+    if caminho is not None and caminho.exists():
+        with open(caminho, "rb") as arquivo:
+            st.download_button(
+                label=f"📥 Baixar {rotulo}",
+                data=arquivo,
+                file_name=nome_arquivo,
+                mime=mime,
+                key=f"baixar_{formato}_{chave}"
+            )
 
-    st.download_button(
-        label="📥 Baixar PDF",
-        data=converter_pdf(df_filtrado),
-        file_name=f"analise_{escolha}.pdf",
-        mime="application/pdf"
-    )
 
+def baixar_pacote(chave, nome_arquivo, usuario_id=None):
+    """ZIP com um PDF e um Excel por usuário × parâmetro, gerados em paralelo (centesimais.pacotes)."""
+    from centesimais.pacotes import gerar_pacote
+
+    if st.button("📦 Gerar pacote ZIP", key=f"gerar_pacote_{chave}"):
+        barra = st.progress(0.0, text="Preparando relatórios...")
 
-def converter_excel(df):
-    from io import BytesIO
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Análises')
-    return output.getvalue()
+        def progresso(feitos, total, nome):
+            barra.progress(feitos / total, text=f"{feitos}/{total} · {nome}")
 
+        st.session_state[f"pacote_{chave}"] = gerar_pacote(banco, usuario_id, progresso=progresso)
+        barra.empty()
 
-def converter_pdf(df):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=10)
-    pdf.cell(200, 10, txt="Relatório de Análises", ln=True, align='C')
-    pdf.ln(10)
-    for index, row in df.iterrows():
-        pdf.cell(200, 6, txt=f"{row['nome_amostra']} | {row['parametro']} | Média: {row['media']}%", ln=True)
-    return pdf.output(dest='S').encode('latin-1')
+    caminho = st.session_state.get(f"pacote_{chave}")
+    if caminho is not None and caminho.exists():
+        with open(caminho, "rb") as arquivo:
+            st.download_button(
+                label="📥 Baixar pacote ZIP",
+                data=arquivo,
+                file_name=nome_arquivo,
+                mime="application/zip",
+                key=f"baixar_pacote_{chave}"
+            )
 # ---------------------- BLOCO ANOTAÇÕES: GERENCIAMENTO DE NOTAS PELO USUÁRIO ----------------------
+ANOTACOES_RECENTES = 50
+
+
 def modulo_anotacoes(usuario):
-    st.subheader("🗒️ Minhas Anotações")
+    from centesimais.busca import INICIO_DESTAQUE, buscar_anotacoes, destacar
 
-    # Exibir anotações existentes
-    anotacoes = pd.read_sql_query(
-        "SELECT id, titulo, conteudo, data FROM anotacoes WHERE usuario_id = ? ORDER BY data DESC",
-        conn, params=(usuario['id'],)
-    )
+    st.subheader("🗒️ Minhas Anotações")
 
     # Formulário para nova anotação
     with st.expander("➕ Nova anotação"):
@@ -647,80 +646,291 @@ def modulo_anotacoes(usuario):
         conteudo = st.text_area("Conteúdo", key="nova_conteudo")
         if st.button("Salvar anotação", key="btn_salvar_anotacao"):
             data = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            cursor.execute(
+            banco.gravar(
                 "INSERT INTO anotacoes (usuario_id, titulo, conteudo, data) VALUES (?, ?, ?, ?)",
-                (usuario['id'], titulo, conteudo, data)
+                (usuario['id'], titulo, conteudo, data), usuario['id']
             )
-            conn.commit()
             st.success("Anotação salva com sucesso!")
-            st.experimental_rerun()
+            st.rerun()
 
-    # Exibição das anotações existentes
-    if not anotacoes.empty:
+    # 🔎 Busca textual (FTS5): termos por prefixo, resultados por relevância
+    busca = st.text_input("🔍 Buscar nas anotações", key="busca_anotacoes",
+                          placeholder="Palavras do título ou do conteúdo")
+    if busca.strip():
+        anotacoes = buscar_anotacoes(banco, usuario['id'], busca)
+        if anotacoes.empty:
+            st.info("Nenhuma anotação encontrada.")
         for _, row in anotacoes.iterrows():
-            with st.expander(f"📝 {row['titulo']} ({row['data']})"):
-                st.write(row['conteudo'])
-
-                col1, col2 = st.columns([1, 1])
-                with col1:
-                    if st.button("✏️ Editar", key=f"edit_btn_{row['id']}"):
-                        novo_conteudo = st.text_area("Editar conteúdo", value=row['conteudo'], key=f"edit_txt_{row['id']}")
-                        if st.button("Salvar edição", key=f"save_edit_{row['id']}"):
-                            cursor.execute(
-                                "UPDATE anotacoes SET conteudo = ? WHERE id = ?",
-                                (novo_conteudo, row['id'])
-                            )
-                            conn.commit()
-                            st.success("Anotação atualizada com sucesso!")
-                            st.experimental_rerun()
-
-                with col2:
-                    if st.button("🗑️ Excluir", key=f"del_btn_{row['id']}"):
-                        cursor.execute("DELETE FROM anotacoes WHERE id = ?", (row['id'],))
-                        conn.commit()
-                        st.warning("Anotação excluída!")
-                        st.experimental_rerun()
+            # O trecho só acrescenta algo quando o termo aparece no conteúdo
+            trecho = destacar(row['trecho']) if INICIO_DESTAQUE in str(row['trecho']) else None
+            exibir_anotacao(usuario, row, destacar(row['titulo_destacado']), trecho)
+        return
+
+    # Sem busca, apenas as mais recentes
+    anotacoes = banco.consultar(
+        "SELECT id, titulo, conteudo, data FROM anotacoes WHERE usuario_id = ? ORDER BY data DESC LIMIT ?",
+        (usuario['id'], ANOTACOES_RECENTES + 1), usuario['id']
+    )
+    for _, row in anotacoes.head(ANOTACOES_RECENTES).iterrows():
+        exibir_anotacao(usuario, row, row['titulo'])
+    if len(anotacoes) > ANOTACOES_RECENTES:
+        st.caption(f"Exibindo as {ANOTACOES_RECENTES} anotações mais recentes. Use a busca para encontrar as demais.")
+
+
+def exibir_anotacao(usuario, row, titulo, trecho=None):
+    with st.expander(f"📝 {titulo} ({row['data']})"):
+        if trecho:
+            st.markdown(f"> {trecho}")
+        st.write(row['conteudo'])
+
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            if st.button("✏️ Editar", key=f"edit_btn_{row['id']}"):
+                novo_conteudo = st.text_area("Editar conteúdo", value=row['conteudo'], key=f"edit_txt_{row['id']}")
+                if st.button("Salvar edição", key=f"save_edit_{row['id']}"):
+                    banco.gravar(
+                        "UPDATE anotacoes SET conteudo = ? WHERE id = ?",
+                        (novo_conteudo, row['id']), usuario['id']
+                    )
+                    st.success("Anotação atualizada com sucesso!")
+                    st.rerun()
+
+        with col2:
+            if st.button("🗑️ Excluir", key=f"del_btn_{row['id']}"):
+                banco.gravar("DELETE FROM anotacoes WHERE id = ?", (row['id'],), usuario['id'])
+                st.warning("Anotação excluída!")
+                st.rerun()
 # ---------------------- BLOCO PAINEL ADMINISTRATIVO: VISUALIZAÇÃO E EXPORTAÇÃO GLOBAL DE ANÁLISES ----------------------
 def painel_admin():
+    from centesimais.busca import buscar_amostras, destacar
+    from centesimais.painel import TAMANHO_PAGINA, FiltrosAnalises, pagina_analises, resumo_parametros, tendencia_mensal
+
     st.title("🔐 Painel do Administrador")
     st.subheader("📊 Visualização Geral de Todas as Análises")
 
-    df = pd.read_sql_query("SELECT * FROM analises ORDER BY data DESC", conn)
+    cache = banco.cache.estatisticas()
+    st.sidebar.caption(
+        f"🗄️ Cache de consultas: {cache['acertos']} acertos / {cache['falhas']} falhas "
+        f"({cache['taxa_acerto']:.0%}) · {cache['entradas']} entradas · {cache['bytes'] / 1e6:.1f} MB"
+    )
+    senhas = obter_pool().estatisticas()
+    st.sidebar.caption(
+        f"🔑 bcrypt (custo {senhas['custo']}): {senhas['em_fila']} na fila · {senhas['em_execucao']} em execução · "
+        f"pico {senhas['maior_fila']} · espera média {senhas['espera_media'] * 1000:.0f} ms · "
+        f"{senhas['recusadas']} recusadas"
+    )
+    fila = banco.fila.estatisticas()
+    st.sidebar.caption(
+        f"✍️ Escrita em grupo: {fila['comandos']} gravações em {fila['lotes']} commits · "
+        f"lote médio {fila['lote_medio']:.1f} (máx. {fila['maior_lote']}) · "
+        f"commit {fila['commit_mediano'] * 1000:.1f} ms (p95 {fila['commit_p95'] * 1000:.1f} ms) · "
+        f"{fila['em_fila']} na fila"
+    )
+    retrato = banco.instantaneo.obter()  # None até o primeiro ser publicado: o painel usa o resumo_diario
+    gestor = banco.instantaneo.estatisticas()
+    st.sidebar.caption(
+        (f"🧊 Instantâneo do painel: versão {retrato.versao} · {retrato.linhas} análises · "
+         f"{retrato.bytes / 1e6:.1f} MB mapeados · de {datetime.fromtimestamp(retrato.criado_em):%H:%M:%S}"
+         if retrato is not None else "🧊 Instantâneo do painel: ainda não gerado; resumo pelo rollup diário")
+        + (" · atualizando..." if gestor['gerando'] else "")
+        + (f" · erro na última atualização: {gestor['ultimo_erro']}" if gestor['ultimo_erro'] else "")
+    )
 
-    if df.empty:
-        st.info("Nenhuma análise registrada no sistema.")
+    # 🔎 Filtros aplicados no SQL
+    usuarios = banco.consultar("SELECT id, nome, email FROM usuarios ORDER BY nome")
+    parametros = banco.consultar("SELECT DISTINCT parametro FROM analises WHERE parametro IS NOT NULL ORDER BY parametro")
+    col1, col2 = st.columns(2)
+    with col1:
+        busca = st.text_input("🔍 Nome da amostra", key="busca_admin", placeholder="Início das palavras do nome")
+        usuario_id = st.selectbox(
+            "Usuário", [None, *usuarios['id'].tolist()], key="filtro_usuario_admin",
+            format_func=lambda id_: "Todos" if id_ is None else
+            "{nome} ({email})".format(**usuarios.loc[usuarios['id'] == id_].iloc[0])
+        )
+    with col2:
+        parametro = st.selectbox("Parâmetro", [None, *parametros['parametro'].tolist()], key="filtro_parametro_admin",
+                                 format_func=lambda p: "Todos" if p is None else p)
+        periodo = st.date_input("Período", value=(), key="filtro_periodo_admin")
+    data_inicio = periodo[0] if len(periodo) > 0 else None
+    data_fim = periodo[1] if len(periodo) > 1 else data_inicio
+
+    filtros = FiltrosAnalises(busca, parametro, usuario_id, data_inicio, data_fim)
+
+    # Amostras mais relevantes para a busca, com os termos destacados
+    if busca.strip():
+        amostras = buscar_amostras(banco, busca, usuario_id, limite=10)
+        with st.expander(f"🧫 Amostras encontradas ({len(amostras)}{'+' if len(amostras) == 10 else ''})",
+                         expanded=True):
+            if amostras.empty:
+                st.caption("Nenhuma amostra com esse nome.")
+            for _, amostra in amostras.iterrows():
+                st.markdown(f"{destacar(amostra['destaque'])} — {amostra['usuario'] or 'usuário removido'} · "
+                            f"{amostra['analises']} análise(s), última em {amostra['ultima_analise']}")
+
+    # 📄 Paginação por chave (data, id): a pilha guarda o início de cada página visitada
+    if st.session_state.get("admin_filtros") != filtros:
+        st.session_state["admin_filtros"] = filtros
+        st.session_state["admin_paginas"] = [None]
+    paginas = st.session_state["admin_paginas"]
+
+    df, proxima = pagina_analises(banco, filtros, paginas[-1])
+    if df.empty and len(paginas) == 1:
+        st.info("Nenhuma análise encontrada." if filtros != FiltrosAnalises() else "Nenhuma análise registrada no sistema.")
         return
 
-    st.dataframe(df, use_container_width=True)
+    st.dataframe(df, use_container_width=True, hide_index=True)
 
-    # 🔎 Filtro por nome de amostra
-    st.subheader("🔍 Buscar por Nome da Amostra")
-    busca = st.text_input("Digite parte do nome da amostra", key="busca_admin")
-    if busca:
-        df_filtrado = df[df['nome_amostra'].str.contains(busca, case=False)]
-        st.dataframe(df_filtrado, use_container_width=True)
+    col_anterior, col_pagina, col_proxima = st.columns([1, 2, 1])
+    with col_anterior:
+        if st.button("⬅️ Anterior", key="admin_anterior", disabled=len(paginas) == 1):
+            paginas.pop()
+            st.rerun()
+    with col_pagina:
+        st.caption(f"Página {len(paginas)} · {TAMANHO_PAGINA} análises por página")
+    with col_proxima:
+        if st.button("Próxima ➡️", key="admin_proxima", disabled=proxima is None) and proxima is not None:
+            paginas.append(proxima)
+            st.rerun()
 
-    # 📥 Exportações
-    st.subheader("📁 Exportar Todos os Dados")
+    # 📥 Exportações (usuário e parâmetro selecionados)
+    st.subheader("📁 Exportar Dados")
+    chave = f"admin_{usuario_id}_{parametro}"
     col1, col2 = st.columns(2)
     with col1:
-        st.download_button(
-            label="📥 Baixar Excel",
-            data=converter_excel(df),
-            file_name="analises_geral_admin.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        baixar_relatorio(chave, "excel", "analises_geral_admin.xlsx", usuario_id=usuario_id, parametro=parametro)
     with col2:
-        st.download_button(
-            label="📥 Baixar PDF",
-            data=converter_pdf(df),
-            file_name="analises_geral_admin.pdf",
-            mime="application/pdf"
-        )
+        baixar_relatorio(chave, "pdf", "analises_geral_admin.pdf", usuario_id=usuario_id, parametro=parametro,
+                         titulo="Relatório Geral de Análises")
+    with st.expander("📦 Pacote de fim de semestre: um relatório por usuário × parâmetro"):
+        st.caption("Um PDF e um Excel por combinação, gerados em paralelo e reunidos num ZIP."
+                   + (" Restrito ao usuário selecionado." if usuario_id is not None else ""))
+        baixar_pacote(f"admin_{usuario_id}", "relatorios_laboratorio.zip", usuario_id=usuario_id)
 
     # 📈 Estatísticas por tipo de análise
     st.subheader("📊 Resumo Estatístico por Tipo de Análise")
-    resumo = df.groupby("parametro")["media"].agg(['count', 'mean', 'std']).reset_index()
-    resumo.columns = ["Análise", "Total", "Média Geral", "Desvio Padrão"]
-    st.dataframe(resumo, use_container_width=True)
- 
+    if retrato is not None:
+        st.caption("Resumo e tendência calculados sobre o instantâneo do painel, atualizado "
+                   f"a cada {banco.instantaneo.intervalo:.0f} s enquanto houver alterações.")
+    else:
+        st.caption("Resumo e tendência calculados no rollup diário do banco enquanto o instantâneo é gerado.")
+    st.dataframe(resumo_parametros(banco, filtros, retrato), use_container_width=True, hide_index=True)
+
+    st.subheader("📈 Tendência Mensal das Médias")
+    tendencia = tendencia_mensal(banco, filtros, retrato)
+    if tendencia.empty:
+        st.caption("Sem análises no período selecionado.")
+    else:
+        st.line_chart(tendencia)
+
+# ---------------------- BLOCO CONTROLE DE QUALIDADE: REPLICATAS DISCREPANTES ----------------------
+def controle_qualidade():
+    from centesimais.discrepantes import CONFIANCA_PADRAO, CONFIANCAS, suspeitas, ultima_varredura, varrer
+
+    st.title("🧪 Controle de Qualidade")
+    st.subheader("🔬 Replicatas Discrepantes")
+    st.caption("Teste Q de Dixon nas triplicatas e teste de Grubbs nas análises com 4 a 10 replicatas, "
+               "sobre todas as análises gravadas. Duplicatas não têm teste possível.")
+
+    confianca = st.selectbox("Nível de confiança", CONFIANCAS, index=CONFIANCAS.index(CONFIANCA_PADRAO),
+                             format_func="{:.0%}".format, key="confianca_varredura")
+    if st.button("▶️ Executar varredura", key="btn_varredura"):
+        with banco.leitura() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM analises WHERE n_replicatas >= 3").fetchone()[0]
+        barra = st.progress(0.0, text="Testando replicatas...")
+        resultado = varrer(banco, confianca,
+                           progresso=lambda testadas: barra.progress(min(testadas / max(total, 1), 1.0),
+                                                                     text=f"{testadas}/{total} análises testadas"))
+        barra.empty()
+        st.success(f"{resultado.analises_testadas} análises testadas em {resultado.segundos:.2f}s: "
+                   f"{resultado.suspeitas} replicata(s) suspeita(s).")
+
+    ultima = ultima_varredura(banco)
+    if ultima is None:
+        st.info("Nenhuma varredura executada ainda. Use o botão acima ou `python -m centesimais discrepantes`.")
+        return
+    st.caption(f"Última varredura: {ultima['executada_em']} · {ultima['confianca']:.0%} de confiança · "
+               f"{ultima['analises_testadas']} análises testadas · {ultima['suspeitas']} suspeita(s). "
+               "Análises excluídas ou com replicata adicionada depois dela saem da lista.")
+
+    df = suspeitas(banco)
+    if df.empty:
+        st.success("Nenhuma replicata suspeita.")
+        return
+    st.dataframe(df.rename(columns={
+        'usuario': 'Usuário',
+        'amostra': 'Amostra',
+        'parametro': 'Análise',
+        'replicatas': 'Replicatas',
+        'teste': 'Teste',
+        'posicao': 'Replicata Suspeita',
+        'valor': 'Valor Suspeito',
+        'estatistica': 'Q / G',
+        'critico': 'Crítico',
+        'media': 'Média',
+        'data': 'Data'
+    }), use_container_width=True, hide_index=True)
+
+# ---------------------- BLOCO CARTAS DE CONTROLE: MATERIAIS DE REFERÊNCIA (SHEWHART) ----------------------
+def cartas_controle():
+    from centesimais.controle import JANELA, MINIMO_PONTOS, carta, designar_controle, listar_controles, remover_controle
+
+    st.title("📉 Cartas de Controle")
+    st.caption(f"Cada análise de um material de controle vira um ponto da carta do seu parâmetro, com linha central "
+               f"e limites das {JANELA} análises anteriores (a partir de {MINIMO_PONTOS}) e as regras de Western "
+               "Electric avaliadas na gravação.")
+
+    with st.expander("➕ Marcar amostra como material de controle"):
+        nome_controle = st.text_input("Nome da amostra (exatamente como gravado nas análises)", key="controle_nome")
+        descricao = st.text_input("Descrição (opcional)", key="controle_descricao",
+                                  placeholder="Ex.: MRC leite em pó, lote 2024/03")
+        if st.button("Marcar como controle", key="btn_designar_controle"):
+            if not nome_controle.strip():
+                st.warning("Informe o nome da amostra.")
+            else:
+                pontos = designar_controle(banco, nome_controle.strip(), descricao.strip())
+                st.success(f"'{nome_controle.strip()}' marcada como controle: {pontos} análise(s) já gravada(s) na carta.")
+
+    controles = listar_controles(banco)
+    if controles.empty:
+        st.info("Nenhum material de controle marcado.")
+        return
+    st.dataframe(controles.rename(columns={
+        'nome_amostra': 'Controle',
+        'descricao': 'Descrição',
+        'parametro': 'Análise',
+        'pontos': 'Pontos',
+        'violacoes': 'Violações',
+        'ultimo_ponto': 'Último Ponto'
+    }), use_container_width=True, hide_index=True)
+
+    series = controles.dropna(subset=['parametro'])
+    if not series.empty:
+        col1, col2 = st.columns(2)
+        with col1:
+            nome = st.selectbox("Controle", series['nome_amostra'].unique().tolist(), key="carta_controle")
+        with col2:
+            parametro = st.selectbox("Análise", series.loc[series['nome_amostra'] == nome, 'parametro'].tolist(),
+                                     key="carta_parametro")
+        df = carta(banco, parametro, nome)
+        st.line_chart(df.set_index('seq')[['valor', 'linha_central', '+2σ', '-2σ', '+3σ', '-3σ']].rename(
+            columns={'valor': 'Resultado', 'linha_central': 'Linha central'}))
+        violacoes = df[df['regras'] > 0]
+        if violacoes.empty:
+            st.success("Nenhuma regra violada nesta carta.")
+        else:
+            st.dataframe(violacoes[['seq', 'data', 'usuario', 'valor', 'linha_central', 'desvio', 'violacoes']].rename(
+                columns={'seq': 'Ponto', 'data': 'Data', 'usuario': 'Usuário', 'valor': 'Resultado',
+                         'linha_central': 'Linha Central', 'desvio': 'DP', 'violacoes': 'Regras Violadas'}
+            ), use_container_width=True, hide_index=True)
+
+    with st.expander("🗑️ Desmarcar material de controle"):
+        remover = st.selectbox("Controle", controles['nome_amostra'].unique().tolist(), key="controle_remover")
+        if st.button("Desmarcar", key="btn_remover_controle"):
+            remover_controle(banco, remover)
+            st.warning(f"'{remover}' deixou de ser controle; as análises continuam gravadas.")
+            st.rerun()
+
+# ---------------------- BLOCO 10: EXECUÇÃO PRINCIPAL DO SISTEMA ----------------------
+# Fica ao final do script para que todas as telas já estejam definidas quando o Streamlit o executar
+if __name__ == "__main__":
+    tela_autenticacao()
@@ -0,0 +1,165 @@
+"""Teste de carga da API HTTP (centesimais.api) contra uma instância local.
+
+Gera um banco sintético (``gerador.gerar_banco``), sobe ``python -m
+centesimais api`` num processo à parte e, com ``--clientes`` requisições em
+paralelo por ``--segundos`` em cada rota, mede requisições por segundo e a
+latência mediana e p95 de:
+
+* ``GET /analises`` percorrendo as páginas pelo cursor ``proxima``;
+* ``GET /composicao`` percorrendo as páginas;
+* ``POST /analises`` com lotes de ``--lote`` análises.
+
+Cliente e servidor dividem a mesma máquina; os números são um piso.
+
+    python benchmarks/bench_api.py [--analises 20000] [--clientes 16] [--segundos 5] [--lote 100]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gerador import PARAMETROS, SENHA, gerar_banco  # noqa: E402
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def aguardar(url: str, processo, limite: float = 30.0):
+    cliente = AsyncHTTPClient()
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        if processo.poll() is not None:
+            sys.exit(f"servidor terminou com código {processo.returncode}")
+        try:
+            await cliente.fetch(url + "/analises", raise_error=False, request_timeout=1)
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    sys.exit("servidor não respondeu a tempo")
+
+
+async def token(url: str, email: str) -> str:
+    resposta = await AsyncHTTPClient().fetch(url + "/token", method="POST",
+                                             body=json.dumps({"email": email, "senha": SENHA}))
+    return json.loads(resposta.body)["token"]
+
+
+def lote_analises(rng: random.Random, tamanho: int) -> str:
+    itens = []
+    for _ in range(tamanho):
+        valor = rng.uniform(1, 60)
+        itens.append({"amostra": f"LIMS {rng.randrange(10_000):05d}", "parametro": rng.choice(PARAMETROS),
+                      "replicatas": [round(valor * rng.gauss(1, 0.01), 4) for _ in range(rng.choice((2, 3, 3, 3, 5)))]})
+    return json.dumps({"analises": itens})
+
+
+async def carga(nome: str, requisicao, clientes: int, segundos: float) -> dict:
+    """``clientes`` laços chamando ``requisicao(estado)`` até o prazo; cada laço guarda seu cursor em ``estado``."""
+    latencias, erros = [], []
+    fim = time.perf_counter() + segundos
+
+    async def laco(i):
+        estado = {"rng": random.Random(i), "cursor": None}
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            try:
+                await requisicao(estado)
+            except HTTPClientError as erro:
+                erros.append(f"{erro.code} {erro.response.body[:200] if erro.response else ''}")
+                continue
+            latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(laco(i) for i in range(clientes)))
+    duracao = time.perf_counter() - inicio
+    latencias.sort()
+    return {"nome": nome, "requisicoes": len(latencias), "por_segundo": len(latencias) / duracao, "erros": erros,
+            "mediana": statistics.median(latencias) if latencias else float("nan"),
+            "p95": latencias[int(0.95 * (len(latencias) - 1))] if latencias else float("nan")}
+
+
+async def medir(url: str, args) -> list:
+    AsyncHTTPClient.configure(None, max_clients=args.clientes)
+    cliente = AsyncHTTPClient()
+    cabecalho = {"Authorization": f"Bearer {await token(url, 'analista0002@lab.exemplo')}"}
+
+    def paginas(rota):
+        async def requisicao(estado):
+            endereco = f"{url}/{rota}?limite={args.limite}"
+            if estado["cursor"]:
+                endereco += f"&cursor={estado['cursor']}"
+            resposta = await cliente.fetch(endereco, headers=cabecalho)
+            estado["cursor"] = json.loads(resposta.body)["proxima"]  # None na última: recomeça
+        return requisicao
+
+    async def enviar(estado):
+        await cliente.fetch(url + "/analises", method="POST", headers=cabecalho,
+                            body=lote_analises(estado["rng"], args.lote))
+
+    resultados = []
+    for nome, requisicao in ((f"GET /analises ({args.limite}/página)", paginas("analises")),
+                             (f"GET /composicao ({args.limite}/página)", paginas("composicao")),
+                             (f"POST /analises ({args.lote}/lote)", enviar)):
+        resultados.append(await carga(nome, requisicao, args.clientes, args.segundos))
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--analises", type=int, default=20_000, help="tamanho do banco sintético")
+    parser.add_argument("--clientes", type=int, default=16, help="requisições simultâneas")
+    parser.add_argument("--segundos", type=float, default=5.0, help="duração de cada rota")
+    parser.add_argument("--limite", type=int, default=100, help="itens por página nos GET")
+    parser.add_argument("--lote", type=int, default=100, help="análises por POST")
+    parser.add_argument("--trabalhadores", type=int, default=8, help="threads de consulta do servidor")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = Path(pasta) / "banco.db"
+        gerado = gerar_banco(caminho, args.analises)
+        porta = porta_livre()
+        url = f"http://127.0.0.1:{porta}/api/v1"
+        processo = subprocess.Popen(
+            [sys.executable, "-m", "centesimais", "--banco", str(caminho), "api", "--porta", str(porta),
+             "--trabalhadores", str(args.trabalhadores)],
+            cwd=RAIZ, stdout=subprocess.DEVNULL,
+        )
+        try:
+            asyncio.run(aguardar(url, processo))
+            resultados = asyncio.run(medir(url, args))
+        finally:
+            processo.terminate()
+            processo.wait(10)
+
+    print(f"{gerado['analises']} análises, {gerado['amostras']} amostras; {args.clientes} clientes simultâneos, "
+          f"{args.trabalhadores} threads no servidor, {args.segundos:.0f}s por rota")
+    falhou = False
+    for r in resultados:
+        print(f"{r['nome']:>30}: {r['por_segundo']:>8,.0f} req/s  mediana {r['mediana'] * 1000:7.2f} ms  "
+              f"p95 {r['p95'] * 1000:7.2f} ms  ({r['requisicoes']} requisições)")
+        for erro in r["erros"][:5]:
+            print("ERRO", erro)
+        falhou |= bool(r["erros"]) or not r["requisicoes"]
+    if falhou:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
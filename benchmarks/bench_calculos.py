@@ -0,0 +1,74 @@
+"""Vazão do motor vetorizado (centesimais.calculos) de 10^3 a 10^6 amostras.
+
+Compara o cálculo de proteínas Kjeldahl + estatísticas em uma passada NumPy
+com o laço replicata a replicata usado antes nos formulários.
+
+    python benchmarks/bench_calculos.py [--replicatas 3] [--max 1000000]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from centesimais import calculos  # noqa: E402
+
+LIMITE_LACO = 100_000  # acima disso o laço em Python puro leva minutos
+
+
+def gerar_leituras(n_amostras: int, n_replicatas: int, semente: int = 42) -> dict:
+    rng = np.random.default_rng(semente)
+    forma = (n_amostras, n_replicatas)
+    return {
+        "volume_hcl": rng.uniform(5, 25, forma),
+        "volume_branco": rng.uniform(0.1, 0.3, forma),
+        "normalidade": np.full(forma, 0.1),
+        "peso_amostra": rng.uniform(0.2, 1.0, forma),
+    }
+
+
+def laco_python(leituras: dict):
+    resultados = []
+    for hcl, branco, normalidade, peso in zip(*(leituras[c].tolist() for c in calculos.CAMPOS["Proteínas"])):
+        triplicata = [
+            round(((h - b) * n * 14.007) / (p * 1000) * 6.25, 2) if p > 0 else 0
+            for h, b, n, p in zip(hcl, branco, normalidade, peso)
+        ]
+        media = round(sum(triplicata) / len(triplicata), 2)
+        desvio = round(statistics.stdev(triplicata), 2)
+        resultados.append((media, desvio, round(desvio / media * 100, 2) if media else 0.0))
+    return resultados
+
+
+def cronometrar(funcao, *args) -> float:
+    inicio = time.perf_counter()
+    funcao(*args)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--replicatas", type=int, default=3)
+    parser.add_argument("--max", type=int, default=1_000_000, help="maior número de amostras")
+    args = parser.parse_args()
+
+    print(f"{'amostras':>10} {'vetorizado (s)':>15} {'amostras/s':>14} {'laço (s)':>10} {'ganho':>8}")
+    n = 1_000
+    while n <= args.max:
+        leituras = gerar_leituras(n, args.replicatas)
+        vetorizado = cronometrar(calculos.calcular, "Proteínas", leituras)
+        linha = f"{n:>10,} {vetorizado:>15.4f} {n / vetorizado:>14,.0f}"
+        if n <= LIMITE_LACO:
+            laco = cronometrar(laco_python, leituras)
+            linha += f" {laco:>10.3f} {laco / vetorizado:>7.0f}x"
+        print(linha)
+        n *= 10
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Excel × Parquet × Arrow IPC: exportação, leitura no pandas e importação de volta.
+
+Gera um banco sintético (``gerador.gerar_banco``) e, para cada formato,
+mede o tempo e o tamanho da exportação de todas as análises e o tempo para o
+consumidor carregar o resultado num DataFrame (``pd.read_excel`` ×
+``pd.read_parquet`` × Arrow IPC mapeado em memória). Por fim importa o
+Parquet num banco vazio (``centesimais.colunar.importar_colunar``) e confere
+que as análises, com as replicatas, voltaram iguais (a média, o desvio e o CV
+são recalculados na importação; o gerador os grava com outra precisão).
+
+    python benchmarks/bench_colunar.py [--analises 100000] [--sem-excel]
+"""
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gerador import gerar_banco  # noqa: E402
+from centesimais.colunar import exportar_colunar, importar_colunar  # noqa: E402
+from centesimais.conexao import BancoDados  # noqa: E402
+from centesimais.relatorios import exportar_excel  # noqa: E402
+
+SQL_COMPARAR = """
+    SELECT usuario_id, nome_amostra, parametro, valor1, valor2, valor3, CASE WHEN replicatas IS NULL THEN media END,
+           data, replicatas, n_replicatas
+    FROM analises ORDER BY usuario_id, nome_amostra, parametro, data, replicatas, media
+"""
+
+
+def tamanho(caminho: Path) -> int:
+    if caminho.is_file():
+        return caminho.stat().st_size
+    return sum(arquivo.stat().st_size for arquivo in caminho.rglob("*") if arquivo.is_file())
+
+
+def ler_arrow(pasta: Path) -> pd.DataFrame:
+    tabelas = []
+    for arquivo in sorted(pasta.rglob("*.arrow")):
+        with pa.memory_map(str(arquivo)) as mapa:
+            tabelas.append(pa.ipc.open_file(mapa).read_all())
+    return pa.concat_tables(tabelas).to_pandas()
+
+
+def cronometrar(funcao, *args):
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--analises", type=int, default=100_000)
+    parser.add_argument("--sem-excel", action="store_true", help="pula o Excel (lento em bancos grandes)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        pasta = Path(pasta)
+        gerar_banco(pasta / "banco.db", args.analises, usuarios=5)
+        banco = BancoDados(pasta / "banco.db")
+
+        linhas = []
+        if not args.sem_excel:
+            caminho, exportacao = cronometrar(exportar_excel, banco)
+            df, leitura = cronometrar(lambda: pd.read_excel(caminho, sheet_name=None))
+            linhas.append(("Excel (xlsx)", exportacao, tamanho(caminho), leitura))
+            caminho.unlink()
+        for formato, leitor in (("parquet", pd.read_parquet), ("arrow", ler_arrow)):
+            destino = pasta / f"analises.{formato}"
+            _, exportacao = cronometrar(exportar_colunar, banco, destino, formato)
+            df, leitura = cronometrar(leitor, destino)
+            assert len(df) == args.analises, (formato, len(df))
+            linhas.append((f"{formato.capitalize()} (por parâmetro)", exportacao, tamanho(destino), leitura))
+        banco.fechar()
+
+        novo = BancoDados(pasta / "novo.db")
+        with novo.escrita() as conn:
+            conn.executemany("INSERT INTO usuarios (id, nome, email, senha_hash) VALUES (?, ?, ?, ?)",
+                             [(i, f"U{i}", f"u{i}@lab.exemplo", "-") for i in range(1, 6)])
+        resultado = importar_colunar(novo, pasta / "analises.parquet")
+        novo.fechar()
+        iguais = (sqlite3.connect(pasta / "banco.db").execute(SQL_COMPARAR).fetchall()
+                  == sqlite3.connect(pasta / "novo.db").execute(SQL_COMPARAR).fetchall())
+
+    print(f"{args.analises} análises")
+    print(f"{'formato':>24}  {'exportação':>10}  {'tamanho':>10}  {'leitura (pandas)':>16}")
+    for nome, exportacao, bytes_, leitura in linhas:
+        print(f"{nome:>24}  {exportacao:>9.2f}s  {bytes_ / 1e6:>7.1f} MB  {leitura:>15.2f}s")
+    print(f"importação do Parquet: {resultado.analises_inseridas} análises em {resultado.segundos:.2f}s "
+          f"({resultado.analises_inseridas / resultado.segundos:,.0f}/s, com os gatilhos das tabelas derivadas); "
+          f"idênticas ao original: {'sim' if iguais else 'NÃO'}")
+    if not iguais or len(resultado.rejeitadas):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
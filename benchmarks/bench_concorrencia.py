@@ -0,0 +1,82 @@
+"""Teste de carga concorrente do gerenciador de conexões (centesimais.conexao).
+
+Dezenas de threads salvam análises e leem a composição ao mesmo tempo, como
+várias sessões Streamlit. Ao final confere se todas as linhas foram gravadas
+e se nenhuma thread recebeu "database is locked" ou estado de cursor trocado.
+
+    python benchmarks/bench_concorrencia.py [--threads 48] [--analises 50]
+"""
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from centesimais.composicao import carregar_composicao  # noqa: E402
+from centesimais.conexao import BancoDados  # noqa: E402
+
+PARAMETROS = ("Umidade", "Cinzas", "Proteínas", "Lipídios", "Fibras Totais")
+
+
+def sessao(banco, usuario_id, n_analises, erros, barreira):
+    barreira.wait()
+    try:
+        for i in range(n_analises):
+            parametro = PARAMETROS[i % len(PARAMETROS)]
+            with banco.escrita() as conn:
+                conn.execute(
+                    """
+                    INSERT INTO analises (usuario_id, nome_amostra, parametro, valor1, valor2, valor3, media, desvio_padrao, coef_var, data)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (usuario_id, f"Amostra {i // len(PARAMETROS)}", parametro, 10.0, 10.2, 9.8, 10.0, 0.2, 2.0,
+                     datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                )
+            with banco.leitura() as conn:
+                carregar_composicao(conn, usuario_id)
+                conn.execute("SELECT COUNT(*) FROM analises WHERE usuario_id = ?", (usuario_id,)).fetchone()
+    except Exception as erro:  # registra e segue: o objetivo é contar falhas
+        erros.append(f"usuário {usuario_id}: {erro!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=48)
+    parser.add_argument("--analises", type=int, default=50, help="análises salvas por thread")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        banco = BancoDados(Path(pasta) / "banco.db")
+        erros = []
+        barreira = threading.Barrier(args.threads)
+        threads = [
+            threading.Thread(target=sessao, args=(banco, usuario_id, args.analises, erros, barreira))
+            for usuario_id in range(1, args.threads + 1)
+        ]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        segundos = time.perf_counter() - inicio
+
+        with banco.leitura() as conn:
+            gravadas = conn.execute("SELECT COUNT(*) FROM analises").fetchone()[0]
+        banco.fechar()
+
+    esperadas = args.threads * args.analises
+    print(f"threads: {args.threads}  análises gravadas: {gravadas}/{esperadas}  "
+          f"tempo: {segundos:.2f} s  ({gravadas / segundos:,.0f} gravações/s)")
+    for erro in erros[:10]:
+        print("ERRO", erro)
+    if erros or gravadas != esperadas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Vazão da varredura de replicatas discrepantes (centesimais.discrepantes).
+
+Mede ``varrer`` sobre todas as análises de um banco sintético
+(``benchmarks/gerador.py``) e compara o teste vetorizado com o mesmo teste
+chamado análise por análise, numa amostra das linhas.
+
+    python benchmarks/bench_discrepantes.py [--analises 1M] [--banco banco_1M.db] [--amostra 20000]
+
+Com ``--banco`` o banco é gerado uma vez naquele arquivo e reaproveitado.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from gerador import escala, gerar_banco
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from centesimais.conexao import BancoDados  # noqa: E402
+from centesimais.discrepantes import testar, varrer  # noqa: E402
+from centesimais.replicatas import desempacotar  # noqa: E402
+
+
+def por_analise(banco, limite: int) -> tuple:
+    """(análises, segundos) testando uma análise por vez, como um laço em Python faria."""
+    with banco.leitura() as conn:
+        linhas = conn.execute("SELECT replicatas FROM analises WHERE n_replicatas >= 3 LIMIT ?", (limite,)).fetchall()
+    inicio = time.perf_counter()
+    for blob, in linhas:
+        testar([desempacotar(blob)])
+    return len(linhas), time.perf_counter() - inicio
+
+
+def medir(caminho: Path, amostra: int):
+    banco = BancoDados(caminho)
+    try:
+        varrer(banco)  # aquecimento: páginas do SQLite no cache do sistema
+        resultado = varrer(banco)
+        print(f"vetorizado: {resultado.analises_testadas} análises em {resultado.segundos:.2f}s "
+              f"({resultado.analises_por_segundo:,.0f}/s), {resultado.suspeitas} suspeitas {resultado.por_teste}")
+        n, segundos = por_analise(banco, amostra)
+        print(f"por análise: {n} análises em {segundos:.2f}s ({n / segundos:,.0f}/s), "
+              f"{resultado.analises_por_segundo / (n / segundos):,.0f}× mais lento")
+    finally:
+        banco.fechar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--analises", type=escala, default=escala("100k"), help="10k, 100k, 1M ou um número")
+    parser.add_argument("--banco", type=Path, default=None)
+    parser.add_argument("--amostra", type=int, default=20_000, help="análises do laço análise por análise")
+    args = parser.parse_args()
+
+    if args.banco is not None:
+        if not args.banco.exists():
+            gerar_banco(args.banco, args.analises)
+        medir(args.banco, args.amostra)
+        return
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = Path(pasta) / "banco.db"
+        gerar_banco(caminho, args.analises)
+        medir(caminho, args.amostra)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Pico de memória (RSS) da exportação Excel: DataFrame + BytesIO × write_only em fluxo.
+
+Para cada tamanho gera um banco temporário com N análises e mede, em um
+processo filho separado por método, o pico de RSS e o tempo de exportação:
+
+* ``dataframe``: o caminho antigo (``pd.read_sql_query`` + ``df.to_excel`` num
+  ``BytesIO`` + ``getvalue()``), com três cópias dos dados na memória;
+* ``fluxo``: ``centesimais.relatorios.escrever_excel`` (cursor em blocos,
+  pasta ``write_only``, uma aba por parâmetro, arquivo em disco).
+
+    python benchmarks/bench_excel.py [--linhas 10000 100000 1000000] [--metodos dataframe fluxo]
+"""
+
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from centesimais.conexao import BancoDados  # noqa: E402
+from centesimais.relatorios import ORDEM_PARAMETRO, sql_relatorio  # noqa: E402
+
+PARAMETROS = ("Umidade", "Cinzas", "Proteínas", "Lipídios", "Fibras Totais")
+
+
+def gerar_banco(caminho: Path, linhas: int):
+    banco = BancoDados(caminho)
+    registros = (
+        (1, f"Amostra {i // len(PARAMETROS)}", PARAMETROS[i % len(PARAMETROS)],
+         10.0, 10.2, 9.8, 10.0, 0.2, 2.0, f"2024-01-{1 + i % 28:02d} 12:00:00")
+        for i in range(linhas)
+    )
+    with banco.escrita() as conn:
+        conn.executemany(
+            """
+            INSERT INTO analises (usuario_id, nome_amostra, parametro, valor1, valor2, valor3, media, desvio_padrao, coef_var, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            registros
+        )
+    banco.fechar()
+
+
+def executar(metodo: str, caminho_banco: str, destino: str):
+    """Roda dentro do processo filho e imprime "pico_kb base_kb segundos"."""
+    import sqlite3
+    from io import BytesIO
+
+    import pandas as pd
+    from openpyxl import Workbook  # noqa: F401 - entra na linha de base dos dois métodos
+
+    from centesimais.relatorios import escrever_excel
+
+    conn = sqlite3.connect(caminho_banco)
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    inicio = time.perf_counter()
+    if metodo == "dataframe":
+        df = pd.read_sql_query("SELECT * FROM analises WHERE usuario_id = ?", conn, params=(1,))
+        saida = BytesIO()
+        with pd.ExcelWriter(saida, engine="openpyxl") as escritor:
+            df.to_excel(escritor, index=False, sheet_name="Análises")
+        Path(destino).write_bytes(saida.getvalue())
+    else:
+        sql, params = sql_relatorio(1, ordem=ORDEM_PARAMETRO)
+        escrever_excel(conn.execute(sql, params), destino)
+    segundos = time.perf_counter() - inicio
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(pico, base, f"{segundos:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--metodos", nargs="+", choices=("dataframe", "fluxo"), default=["dataframe", "fluxo"])
+    parser.add_argument("--executar", nargs=3, metavar=("METODO", "BANCO", "DESTINO"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar:
+        executar(*args.executar)
+        return
+
+    print(f"{'linhas':>10} {'método':>10} {'pico RSS':>10} {'acréscimo':>10} {'tempo':>9} {'arquivo':>9}")
+    with tempfile.TemporaryDirectory() as pasta:
+        for linhas in args.linhas:
+            caminho = Path(pasta) / f"banco_{linhas}.db"
+            gerar_banco(caminho, linhas)
+            for metodo in args.metodos:
+                destino = Path(pasta) / f"{metodo}_{linhas}.xlsx"
+                saida = subprocess.run(
+                    [sys.executable, __file__, "--executar", metodo, str(caminho), str(destino)],
+                    check=True, capture_output=True, text=True
+                ).stdout.split()
+                pico, base, segundos = int(saida[0]), int(saida[1]), float(saida[2])
+                print(f"{linhas:>10,} {metodo:>10} {pico / 1024:>8.1f}MB {(pico - base) / 1024:>8.1f}MB "
+                      f"{segundos:>8.2f}s {destino.stat().st_size / 2**20:>7.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Commit por linha × fila de escrita com commit em grupo (centesimais.fila_escrita).
+
+Várias threads salvam análises de uma linha ao mesmo tempo, primeiro cada uma
+com seu ``banco.escrita`` (um commit por análise) e depois por
+``banco.gravar`` (a fila junta as pendentes num commit). Mostra gravações por
+segundo, a latência vista por quem salva e, na fila, o tamanho dos lotes e a
+duração dos commits. ``--sincrono FULL`` mede com um fsync por commit.
+
+    python benchmarks/bench_fila_escrita.py [--threads 32] [--analises 200] [--sincrono NORMAL|FULL]
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from centesimais.analises import SQL_INSERIR_ANALISE, agora, parametros_analise  # noqa: E402
+from centesimais.conexao import BancoDados  # noqa: E402
+
+PARAMETROS = ("Umidade", "Cinzas", "Proteínas", "Lipídios", "Fibras Totais")
+
+
+def por_linha(banco, params, usuario_id):
+    with banco.escrita(usuario_id) as conn:
+        conn.execute(SQL_INSERIR_ANALISE, params)
+
+
+def pela_fila(banco, params, usuario_id):
+    banco.gravar(SQL_INSERIR_ANALISE, params, usuario_id)
+
+
+def sessao(banco, gravar, usuario_id, n_analises, latencias, erros, barreira):
+    barreira.wait()
+    try:
+        for i in range(n_analises):
+            params = parametros_analise(usuario_id, f"Amostra {i // len(PARAMETROS)}", PARAMETROS[i % len(PARAMETROS)],
+                                        [10.0, 10.2, 9.8], 10.0, 0.2, 2.0, agora())
+            inicio = time.perf_counter()
+            gravar(banco, params, usuario_id)
+            latencias.append(time.perf_counter() - inicio)
+    except Exception as erro:  # registra e segue: o objetivo é contar falhas
+        erros.append(f"usuário {usuario_id}: {erro!r}")
+
+
+def medir(gravar, args) -> dict:
+    with tempfile.TemporaryDirectory() as pasta:
+        banco = BancoDados(Path(pasta) / "banco.db")
+        banco._escritor.execute(f"PRAGMA synchronous={args.sincrono}")
+        latencias, erros = [], []
+        barreira = threading.Barrier(args.threads)
+        threads = [
+            threading.Thread(target=sessao, args=(banco, gravar, usuario_id, args.analises, latencias, erros, barreira))
+            for usuario_id in range(1, args.threads + 1)
+        ]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        segundos = time.perf_counter() - inicio
+        with banco.leitura() as conn:
+            gravadas = conn.execute("SELECT COUNT(*) FROM analises").fetchone()[0]
+        fila = banco.fila.estatisticas() if banco._fila is not None else None
+        banco.fechar()
+
+    latencias.sort()
+    return {
+        "gravadas": gravadas, "erros": erros, "segundos": segundos, "fila": fila,
+        "mediana": statistics.median(latencias), "p95": latencias[int(0.95 * (len(latencias) - 1))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--analises", type=int, default=200, help="análises salvas por thread")
+    parser.add_argument("--sincrono", choices=("NORMAL", "FULL"), default="NORMAL", help="PRAGMA synchronous")
+    args = parser.parse_args()
+
+    esperadas = args.threads * args.analises
+    print(f"{args.threads} threads × {args.analises} análises, synchronous={args.sincrono}")
+    falhou = False
+    for nome, gravar in (("commit por linha", por_linha), ("fila (commit em grupo)", pela_fila)):
+        r = medir(gravar, args)
+        print(f"{nome:>24}: {r['gravadas'] / r['segundos']:>8,.0f} gravações/s  "
+              f"latência mediana {r['mediana'] * 1000:6.2f} ms  p95 {r['p95'] * 1000:6.2f} ms")
+        if r["fila"]:
+            f = r["fila"]
+            print(f"{'':>24}  {f['lotes']} commits · lote médio {f['lote_medio']:.1f} (máx. {f['maior_lote']}) · "
+                  f"commit mediano {f['commit_mediano'] * 1000:.2f} ms (p95 {f['commit_p95'] * 1000:.2f} ms) · "
+                  f"espera média na fila {f['espera_media'] * 1000:.2f} ms")
+        for erro in r["erros"][:10]:
+            print("ERRO", erro)
+        falhou |= bool(r["erros"]) or r["gravadas"] != esperadas
+    if falhou:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
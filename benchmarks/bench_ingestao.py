@@ -0,0 +1,72 @@
+"""Ingestão de um acúmulo de arquivos da balança e do titulador (centesimais.ingestao).
+
+Gera com o simulador milhares de arquivos numa pasta temporária, roda um
+ciclo do ``Ingestor`` e mostra linhas por segundo. Com ``--memoria``, mede
+também o pico de memória alocada (tracemalloc, que deixa o ciclo bem mais
+lento) durante o ciclo, que deve ficar no tamanho de um lote e não crescer
+com o número de arquivos. Confere ainda que todas as análises foram
+gravadas e que um segundo ciclo não relê nada.
+
+    python benchmarks/bench_ingestao.py [--amostras 2000] [--por-arquivo 4] [--memoria]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from simulador_instrumentos import amostras, arquivos, escrever  # noqa: E402
+from centesimais.conexao import BancoDados  # noqa: E402
+from centesimais.ingestao import Ingestor  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--amostras", type=int, default=2000)
+    parser.add_argument("--por-arquivo", type=int, default=4, help="amostras por corrida (arquivo)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--memoria", action="store_true", help="mede o pico de memória com tracemalloc")
+    args = parser.parse_args()
+
+    rng = random.Random(args.semente)
+    lote = amostras(rng, args.amostras)
+    conteudo = arquivos(rng, lote, args.por_arquivo)
+    esperadas = sum(len(a.replicatas) for a in lote)
+    with tempfile.TemporaryDirectory() as pasta:
+        pasta = Path(pasta)
+        escrever(pasta / "instrumentos", conteudo)
+        banco = BancoDados(pasta / "banco.db")
+        usuario_id = banco.gravar("INSERT INTO usuarios (nome, email, senha_hash, tipo) VALUES (?, ?, ?, ?)",
+                                  ("Bancada", "bancada@lab.exemplo", "-", "usuario")).id
+        mapa = {a.codigo: (a.nome, None) for a in lote}
+        ingestor = Ingestor(banco, pasta / "instrumentos", usuario_id, mapa, inatividade=0)
+
+        if args.memoria:
+            tracemalloc.start()
+        inicio = time.perf_counter()
+        resultado = ingestor.ciclo()
+        segundos = time.perf_counter() - inicio
+        if args.memoria:
+            pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        repeticao = ingestor.ciclo()
+        with banco.leitura() as conn:
+            gravadas = conn.execute("SELECT COUNT(*) FROM analises").fetchone()[0]
+        banco.fechar()
+
+    print(f"{len(conteudo)} arquivos, {resultado.linhas} linhas, {resultado.leituras} leituras em {segundos:.2f}s "
+          f"({resultado.linhas / segundos:,.0f} linhas/s, {len(conteudo) / segundos:,.0f} arquivos/s)")
+    print(f"análises gravadas: {gravadas}/{esperadas}  rejeitadas: {resultado.rejeitadas}"
+          + (f"  pico de memória no ciclo: {pico / 1e6:.1f} MB" if args.memoria else ""))
+    print(f"segundo ciclo: {repeticao.linhas} linhas relidas em {repeticao.segundos * 1000:.0f} ms")
+    if gravadas != esperadas or repeticao.linhas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
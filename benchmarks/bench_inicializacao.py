@@ -0,0 +1,109 @@
+"""Latência de partida a frio e de reexecução do app Streamlit (via streamlit.testing).
+
+* primeira pintura: processo novo, já com o Streamlit importado, até o fim da
+  primeira execução do script (tela de login), mediana de ``--partidas``
+  processos;
+* reexecução: mesmo processo, execuções seguidas do script numa sessão
+  logada (página ``--pagina``) e na tela de login, mediana em ms.
+
+Os mesmos tempos de um script de controle (só os widgets da tela de login)
+são descontados, para separar o custo do app do custo do próprio Streamlit.
+
+Para comparar antes e depois, rode contra outra cópia do repositório::
+
+    git worktree add /tmp/antes <commit>
+    python benchmarks/bench_inicializacao.py --app /tmp/antes/app.py
+    python benchmarks/bench_inicializacao.py
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+CONTROLE = """
+import streamlit as st
+st.set_page_config(page_title="controle", layout="wide")
+st.radio("Bem-vindo! Escolha uma opção:", ["Entrar", "Cadastrar"])
+st.text_input("Email")
+st.text_input("Senha", type="password")
+st.button("Entrar")
+"""
+
+# Roda no processo filho; imprime um JSON com os tempos em segundos
+FILHO = r"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+
+app, modo, pagina, repeticoes = sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4])
+at = AppTest.from_file(app, default_timeout=120)
+if modo == "logado":
+    at.session_state["usuario"] = {"id": 1, "nome": "Bench", "email": "b@x", "tipo": "usuario"}
+inicio = time.perf_counter()
+at.run()
+primeira = time.perf_counter() - inicio
+if modo == "logado" and pagina:
+    at.sidebar.radio[0].set_value(pagina).run()
+reexecucoes = []
+for _ in range(repeticoes):
+    inicio = time.perf_counter()
+    at.run()
+    reexecucoes.append(time.perf_counter() - inicio)
+erros = [e.message for e in at.exception]
+print(json.dumps({"primeira": primeira, "reexecucoes": reexecucoes, "erros": erros}))
+"""
+
+
+def executar(app: Path, modo: str, pagina: str, repeticoes: int, pasta: str) -> dict:
+    ambiente = dict(os.environ, PYTHONPATH=str(app.parent))
+    saida = subprocess.run(
+        [sys.executable, "-c", FILHO, str(app), modo, pagina, str(repeticoes)],
+        cwd=pasta, env=ambiente, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", type=Path, default=RAIZ / "app.py")
+    parser.add_argument("--partidas", type=int, default=5, help="processos para a primeira pintura")
+    parser.add_argument("--reexecucoes", type=int, default=30)
+    parser.add_argument("--pagina", default="Minhas Análises", help="opção do menu do usuário logado")
+    args = parser.parse_args()
+    app = args.app.resolve()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        controle = Path(pasta) / "controle.py"
+        controle.write_text(CONTROLE, encoding="utf-8")
+        # Uma execução descartada cria o banco e aplica as migrações
+        executar(app, "login", "", 0, pasta)
+        partidas = [executar(app, "login", "", 0, pasta)["primeira"] for _ in range(args.partidas)]
+        partidas_controle = [executar(controle, "login", "", 0, pasta)["primeira"] for _ in range(args.partidas)]
+        login = executar(app, "login", "", args.reexecucoes, pasta)
+        logado = executar(app, "logado", args.pagina, args.reexecucoes, pasta)
+        base = executar(controle, "login", "", args.reexecucoes, pasta)
+
+    def ms(valores):
+        return statistics.median(valores) * 1000
+
+    base_partida, base_reexecucao = ms(partidas_controle), ms(base["reexecucoes"])
+    print(f"app: {app}")
+    print(f"{'':42} {'total':>9} {'acima do controle':>18}")
+    for rotulo, valor, referencia in (
+        ("primeira pintura (login, processo novo)", ms(partidas), base_partida),
+        ("reexecução da tela de login", ms(login["reexecucoes"]), base_reexecucao),
+        (f"reexecução logado ({args.pagina})", ms(logado["reexecucoes"]), base_reexecucao),
+    ):
+        print(f"{rotulo:42} {valor:7.1f}ms {valor - referencia:16.1f}ms")
+    for erro in login["erros"] + logado["erros"]:
+        print("ERRO", erro)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Agregados do painel: SQLite × instantâneo colunar mapeado em memória (centesimais.instantaneo).
+
+Gera um banco sintético, mede a geração do instantâneo e compara, para
+alguns filtros do painel do administrador, o resumo por parâmetro e a
+tendência mensal calculados no SQLite (``resumo_diario`` ou ``analises``
+com a busca) e sobre o instantâneo, conferindo que os resultados são iguais.
+Mostra também quanto ocuparia, por sessão, uma cópia da tabela num DataFrame
+em comparação com os arquivos mapeados, que todas as sessões compartilham.
+
+    python benchmarks/bench_instantaneo.py [--analises 200000] [--repeticoes 20]
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gerador import gerar_banco  # noqa: E402
+from centesimais.conexao import BancoDados  # noqa: E402
+from centesimais.painel import FiltrosAnalises, sql_resumo, sql_tendencia  # noqa: E402
+from centesimais.painel import resumo_parametros, tendencia_mensal  # noqa: E402
+
+FILTROS = {
+    "sem filtros": FiltrosAnalises(),
+    "um parâmetro": FiltrosAnalises(parametro="Cinzas"),
+    "um usuário, um trimestre": FiltrosAnalises(usuario_id=3, data_inicio=date(2024, 1, 1), data_fim=date(2024, 3, 31)),
+    "busca 'arroz'": FiltrosAnalises(amostra="arroz"),
+}
+
+
+def mediana_ms(funcao, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos) * 1000
+
+
+def no_sqlite(banco, consulta) -> pd.DataFrame:
+    """Sem o cache de consultas: o custo de cada sessão ou rerun que não acerta o cache."""
+    sql, params = consulta
+    with banco.leitura() as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--analises", type=int, default=200_000)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = Path(pasta) / "banco.db"
+        gerar_banco(caminho, args.analises)
+        banco = BancoDados(caminho)
+        inicio = time.perf_counter()
+        retrato = banco.instantaneo.gerar()
+        geracao = time.perf_counter() - inicio
+        with banco.leitura() as conn:
+            copia = pd.read_sql_query("SELECT * FROM analises", conn).memory_usage(deep=True).sum()
+
+        print(f"{retrato.linhas} análises: instantâneo gerado em {geracao:.2f}s, {retrato.bytes / 1e6:.1f} MB mapeados "
+              f"(compartilhados) × {copia / 1e6:.1f} MB por sessão num DataFrame da tabela")
+        print(f"{'filtro':>26}  {'resumo SQL':>10}  {'instant.':>8}  {'tendência SQL':>13}  {'instant.':>8}")
+        divergentes = []
+        for nome, filtros in FILTROS.items():
+            tempos = (
+                mediana_ms(lambda: no_sqlite(banco, sql_resumo(filtros)), args.repeticoes),
+                mediana_ms(lambda: resumo_parametros(banco, filtros, retrato), args.repeticoes),
+                mediana_ms(lambda: no_sqlite(banco, sql_tendencia(filtros)), args.repeticoes),
+                mediana_ms(lambda: tendencia_mensal(banco, filtros, retrato), args.repeticoes),
+            )
+            print(f"{nome:>26}  {tempos[0]:>8.1f}ms  {tempos[1]:>6.1f}ms  {tempos[2]:>11.1f}ms  {tempos[3]:>6.1f}ms")
+            try:
+                pd.testing.assert_frame_equal(resumo_parametros(banco, filtros).reset_index(drop=True),
+                                              resumo_parametros(banco, filtros, retrato), check_dtype=False)
+                pd.testing.assert_frame_equal(tendencia_mensal(banco, filtros), tendencia_mensal(banco, filtros, retrato),
+                                              check_dtype=False, check_index_type=False, check_column_type=False)
+            except AssertionError as erro:
+                divergentes.append(f"{nome}: {erro}")
+        banco.fechar()
+
+    for divergencia in divergentes:
+        print("DIVERGENTE", divergencia)
+    if divergentes:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Rajada de logins simultâneos: bcrypt direto na thread da sessão × PoolSenhas.
+
+Simula uma turma entrando ao mesmo tempo (``--sessoes`` threads verificando a
+senha) enquanto uma sessão já logada faz reexecuções leves a cada 20 ms. Mede
+a latência dos logins e o atraso dessas reexecuções, que é o que o usuário
+percebe como "travou".
+
+    python benchmarks/bench_login.py [--sessoes 40] [--custo 12] [--trabalhadores N]
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+import bcrypt
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from centesimais.autenticacao import PoolSenhas  # noqa: E402
+
+INTERVALO_SONDA = 0.02  # segundos entre reexecuções da sessão já logada
+
+
+def sonda(atrasos, parar):
+    """Reexecução leve periódica; registra quanto passou do horário previsto."""
+    previsto = time.perf_counter() + INTERVALO_SONDA
+    while not parar.is_set():
+        time.sleep(max(previsto - time.perf_counter(), 0))
+        atrasos.append(time.perf_counter() - previsto)
+        sum(range(2000))  # trabalho de uma reexecução simples
+        previsto = time.perf_counter() + INTERVALO_SONDA
+
+
+def rodada(verificar, sessoes: int, senha_hash: bytes) -> dict:
+    latencias, atrasos = [], []
+    parar = threading.Event()
+    barreira = threading.Barrier(sessoes)
+
+    def login():
+        barreira.wait()
+        inicio = time.perf_counter()
+        assert verificar("senha-da-turma", senha_hash)
+        latencias.append(time.perf_counter() - inicio)
+
+    medidor = threading.Thread(target=sonda, args=(atrasos, parar))
+    medidor.start()
+    threads = [threading.Thread(target=login) for _ in range(sessoes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    parar.set()
+    medidor.join()
+    return {
+        "login_p50": statistics.median(latencias),
+        "login_max": max(latencias),
+        "reexecucao_p95": statistics.quantiles(atrasos, n=20)[-1] if len(atrasos) > 1 else 0.0,
+        "reexecucao_max": max(atrasos, default=0.0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessoes", type=int, default=40)
+    parser.add_argument("--custo", type=int, default=12)
+    parser.add_argument("--trabalhadores", type=int, default=None, help="padrão: número de CPUs")
+    args = parser.parse_args()
+
+    senha_hash = bcrypt.hashpw(b"senha-da-turma", bcrypt.gensalt(args.custo))
+    pool = PoolSenhas(trabalhadores=args.trabalhadores, fila_maxima=args.sessoes, custo=args.custo)
+
+    def direto(senha, senha_hash):
+        return bcrypt.checkpw(senha.encode("utf-8"), senha_hash)
+
+    print(f"{args.sessoes} logins simultâneos, custo {args.custo}, {pool.trabalhadores} trabalhador(es) no pool")
+    print(f"{'modo':>8} {'login p50':>10} {'login máx':>10} {'reexec p95':>11} {'reexec máx':>11}")
+    for nome, verificar in (("direto", direto), ("pool", pool.verificar)):
+        r = rodada(verificar, args.sessoes, senha_hash)
+        print(f"{nome:>8} {r['login_p50']:>9.2f}s {r['login_max']:>9.2f}s "
+              f"{r['reexecucao_p95'] * 1000:>9.1f}ms {r['reexecucao_max'] * 1000:>9.1f}ms")
+    print("pool:", pool.estatisticas())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Aceleração do pacote ZIP de relatórios (centesimais.pacotes) com o número de processos.
+
+Gera um banco sintético (``benchmarks/gerador.py``) e monta o pacote completo
+(um PDF e um Excel por usuário × parâmetro) com 1, 2, 4... trabalhadores até
+o número de CPUs, comparando com a geração serial no processo atual, que é
+o que a tela fazia arquivo por arquivo.
+
+    python benchmarks/bench_pacotes.py [--analises 50000] [--usuarios 20] [--trabalhadores 1 2 4]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from gerador import escala, gerar_banco
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from centesimais.conexao import BancoDados  # noqa: E402
+from centesimais.pacotes import gerar_pacote, tarefas  # noqa: E402
+from centesimais.relatorios import exportar_excel, exportar_pdf  # noqa: E402
+
+
+def serial(banco, formatos) -> float:
+    inicio = time.perf_counter()
+    for usuario_id, _, parametro, _ in tarefas(banco):
+        if "pdf" in formatos:
+            exportar_pdf(banco, usuario_id, parametro).unlink()
+        if "xlsx" in formatos:
+            exportar_excel(banco, usuario_id, parametro).unlink()
+    return time.perf_counter() - inicio
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--analises", type=escala, default=50_000)
+    parser.add_argument("--usuarios", type=int, default=20)
+    parser.add_argument("--formatos", nargs="+", choices=["pdf", "xlsx"], default=["pdf", "xlsx"])
+    parser.add_argument("--trabalhadores", type=int, nargs="+",
+                        default=sorted({1, *(2 ** i for i in range(1, cpus.bit_length()) if 2 ** i <= cpus), cpus}))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = Path(pasta) / "banco.db"
+        gerar_banco(caminho, args.analises, args.usuarios)
+        banco = BancoDados(caminho)
+        n_tarefas = len(tarefas(banco)) * len(args.formatos)
+        print(f"{args.analises} análises, {args.usuarios} usuários, {n_tarefas} arquivos, {cpus} CPU(s)")
+
+        base = serial(banco, args.formatos)
+        print(f"{'serial (no processo)':>22} {base:8.2f}s {1.0:6.2f}×")
+        for trabalhadores in args.trabalhadores:
+            inicio = time.perf_counter()
+            gerar_pacote(banco, formatos=args.formatos, trabalhadores=trabalhadores).unlink()
+            segundos = time.perf_counter() - inicio
+            print(f"{f'{trabalhadores} processo(s)':>22} {segundos:8.2f}s {base / segundos:6.2f}×")
+        banco.fechar()
+
+
+if __name__ == "__main__":
+    main()
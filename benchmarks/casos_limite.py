@@ -0,0 +1,315 @@
+"""Verificações de regressão de casos-limite, sem Streamlit, num banco temporário.
+
+Cada verificação reproduz um caso que já quebrou e termina com código 1 se
+algum voltar a falhar:
+
+* ``calcular_lote``/``importar_leituras`` com uma única linha válida e com
+  todas as linhas rejeitadas (o relatório de rejeitadas precisa sair), e
+  dentro da transação de quem chama;
+* ``Ingestor``: grupo sem nenhuma replicata válida (não pode voltar a cada
+  ciclo), grupo parado antes das replicatas mínimas, arquivo apagado com uma
+  linha pela metade e pasta indisponível em ``executar``;
+* ``importar_colunar``: replicatas fora das regras do app e média, desvio e
+  CV forjados no arquivo;
+* ``GestorInstantaneo``: ``atual`` apontando para uma versão já apagada, com
+  e sem versão mapeada; painel servido pelo ``resumo_diario`` antes do
+  primeiro instantâneo;
+* ``validar_token`` com caracteres fora do ASCII na assinatura;
+* paginação da composição pela API com uma amostra de nome vazio;
+* cache de consultas depois de uma escrita sem dono;
+* migrações de um banco legado com análises sem dono ou sem nome de amostra.
+
+    python benchmarks/casos_limite.py
+"""
+
+import logging
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from centesimais.colunar import importar_colunar  # noqa: E402
+from centesimais.conexao import BancoDados  # noqa: E402
+from centesimais.importacao import calcular_lote, importar_leituras  # noqa: E402
+from centesimais.ingestao import Ingestor  # noqa: E402
+from centesimais.instantaneo import GestorInstantaneo  # noqa: E402
+
+VERIFICACOES = []
+
+
+def verificacao(funcao):
+    VERIFICACOES.append(funcao)
+    return funcao
+
+
+def novo_banco(pasta: Path) -> tuple:
+    """(banco, id de um usuário) num arquivo novo em ``pasta``."""
+    banco = BancoDados(pasta / "banco.db")
+    usuario_id = banco.gravar("INSERT INTO usuarios (nome, email, senha_hash) VALUES (?, ?, ?)",
+                              ("Teste", "teste@lab.exemplo", "-")).id
+    return banco, usuario_id
+
+
+def esperar(condicao, segundos: float = 10.0):
+    """Espera ``condicao()`` ficar verdadeira (trabalho em outra thread), com limite de tempo."""
+    limite = time.monotonic() + segundos
+    while not condicao():
+        assert time.monotonic() < limite, "tempo esgotado"
+        time.sleep(0.01)
+
+
+# ---------------------- IMPORTAÇÃO DE PLANILHAS ----------------------
+UMA_LINHA = pd.DataFrame({"amostra": ["A"], "parametro": ["Cinzas"], "peso_cadinho": ["20"],
+                          "peso_cadinho_amostra": ["25"], "peso_cadinho_cinzas": ["20,1"]})
+TODAS_REJEITADAS = pd.DataFrame({"amostra": ["", "B"], "parametro": ["Cinzas", "xx"]})
+
+
+@verificacao
+def lote_sem_analises_validas(pasta):
+    for leituras, rejeitadas in ((UMA_LINHA, 1), (TODAS_REJEITADAS, 2)):
+        analises, motivos = calcular_lote(leituras)
+        assert analises.empty and len(motivos) == rejeitadas, (analises, motivos)
+    banco, usuario_id = novo_banco(pasta)
+    resultado = importar_leituras(banco, usuario_id, UMA_LINHA)
+    assert resultado.analises_inseridas == 0 and len(resultado.rejeitadas) == 1, resultado
+    banco.fechar()
+
+
+@verificacao
+def importacao_dentro_de_outra_transacao(pasta):
+    # A importação entra na transação de quem chamou: um erro depois dela desfaz tudo
+    banco, usuario_id = novo_banco(pasta)
+    leituras = pd.concat([UMA_LINHA, UMA_LINHA.assign(peso_cadinho_cinzas="20,2")])
+    try:
+        with banco.escrita(usuario_id):
+            assert importar_leituras(banco, usuario_id, leituras).analises_inseridas == 1
+            raise RuntimeError("desfaz")
+    except RuntimeError:
+        pass
+    with banco.leitura() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM analises").fetchone()[0] == 0
+    banco.fechar()
+
+
+# ---------------------- INGESTÃO DOS INSTRUMENTOS ----------------------
+BALANCA = "data;id;metodo;etapa;replicata;massa\n"
+
+
+@verificacao
+def ingestao_grupo_rejeitado(pasta):
+    banco, usuario_id = novo_banco(pasta)
+    (pasta / "instrumentos").mkdir()
+    # Massa de amostra nula nas duas replicatas: o grupo fica pronto, mas não fecha análise nenhuma
+    (pasta / "instrumentos" / "balanca.csv").write_text(BALANCA + "".join(
+        f"01/03/2025 10:00;A1;Cinzas;{etapa};{r};{massa}\n"
+        for r in (1, 2) for etapa, massa in (("peso_cadinho", 20), ("peso_cadinho_amostra", 20),
+                                             ("peso_cadinho_cinzas", 20.1))
+    ))
+    ingestor = Ingestor(banco, pasta / "instrumentos", usuario_id, replicatas=2)
+    primeiro, segundo = ingestor.ciclo(), ingestor.ciclo()
+    assert primeiro.analises == 0 and primeiro.rejeitadas == 2 and primeiro.pendentes == 0, primeiro
+    assert segundo.rejeitadas == 0 and segundo.pendentes == 0, segundo
+    banco.fechar()
+
+
+@verificacao
+def ingestao_grupo_abandonado(pasta):
+    banco, usuario_id = novo_banco(pasta)
+    (pasta / "instrumentos").mkdir()
+    # Só a replicata 1 ficou completa; a 2 nunca recebeu a pesagem final
+    (pasta / "instrumentos" / "balanca.csv").write_text(BALANCA + "".join(
+        f"01/03/2025 10:00;A1;Cinzas;{etapa};{r};{massa}\n"
+        for r, etapas in ((1, 3), (2, 2)) for etapa, massa in (("peso_cadinho", 20), ("peso_cadinho_amostra", 25),
+                                                               ("peso_cadinho_cinzas", 20.1))[:etapas]
+    ))
+    resultado = Ingestor(banco, pasta / "instrumentos", usuario_id, inatividade=0).ciclo()
+    assert resultado.analises == 0 and resultado.rejeitadas == 2 and resultado.pendentes == 0, resultado
+    with banco.leitura() as conn:
+        motivos = {linha[0] for linha in conn.execute("SELECT motivo FROM leituras_rejeitadas")}
+    assert motivos == {"replicatas insuficientes"}, motivos
+    banco.fechar()
+
+
+@verificacao
+def ingestao_arquivo_removido(pasta):
+    banco, usuario_id = novo_banco(pasta)
+    (pasta / "instrumentos").mkdir()
+    arquivo = pasta / "instrumentos" / "balanca.csv"
+    # Última linha ainda sendo escrita quando o instrumento apagou o arquivo
+    arquivo.write_text(BALANCA + "01/03/2025 10:00;A1;Cinzas;peso_cadinho;1;20\n01/03/2025 10:00;A1;Cin")
+    ingestor = Ingestor(banco, pasta / "instrumentos", usuario_id)
+    assert ingestor.ciclo().arquivos == 1
+    arquivo.unlink()
+    resultado = ingestor.ciclo()
+    assert resultado.arquivos == 0 and resultado.pendentes == 1, resultado
+    banco.fechar()
+
+
+@verificacao
+def ingestao_ciclo_com_erro(pasta):
+    banco, usuario_id = novo_banco(pasta)
+    # A pasta ainda não existe: a varredura falha até ela ser criada, sem derrubar o laço de ``executar``
+    ingestor = Ingestor(banco, pasta / "instrumentos", usuario_id)
+    parar = threading.Event()
+    execucao = threading.Thread(target=ingestor.executar, kwargs={"intervalo": 0.01, "parar": parar})
+    logging.disable(logging.ERROR)  # o traceback esperado no log só poluiria a saída
+    execucao.start()
+    try:
+        esperar(lambda: ingestor.ultimo_erro is not None)
+        assert "FileNotFoundError" in ingestor.ultimo_erro, ingestor.ultimo_erro
+        (pasta / "instrumentos").mkdir()
+        esperar(lambda: ingestor.ultimo_erro is None)
+    finally:
+        parar.set()
+        execucao.join()
+        logging.disable(logging.NOTSET)
+    banco.fechar()
+
+
+# ---------------------- IMPORTAÇÃO COLUNAR ----------------------
+@verificacao
+def colunar_replicatas_invalidas(pasta):
+    banco, usuario_id = novo_banco(pasta)
+    replicatas = [[10.0, 12.0], [10.0], [1.0] * 11, [10.0, float("nan")], [10.0, 150.0], None]
+    pq.write_table(pa.table({
+        "nome_amostra": [f"A{i}" for i in range(len(replicatas))],
+        "parametro": ["Cinzas"] * (len(replicatas) - 1) + ["Carboidratos"],
+        "replicatas": pa.array(replicatas, type=pa.list_(pa.float64())),
+        "media": [99.0] * (len(replicatas) - 1) + [40.0],  # forjada: só vale para a linha sem replicatas
+        "desvio_padrao": [0.0] * len(replicatas),
+        "coef_var": [0.0] * len(replicatas),
+    }), pasta / "analises.parquet")
+    resultado = importar_colunar(banco, pasta / "analises.parquet", usuario_id)
+    assert resultado.analises_inseridas == 2, resultado
+    assert list(resultado.rejeitadas["amostra"]) == ["A1", "A2", "A3", "A4"], resultado.rejeitadas
+    with banco.leitura() as conn:
+        gravadas = conn.execute("SELECT nome_amostra, media, desvio_padrao, coef_var FROM analises "
+                                "ORDER BY nome_amostra").fetchall()
+    assert gravadas == [("A0", 11.0, 1.41, 12.86), ("A5", 40.0, None, None)], gravadas
+    banco.fechar()
+
+
+# ---------------------- INSTANTÂNEO DO PAINEL ----------------------
+@verificacao
+def instantaneo_versao_apagada(pasta):
+    banco, usuario_id = novo_banco(pasta)
+    publicado = GestorInstantaneo(banco).gerar()
+    leitor = GestorInstantaneo(banco)
+    assert leitor.obter().versao == publicado.versao
+    # Outro processo apontou ``atual`` para uma versão que já foi apagada
+    (leitor.pasta / "atual").write_text("v999999999999", encoding="utf-8")
+    assert leitor.obter().versao == publicado.versao  # segue com a versão já mapeada
+    # Sem versão mapeada, ``obter`` não tem o que servir e gera outra em segundo plano, que a publica de novo
+    novo = GestorInstantaneo(banco)
+    assert novo.obter() is None
+    esperar(lambda: not novo.estatisticas()["gerando"])
+    assert novo.estatisticas()["ultimo_erro"] is None and novo.obter().versao == publicado.versao
+    banco.fechar()
+
+
+@verificacao
+def painel_sem_instantaneo(pasta):
+    from centesimais.painel import FiltrosAnalises, resumo_parametros, tendencia_mensal
+
+    banco, usuario_id = novo_banco(pasta)
+    importar_leituras(banco, usuario_id, pd.concat([UMA_LINHA, UMA_LINHA.assign(peso_cadinho_cinzas="20,2")]))
+    gestor = GestorInstantaneo(banco)
+    # Antes do primeiro retrato, o painel agrega no rollup resumo_diario, com o mesmo resultado
+    assert gestor.obter() is None
+    filtros = FiltrosAnalises()
+    resumo, tendencia = resumo_parametros(banco, filtros), tendencia_mensal(banco, filtros)
+    retrato = gestor.gerar()
+    pd.testing.assert_frame_equal(resumo.reset_index(drop=True), resumo_parametros(banco, filtros, retrato),
+                                  check_dtype=False)
+    pd.testing.assert_frame_equal(tendencia, tendencia_mensal(banco, filtros, retrato), check_dtype=False)
+    banco.fechar()
+
+
+# ---------------------- API DE LEITURA ----------------------
+@verificacao
+def composicao_amostra_sem_nome(pasta):
+    from centesimais.api import decodificar_cursor, listar_composicao
+
+    banco, usuario_id = novo_banco(pasta)
+    banco.gravar("INSERT INTO analises (usuario_id, nome_amostra, parametro, media) VALUES (?, '', 'Cinzas', 1), "
+                 "(?, 'A', 'Cinzas', 2)", (usuario_id, usuario_id))
+    primeira = listar_composicao(banco, usuario_id, None, 1)
+    segunda = listar_composicao(banco, usuario_id, decodificar_cursor(primeira["proxima"]), 1)
+    amostras = [linha["nome_amostra"] for pagina in (primeira, segunda) for linha in pagina["composicao"]]
+    assert amostras == ["", "A"] and segunda["proxima"] is None, (primeira, segunda)
+    banco.fechar()
+
+
+# ---------------------- CACHE DE CONSULTAS ----------------------
+@verificacao
+def cache_escrita_sem_dono(pasta):
+    # Um usuário que nunca gravou também precisa ver as escritas globais (recalcular, varredura, importação)
+    banco, usuario_id = novo_banco(pasta)
+    sql = "SELECT COUNT(*) AS n FROM analises WHERE usuario_id = ?"
+    assert banco.consultar(sql, (usuario_id,), usuario_id)["n"][0] == 0
+    with banco.escrita() as conn:
+        conn.execute("INSERT INTO analises (usuario_id, nome_amostra, parametro, media) VALUES (?, 'A', 'Cinzas', 1)",
+                     (usuario_id,))
+    assert banco.consultar(sql, (usuario_id,), usuario_id)["n"][0] == 1
+    banco.fechar()
+
+
+# ---------------------- TOKENS DE SESSÃO ----------------------
+@verificacao
+def token_com_caracteres_fora_do_ascii(pasta):
+    from centesimais.autenticacao import validar_token
+
+    banco, usuario_id = novo_banco(pasta)
+    for token in (f"{usuario_id}.9999999999.é", f"{usuario_id}.9999999999.\udcff", "é.1.x"):
+        assert validar_token(banco, token) is None, token
+    banco.fechar()
+
+
+# ---------------------- BANCO LEGADO ----------------------
+@verificacao
+def legado_analise_sem_dono_ou_amostra(pasta):
+    # O esquema original aceita usuario_id e nome_amostra nulos; as migrações precisam passar por eles
+    import sqlite3
+
+    from centesimais.migracoes import MIGRACOES
+
+    conn = sqlite3.connect(pasta / "banco.db")
+    MIGRACOES[0][2](conn)
+    conn.executemany("INSERT INTO analises (usuario_id, nome_amostra, parametro, media, data) VALUES (?, ?, ?, ?, ?)",
+                     [(None, "X", "Cinzas", 1.0, "2024-01-01"), (1, None, "Cinzas", 1.0, "2024-01-01"),
+                      (1, "A", "Cinzas", 1.0, "2024-01-01")])
+    conn.commit()
+    conn.close()
+    banco = BancoDados(pasta / "banco.db")
+    banco.gravar("INSERT INTO analises (usuario_id, nome_amostra, parametro, media) VALUES (NULL, 'Y', 'Cinzas', 2)")
+    with banco.leitura() as conn:
+        assert conn.execute("SELECT usuario_id, nome_amostra FROM composicao").fetchall() == [(1, "A")]
+    banco.fechar()
+
+
+def main():
+    falhas = 0
+    for funcao in VERIFICACOES:
+        with tempfile.TemporaryDirectory() as pasta:
+            try:
+                funcao(Path(pasta))
+            except Exception:
+                falhas += 1
+                print(f"FALHOU {funcao.__name__}")
+                traceback.print_exc()
+            else:
+                print(f"ok     {funcao.__name__}")
+    if falhas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
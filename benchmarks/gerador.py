@@ -0,0 +1,177 @@
+"""Gerador de bancos sintéticos de laboratório para os benchmarks.
+
+Cria usuários, amostras de alimentos com as cinco análises (em geral em
+triplicata, às vezes em duplicata ou com cinco replicatas; nem toda amostra
+tem todas), anotações e datas espalhadas por dois anos. As médias partem de
+uma composição típica por alimento, com variação entre lotes e entre
+replicatas, de modo que desvios, CVs, carboidratos e VET saem com valores
+plausíveis; cerca de 1 % das análises tem uma pesagem errada. A mesma ``--semente`` gera sempre o mesmo banco.
+
+As linhas entram pelo ``BancoDados``, com migrações e gatilhos ativos
+(composição, FTS5, resumo diário), como num banco real.
+
+    python benchmarks/gerador.py banco_100k.db --analises 100000 [--usuarios N] [--semente 42]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import bcrypt
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from centesimais.conexao import BancoDados  # noqa: E402
+from centesimais.analises import SQL_INSERIR_ANALISE, parametros_analise  # noqa: E402
+
+ESCALAS = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+SENHA = "senha123"  # senha de todos os usuários sintéticos
+CUSTO_BCRYPT = 4  # gerar o banco não deve esperar pelo bcrypt
+TAMANHO_LOTE = 50_000
+INICIO = datetime(2023, 1, 1)
+DIAS = 730
+TAXA_PESAGEM_ERRADA = 0.01  # uma replicata 10–30 % fora, para a varredura de discrepantes
+
+PARAMETROS = ("Umidade", "Cinzas", "Proteínas", "Lipídios", "Fibras Totais")
+# Composição típica (g/100 g) na ordem de PARAMETROS
+ALIMENTOS = {
+    "Feijão carioca": (12.0, 3.8, 20.0, 1.3, 18.4),
+    "Arroz branco": (13.2, 0.5, 7.2, 0.3, 1.6),
+    "Farinha de trigo": (13.0, 0.8, 9.8, 1.4, 2.3),
+    "Farinha de mandioca": (9.4, 1.1, 1.6, 0.3, 6.4),
+    "Leite em pó integral": (3.0, 5.8, 25.4, 26.9, 0.0),
+    "Queijo minas": (46.5, 3.2, 17.4, 20.2, 0.0),
+    "Carne bovina": (70.5, 1.0, 21.0, 6.5, 0.0),
+    "Peito de frango": (74.8, 1.0, 21.5, 3.0, 0.0),
+    "Aveia em flocos": (9.1, 1.8, 13.9, 8.5, 9.1),
+    "Castanha-do-pará": (3.5, 3.4, 14.5, 63.5, 7.9),
+    "Banana prata": (71.9, 0.8, 1.3, 0.1, 2.0),
+    "Soja em grão": (9.0, 4.9, 35.9, 19.9, 20.2),
+    "Pão francês": (28.5, 2.0, 8.0, 3.1, 2.3),
+    "Biscoito cream cracker": (4.1, 2.5, 10.1, 14.4, 2.5),
+}
+TITULOS = ("Calibração da balança", "Troca de reagente", "Observação da estufa", "Lote recebido",
+           "Ajuste da mufla", "Reanálise solicitada", "Manutenção do Kjeldahl", "Extração Soxhlet")
+PALAVRAS = ("amostra", "cadinho", "dessecador", "temperatura", "padrão", "branco", "replicata", "leitura",
+            "balança", "ácido", "titulação", "solvente", "filtro", "massa", "tara", "lote", "desvio")
+
+
+def replicatas(rng: random.Random, valor: float) -> tuple:
+    """(valores, media, desvio_padrao, coef_var) em torno de ``valor``; quase sempre triplicata."""
+    n = rng.choices((2, 3, 5), weights=(1, 8, 1))[0]
+    cv_metodo = rng.uniform(0.005, 0.04)
+    valores = [round(max(valor * rng.gauss(1, cv_metodo), 0.0), 4) for _ in range(n)]
+    if rng.random() < TAXA_PESAGEM_ERRADA:
+        errada = rng.randrange(n)
+        valores[errada] = round(valores[errada] * rng.uniform(1.1, 1.3) ** rng.choice((-1, 1)), 4)
+    media = statistics.fmean(valores)
+    desvio = statistics.stdev(valores)
+    coef_var = desvio / media * 100 if media else 0.0
+    return valores, round(media, 4), round(desvio, 4), round(coef_var, 2)
+
+
+def analises(rng: random.Random, total: int, usuarios: int):
+    """Linhas de ``analises`` até ``total``, amostra a amostra."""
+    geradas = 0
+    amostra = 0
+    while geradas < total:
+        amostra += 1
+        alimento, composicao = rng.choice(list(ALIMENTOS.items()))
+        usuario_id = rng.randint(1, usuarios)
+        nome = f"{alimento} lote {amostra:06d}"
+        dia = INICIO + timedelta(days=rng.randrange(DIAS))
+        for parametro, tipico in zip(PARAMETROS, composicao):
+            if rng.random() < 0.1 or geradas >= total:  # análise ainda não feita
+                continue
+            valor = tipico * rng.uniform(0.85, 1.15) if tipico else rng.uniform(0.0, 0.3)
+            momento = dia + timedelta(seconds=rng.randrange(8 * 3600, 18 * 3600))
+            yield parametros_analise(usuario_id, nome, parametro, *replicatas(rng, valor),
+                                     momento.strftime("%Y-%m-%d %H:%M:%S"))
+            geradas += 1
+
+
+def anotacoes(rng: random.Random, total: int, usuarios: int):
+    for _ in range(total):
+        momento = INICIO + timedelta(seconds=rng.randrange(DIAS * 86400))
+        conteudo = " ".join(rng.choices(PALAVRAS, k=rng.randint(8, 60))).capitalize() + "."
+        yield (rng.randint(1, usuarios), rng.choice(TITULOS), conteudo, momento.strftime("%Y-%m-%d %H:%M:%S"))
+
+
+def _em_lotes(linhas, tamanho: int):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) == tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def gerar_banco(caminho, n_analises: int, usuarios: int | None = None, n_anotacoes: int | None = None,
+                semente: int = 42, progresso=None) -> dict:
+    """Preenche ``caminho`` (novo) e devolve as contagens geradas.
+
+    O usuário 1 é administrador; todos usam a senha ``SENHA``.
+    """
+    usuarios = usuarios or max(5, n_analises // 2000)
+    n_anotacoes = n_anotacoes if n_anotacoes is not None else n_analises // 20
+    rng = random.Random(semente)
+    senha_hash = bcrypt.hashpw(SENHA.encode("utf-8"), bcrypt.gensalt(CUSTO_BCRYPT)).decode("utf-8")
+
+    banco = BancoDados(caminho)
+    try:
+        with banco.escrita() as conn:
+            conn.executemany(
+                "INSERT INTO usuarios (nome, email, senha_hash, tipo) VALUES (?, ?, ?, ?)",
+                ((f"Analista {i:04d}", f"analista{i:04d}@lab.exemplo", senha_hash,
+                  "admin" if i == 1 else "usuario") for i in range(1, usuarios + 1))
+            )
+        gravadas = 0
+        for lote in _em_lotes(analises(rng, n_analises, usuarios), TAMANHO_LOTE):
+            with banco.escrita() as conn:
+                conn.executemany(SQL_INSERIR_ANALISE, lote)
+            gravadas += len(lote)
+            if progresso:
+                progresso(gravadas, n_analises)
+        with banco.escrita() as conn:
+            conn.executemany(
+                "INSERT INTO anotacoes (usuario_id, titulo, conteudo, data) VALUES (?, ?, ?, ?)",
+                anotacoes(rng, n_anotacoes, usuarios)
+            )
+            conn.execute("ANALYZE")
+            amostras = conn.execute("SELECT COUNT(*) FROM composicao").fetchone()[0]
+    finally:
+        banco.fechar()
+    return {"analises": gravadas, "usuarios": usuarios, "amostras": amostras, "anotacoes": n_anotacoes,
+            "semente": semente}
+
+
+def escala(valor: str) -> int:
+    """Aceita "10k", "100k", "1M" ou um número."""
+    return ESCALAS.get(valor) or int(valor.replace("_", ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("banco", type=Path)
+    parser.add_argument("--analises", type=escala, default=ESCALAS["10k"], help="10k, 100k, 1M ou um número")
+    parser.add_argument("--usuarios", type=int, default=None, help="padrão: uma conta a cada 2000 análises")
+    parser.add_argument("--anotacoes", type=int, default=None, help="padrão: uma a cada 20 análises")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+    if args.banco.exists():
+        parser.error(f"{args.banco} já existe")
+
+    inicio = time.perf_counter()
+    contagens = gerar_banco(args.banco, args.analises, args.usuarios, args.anotacoes, args.semente,
+                            progresso=lambda feitas, total: print(f"\r{feitas}/{total} análises", end="", flush=True))
+    print(f"\n{contagens} em {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
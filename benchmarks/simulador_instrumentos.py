@@ -0,0 +1,172 @@
+"""Simulador da balança e do titulador Kjeldahl exportando arquivos numa pasta.
+
+Para cada amostra sintética (composição de ``gerador.ALIMENTOS``) gera as
+pesagens de cada método e as titulações de Proteínas, em geral em
+triplicata, no formato lido por ``centesimais.ingestao``: um arquivo por
+corrida de ``--por-arquivo`` amostras e método, com tara, amostra e pesagem
+final de cada replicata. Uma fração ``--erros`` das linhas sai com digitação
+inválida.
+
+Sem ``--ritmo``, todos os arquivos são escritos de uma vez (um acúmulo de
+arquivos para processar); com ``--ritmo N``, as linhas são acrescentadas a
+N por segundo, às vezes em duas escritas, como um instrumento exportando
+durante a corrida. ``--mapa`` grava o CSV ``codigo;amostra`` para o
+``ingerir --mapa``.
+
+    python benchmarks/simulador_instrumentos.py PASTA [--amostras 300] [--por-arquivo 10] [--ritmo 50]
+    python -m centesimais ingerir PASTA --usuario 1 --mapa amostras.csv
+"""
+
+import argparse
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gerador import ALIMENTOS, PARAMETROS  # noqa: E402
+from centesimais.calculos import FATOR_PROTEINA_PADRAO, MASSA_MOLAR_NITROGENIO  # noqa: E402
+
+CABECALHO_BALANCA = "data;id;metodo;etapa;replicata;massa;unidade"
+CABECALHO_TITULADOR = "data;id;replicata;volume;branco;normalidade"
+NORMALIDADE = 0.1
+INICIO = datetime(2025, 3, 3, 8, 0)
+
+
+@dataclass
+class Amostra:
+    codigo: str
+    nome: str
+    composicao: dict  # parâmetro -> teor verdadeiro (%)
+    replicatas: dict = field(default_factory=dict)  # parâmetro -> nº de replicatas
+
+
+def amostras(rng: random.Random, total: int) -> list:
+    geradas = []
+    for i in range(1, total + 1):
+        alimento, tipico = rng.choice(list(ALIMENTOS.items()))
+        composicao = {p: t * rng.uniform(0.9, 1.1) if t else rng.uniform(0.1, 0.3) for p, t in zip(PARAMETROS, tipico)}
+        geradas.append(Amostra(f"A{i:05d}", f"{alimento} lote {i:06d}", composicao,
+                               {p: rng.choices((2, 3, 5), weights=(1, 8, 1))[0] for p in PARAMETROS}))
+    return geradas
+
+
+def _g(valor: float) -> str:
+    return f"{valor:.4f}".replace(".", ",")  # balanças configuradas em pt-BR
+
+
+def pesagens(rng: random.Random, parametro: str, teor: float) -> dict:
+    """Campo da balança -> massa (g) de uma replicata com ``teor`` %."""
+    if parametro == "Umidade":
+        cadinho, massa = rng.uniform(25, 35), rng.uniform(2, 5)
+        return {"peso_cadinho": cadinho, "peso_cadinho_amostra": cadinho + massa,
+                "peso_cadinho_seco": cadinho + massa * (1 - teor / 100)}
+    if parametro == "Cinzas":
+        cadinho, massa = rng.uniform(20, 30), rng.uniform(2, 5)
+        return {"peso_cadinho": cadinho, "peso_cadinho_amostra": cadinho + massa,
+                "peso_cadinho_cinzas": cadinho + massa * teor / 100}
+    if parametro == "Lipídios":
+        frasco, massa = rng.uniform(90, 110), rng.uniform(2, 5)
+        return {"peso_frasco_vazio": frasco, "peso_amostra": massa, "peso_frasco_lipidios": frasco + massa * teor / 100}
+    if parametro == "Fibras Totais":
+        massa, proteina, cinzas = rng.uniform(0.9, 1.1), rng.uniform(0.005, 0.02), rng.uniform(0.002, 0.01)
+        return {"peso_amostra": massa, "correcao_proteina": proteina, "correcao_cinzas": cinzas,
+                "peso_residuo": massa * teor / 100 + proteina + cinzas}
+    return {"peso_amostra": rng.uniform(0.15, 0.3)}  # Proteínas: o resto vem do titulador
+
+
+def titulacao(rng: random.Random, teor: float, peso_amostra: float) -> tuple:
+    """(volume, branco) em mL para ``teor`` % de proteína."""
+    branco = rng.uniform(0.05, 0.15)
+    nitrogenio = peso_amostra * 1000 * teor / FATOR_PROTEINA_PADRAO / 100
+    return branco + nitrogenio / (NORMALIDADE * MASSA_MOLAR_NITROGENIO), branco
+
+
+def arquivos(rng: random.Random, lote: list, por_arquivo: int, erros: float = 0.0) -> list:
+    """[(nome, linhas)] de todas as corridas; cada linha termina em "\\n"."""
+    saida = []
+    momento = INICIO
+
+    def carimbo():
+        nonlocal momento
+        momento += timedelta(seconds=rng.randint(5, 40))
+        return momento.strftime("%d/%m/%Y %H:%M:%S")
+
+    def digitar(linha):
+        return linha[:-2] + "?\n" if rng.random() < erros else linha  # último campo ilegível
+
+    for corrida, inicio in enumerate(range(0, len(lote), por_arquivo), start=1):
+        grupo = lote[inicio:inicio + por_arquivo]
+        for parametro in PARAMETROS:
+            medidas = []  # (amostra, replicata, {campo: massa})
+            for amostra in grupo:
+                for replicata in range(1, amostra.replicatas[parametro] + 1):
+                    teor = amostra.composicao[parametro] * rng.gauss(1, 0.01)
+                    medidas.append((amostra, replicata, teor, pesagens(rng, parametro, teor)))
+            linhas = [CABECALHO_BALANCA + "\n"]
+            # Todas as taras, depois as amostras, depois as pesagens finais, como na bancada
+            for etapa in range(len(medidas[0][3])):
+                for amostra, replicata, _, campos in medidas:
+                    campo, massa = list(campos.items())[etapa]
+                    linhas.append(digitar(f"{carimbo()};{amostra.codigo};{parametro};{campo};{replicata};{_g(massa)};g\n"))
+            saida.append((f"balanca_{corrida:05d}_{parametro.split()[0].lower()}.csv", linhas))
+            if parametro == "Proteínas":
+                linhas = [CABECALHO_TITULADOR + "\n"]
+                for amostra, replicata, teor, campos in medidas:
+                    volume, branco = titulacao(rng, teor, round(campos["peso_amostra"], 4))
+                    linhas.append(digitar(f"{carimbo()};{amostra.codigo};{replicata};{volume:.3f};{branco:.3f};"
+                                          f"{NORMALIDADE}\n"))
+                saida.append((f"titulador_{corrida:05d}.csv", linhas))
+    return saida
+
+
+def escrever(pasta: Path, conteudo: list, ritmo: float | None = None, rng: random.Random | None = None):
+    """Grava os arquivos de uma vez ou acrescenta as linhas a ``ritmo`` por segundo."""
+    pasta.mkdir(parents=True, exist_ok=True)
+    if not ritmo:
+        for nome, linhas in conteudo:
+            (pasta / nome).write_text("".join(linhas), encoding="utf-8")
+        return
+    rng = rng or random.Random()
+    for nome, linhas in conteudo:
+        with open(pasta / nome, "a", encoding="utf-8") as arquivo:
+            for linha in linhas:
+                if rng.random() < 0.2:  # linha exportada em duas escritas
+                    meio = len(linha) // 2
+                    arquivo.write(linha[:meio])
+                    arquivo.flush()
+                    time.sleep(0.5 / ritmo)
+                    linha = linha[meio:]
+                arquivo.write(linha)
+                arquivo.flush()
+                time.sleep(1 / ritmo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pasta", type=Path)
+    parser.add_argument("--amostras", type=int, default=300)
+    parser.add_argument("--por-arquivo", type=int, default=10, help="amostras por corrida")
+    parser.add_argument("--ritmo", type=float, default=None, help="linhas por segundo (padrão: tudo de uma vez)")
+    parser.add_argument("--erros", type=float, default=0.005, help="fração de linhas com digitação inválida")
+    parser.add_argument("--mapa", type=Path, default=None, help="CSV codigo;amostra (fora da pasta observada)")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.semente)
+    lote = amostras(rng, args.amostras)
+    conteudo = arquivos(rng, lote, args.por_arquivo, args.erros)
+    if args.mapa is not None:
+        args.mapa.write_text("codigo;amostra\n" + "".join(f"{a.codigo};{a.nome}\n" for a in lote), encoding="utf-8")
+    inicio = time.perf_counter()
+    escrever(args.pasta, conteudo, args.ritmo, rng)
+    linhas = sum(len(linhas) for _, linhas in conteudo)
+    print(f"{len(conteudo)} arquivos, {linhas} linhas, {args.amostras * len(PARAMETROS)} análises "
+          f"em {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""Suíte de benchmarks das operações do app sobre um banco sintético, com saída JSON.
+
+Cada caso reproduz, sem a interface, o que uma tela faz no banco:
+
+* ``salvar_analise``: um INSERT de triplicata por ``banco.escrita`` (gatilhos
+  de composição, FTS5 e resumo diário inclusos);
+* ``analises_finalizadas`` e ``analises_finalizadas_parametro``: a consulta da
+  tela para o usuário com mais análises, com e sem filtro de parâmetro;
+* ``painel_amostras``: contagem e uma página do meio da composição;
+* ``painel_admin_pagina``, ``painel_admin_pagina_profunda``,
+  ``painel_admin_busca`` e ``painel_admin_resumo``: a grade paginada, uma
+  página no meio da tabela, a busca por amostra e o resumo com tendência;
+* ``exportar_pdf`` e ``exportar_excel``: o relatório completo do mesmo usuário;
+* ``varredura_discrepantes``: Dixon/Grubbs em todas as análises do banco.
+
+Consultas rodam com o cache vazio (o custo medido é o do SQLite e do pandas).
+Os tempos saem em segundos (mediana, mínimo e p95 de ``--repeticoes``).
+
+    python benchmarks/suite.py --escala 100k --saida base.json
+    python benchmarks/suite.py --escala 100k --saida novo.json --comparar base.json
+    python benchmarks/suite.py comparar base.json novo.json [--tolerancia 0.25]
+
+Com ``--banco`` o banco sintético é gerado uma vez naquele arquivo e
+reaproveitado nas execuções seguintes. A comparação marca como regressão o
+caso cuja mediana e cujo mínimo pioraram ambos mais que ``--tolerancia``
+(fração) e mais que ``--piso-ms``, e termina com código 1 se houver alguma.
+"""
+
+import argparse
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from gerador import ESCALAS, escala, gerar_banco
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from centesimais import calculos  # noqa: E402
+from centesimais.composicao import carregar_composicao, contar_amostras  # noqa: E402
+from centesimais.conexao import BancoDados  # noqa: E402
+from centesimais.analises import SQL_INSERIR_ANALISE, parametros_analise  # noqa: E402
+from centesimais.discrepantes import varrer  # noqa: E402
+from centesimais.painel import FiltrosAnalises, pagina_analises, resumo_parametros, tendencia_mensal  # noqa: E402
+from centesimais.relatorios import exportar_excel, exportar_pdf  # noqa: E402
+
+VERSAO_FORMATO = 1
+TOLERANCIA_PADRAO = 0.25
+PISO_MS_PADRAO = 1.0
+AMOSTRA_SALVAR = "Benchmark lote 000000"  # removida ao final, para o banco poder ser reaproveitado
+
+
+# ---------------------- CASOS ----------------------
+class Contexto:
+    """Banco aberto e os alvos escolhidos uma vez: usuário mais ativo, chave do meio da tabela."""
+
+    def __init__(self, banco: BancoDados):
+        self.banco = banco
+        with banco.leitura() as conn:
+            self.usuario_id, = conn.execute(
+                "SELECT usuario_id FROM analises GROUP BY usuario_id ORDER BY COUNT(*) DESC LIMIT 1"
+            ).fetchone()
+            total, = conn.execute("SELECT COUNT(*) FROM analises").fetchone()
+            self.chave_meio = conn.execute(
+                "SELECT data, id FROM analises ORDER BY data DESC, id DESC LIMIT 1 OFFSET ?", (total // 2,)
+            ).fetchone()
+            self.amostras = contar_amostras(conn, self.usuario_id)
+            self.alimento, = conn.execute(
+                "SELECT substr(nome_amostra, 1, instr(nome_amostra, ' ') - 1) FROM analises WHERE id = 1"
+            ).fetchone()
+
+    def consultar_sem_cache(self, sql, params, usuario_id=None):
+        self.banco.cache.limpar()
+        return self.banco.consultar(sql, params, usuario_id)
+
+
+def salvar_analise(ctx: Contexto):
+    resultado = calculos.calcular("Cinzas", {
+        "peso_cadinho": [[20.1012, 19.8733, 20.4410]],
+        "peso_cadinho_amostra": [[22.1023, 21.8720, 22.4413]],
+        "peso_cadinho_cinzas": [[20.1524, 19.9231, 20.4915]],
+    })
+    linha = parametros_analise(ctx.usuario_id, AMOSTRA_SALVAR, "Cinzas", resultado.valores(0).tolist(),
+                               float(resultado.media[0]), float(resultado.desvio_padrao[0]),
+                               float(resultado.coef_var[0]), datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    with ctx.banco.escrita(ctx.usuario_id) as conn:
+        conn.execute(SQL_INSERIR_ANALISE, linha)
+
+
+def analises_finalizadas(ctx: Contexto):
+    ctx.consultar_sem_cache("SELECT * FROM analises WHERE usuario_id = ?", [ctx.usuario_id], ctx.usuario_id)
+
+
+def analises_finalizadas_parametro(ctx: Contexto):
+    ctx.consultar_sem_cache("SELECT * FROM analises WHERE usuario_id = ? AND parametro = ?",
+                            [ctx.usuario_id, "Proteínas"], ctx.usuario_id)
+
+
+def painel_amostras(ctx: Contexto, por_pagina: int = 50):
+    with ctx.banco.leitura() as conn:
+        total = contar_amostras(conn, ctx.usuario_id)
+        pagina = max(-(-total // por_pagina) // 2, 1)
+        carregar_composicao(conn, ctx.usuario_id, limite=por_pagina, deslocamento=(pagina - 1) * por_pagina)
+
+
+def painel_admin_pagina(ctx: Contexto):
+    ctx.banco.cache.limpar()
+    pagina_analises(ctx.banco, FiltrosAnalises())
+
+
+def painel_admin_pagina_profunda(ctx: Contexto):
+    ctx.banco.cache.limpar()
+    pagina_analises(ctx.banco, FiltrosAnalises(), apos=ctx.chave_meio)
+
+
+def painel_admin_busca(ctx: Contexto):
+    ctx.banco.cache.limpar()
+    pagina_analises(ctx.banco, FiltrosAnalises(amostra=ctx.alimento, parametro="Umidade"))
+
+
+def painel_admin_resumo(ctx: Contexto):
+    ctx.banco.cache.limpar()
+    resumo_parametros(ctx.banco, FiltrosAnalises())
+    tendencia_mensal(ctx.banco, FiltrosAnalises())
+
+
+def _exportar(funcao, ctx: Contexto):
+    funcao(ctx.banco, ctx.usuario_id).unlink()
+
+
+def exportar_pdf_usuario(ctx: Contexto):
+    _exportar(exportar_pdf, ctx)
+
+
+def exportar_excel_usuario(ctx: Contexto):
+    _exportar(exportar_excel, ctx)
+
+
+def varredura_discrepantes(ctx: Contexto):
+    varrer(ctx.banco)
+
+
+CASOS = {
+    "salvar_analise": salvar_analise,
+    "analises_finalizadas": analises_finalizadas,
+    "analises_finalizadas_parametro": analises_finalizadas_parametro,
+    "painel_amostras": painel_amostras,
+    "painel_admin_pagina": painel_admin_pagina,
+    "painel_admin_pagina_profunda": painel_admin_pagina_profunda,
+    "painel_admin_busca": painel_admin_busca,
+    "painel_admin_resumo": painel_admin_resumo,
+    "exportar_pdf": exportar_pdf_usuario,
+    "exportar_excel": exportar_excel_usuario,
+    "varredura_discrepantes": varredura_discrepantes,
+}
+# Relatórios levam segundos: menos repetições bastam
+REPETICOES_MAXIMAS = {"exportar_pdf": 3, "exportar_excel": 3}
+
+
+# ---------------------- EXECUÇÃO ----------------------
+def cronometrar(funcao, ctx: Contexto, repeticoes: int) -> dict:
+    funcao(ctx)  # aquecimento: primeira importação, páginas do SQLite no cache do sistema
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(ctx)
+        tempos.append(time.perf_counter() - inicio)
+    return {
+        "mediana": statistics.median(tempos),
+        "minimo": min(tempos),
+        "p95": statistics.quantiles(tempos, n=20)[-1] if len(tempos) > 1 else tempos[0],
+        "repeticoes": repeticoes,
+    }
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar(caminho: Path, n_analises: int, casos: list, repeticoes: int) -> dict:
+    if not caminho.exists():
+        inicio = time.perf_counter()
+        print(f"gerando {n_analises} análises em {caminho}...", file=sys.stderr)
+        gerar_banco(caminho, n_analises)
+        print(f"banco gerado em {time.perf_counter() - inicio:.1f}s", file=sys.stderr)
+
+    banco = BancoDados(caminho)
+    try:
+        ctx = Contexto(banco)
+        with banco.leitura() as conn:
+            escala_banco = {
+                "analises": conn.execute("SELECT COUNT(*) FROM analises").fetchone()[0],
+                "usuarios": conn.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0],
+                "amostras": conn.execute("SELECT COUNT(*) FROM composicao").fetchone()[0],
+                "analises_do_usuario": conn.execute(
+                    "SELECT COUNT(*) FROM analises WHERE usuario_id = ?", (ctx.usuario_id,)
+                ).fetchone()[0],
+            }
+        resultados = {}
+        for nome in casos:
+            resultados[nome] = cronometrar(CASOS[nome], ctx, min(repeticoes, REPETICOES_MAXIMAS.get(nome, repeticoes)))
+            print(f"{nome:32} {resultados[nome]['mediana'] * 1000:10.2f}ms", file=sys.stderr)
+    finally:
+        with banco.escrita() as conn:
+            conn.execute("DELETE FROM analises WHERE nome_amostra = ?", (AMOSTRA_SALVAR,))
+        banco.fechar()
+    return {
+        "versao": VERSAO_FORMATO,
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "escala": escala_banco,
+        "casos": resultados,
+    }
+
+
+# ---------------------- COMPARAÇÃO ----------------------
+def comparar(base: dict, atual: dict, tolerancia: float = TOLERANCIA_PADRAO, piso_ms: float = PISO_MS_PADRAO) -> list:
+    """Linhas (caso, base, atual, razão, regrediu) para os casos presentes nos dois resultados."""
+    linhas = []
+    for nome, medida in atual["casos"].items():
+        if nome not in base["casos"]:
+            continue
+        anterior = base["casos"][nome]
+        antes, depois = anterior["mediana"], medida["mediana"]
+        razao = depois / antes if antes else float("inf")
+        # Mediana e mínimo precisam piorar juntos: um só costuma ser ruído da máquina
+        razao_minimo = medida["minimo"] / anterior["minimo"] if anterior["minimo"] else float("inf")
+        regrediu = (min(razao, razao_minimo) > 1 + tolerancia
+                    and min(depois - antes, medida["minimo"] - anterior["minimo"]) * 1000 > piso_ms)
+        linhas.append((nome, antes, depois, razao, regrediu))
+    return linhas
+
+
+def imprimir_comparacao(base: dict, atual: dict, tolerancia: float, piso_ms: float) -> bool:
+    """Imprime a tabela e devolve ``True`` se algum caso regrediu."""
+    if base.get("escala", {}).get("analises") != atual.get("escala", {}).get("analises"):
+        print(f"aviso: escalas diferentes ({base.get('escala')} × {atual.get('escala')})")
+    print(f"base {base.get('commit')} ({base.get('gerado_em')}) × atual {atual.get('commit')} ({atual.get('gerado_em')})")
+    print(f"{'caso':32} {'base':>10} {'atual':>10} {'razão':>7}")
+    regressoes = 0
+    for nome, antes, depois, razao, regrediu in comparar(base, atual, tolerancia, piso_ms):
+        marca = "  REGRESSÃO" if regrediu else ""
+        print(f"{nome:32} {antes * 1000:8.2f}ms {depois * 1000:8.2f}ms {razao:6.2f}×{marca}")
+        regressoes += regrediu
+    print(f"{regressoes} regressão(ões) acima de {tolerancia:.0%} e {piso_ms:g} ms")
+    return regressoes > 0
+
+
+def _ler(caminho: Path) -> dict:
+    return json.loads(caminho.read_text(encoding="utf-8"))
+
+
+def main():
+    argumentos = sys.argv[1:]
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO, help="piora relativa aceita (0.25 = 25%%)")
+    parser.add_argument("--piso-ms", type=float, default=PISO_MS_PADRAO, help="diferença absoluta mínima para acusar")
+    if argumentos[:1] == ["comparar"]:
+        parser.add_argument("base", type=Path)
+        parser.add_argument("atual", type=Path)
+        args = parser.parse_args(argumentos[1:])
+        sys.exit(imprimir_comparacao(_ler(args.base), _ler(args.atual), args.tolerancia, args.piso_ms))
+
+    parser.add_argument("--escala", type=escala, default=ESCALAS["10k"], help="10k, 100k, 1M ou um número de análises")
+    parser.add_argument("--banco", type=Path, default=None, help="banco sintético reaproveitado (gerado se não existir)")
+    parser.add_argument("--casos", nargs="+", choices=list(CASOS), default=list(CASOS))
+    parser.add_argument("--repeticoes", type=int, default=10)
+    parser.add_argument("--saida", type=Path, default=None, help="arquivo JSON (padrão: stdout)")
+    parser.add_argument("--comparar", type=Path, default=None, help="JSON de uma execução anterior")
+    args = parser.parse_args(argumentos)
+
+    if args.banco is not None:
+        resultado = executar(args.banco, args.escala, args.casos, args.repeticoes)
+    else:
+        with tempfile.TemporaryDirectory() as pasta:
+            resultado = executar(Path(pasta) / "banco.db", args.escala, args.casos, args.repeticoes)
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida is not None:
+        args.saida.write_text(texto + "\n", encoding="utf-8")
+    else:
+        print(texto)
+    if args.comparar is not None:
+        sys.exit(imprimir_comparacao(_ler(args.comparar), resultado, args.tolerancia, args.piso_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Núcleo do Sistema de Análises Centesimais, independente da interface Streamlit.
+
+Os nomes reexportados abaixo são carregados sob demanda (PEP 562): importar
+``centesimais.conexao`` ou ``centesimais.autenticacao`` não puxa pandas e
+NumPy, o que mantém rápida a primeira tela do app.
+
+A linha de comando (``python -m centesimais``) está em ``centesimais.cli``.
+"""
+
+from importlib import import_module
+
+_REEXPORTADOS = {
+    "BancoDados": "centesimais.conexao",
+    "obter_banco": "centesimais.conexao",
+    "calcular": "centesimais.calculos",
+    "registrar_resultado": "centesimais.analises",
+    "carboidratos_por_diferenca": "centesimais.analises",
+    "excluir_analise": "centesimais.analises",
+    "atualizar_media": "centesimais.analises",
+    "recalcular_derivados": "centesimais.analises",
+    "exportar_pdf": "centesimais.relatorios",
+    "exportar_excel": "centesimais.relatorios",
+    "exportar_colunar": "centesimais.colunar",
+    "importar_colunar": "centesimais.colunar",
+    "PARAMETROS": "centesimais.importacao",
+    "ResultadoImportacao": "centesimais.importacao",
+    "importar_arquivo": "centesimais.importacao",
+    "importar_leituras": "centesimais.importacao",
+    "Ingestor": "centesimais.ingestao",
+    "migrar": "centesimais.migracoes",
+}
+
+__all__ = list(_REEXPORTADOS)
+
+
+def __getattr__(nome):
+    if nome in _REEXPORTADOS:
+        valor = getattr(import_module(_REEXPORTADOS[nome]), nome)
+        globals()[nome] = valor
+        return valor
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
@@ -0,0 +1,5 @@
+"""``python -m centesimais``: ver ``centesimais.cli``."""
+
+from centesimais.cli import main
+
+raise SystemExit(main())
@@ -0,0 +1,114 @@
+"""Gravação, edição e manutenção das análises, sem dependência do Streamlit.
+
+As telas do ``app.py``/``0app.py`` e o CLI (``python -m centesimais``) usam
+as mesmas funções; todas recebem o ``BancoDados`` e o usuário dono dos dados,
+para que a escrita invalide só o cache daquele usuário.
+"""
+
+from datetime import datetime
+
+from centesimais.composicao import CARBOIDRATOS, reconstruir_composicao
+from centesimais.controle import reconstruir_pontos
+from centesimais.migracoes import reconstruir_busca, reconstruir_resumo_diario
+from centesimais.replicatas import REPLICATAS_MAXIMAS, colunas_legado, desempacotar, empacotar
+
+SQL_INSERIR_ANALISE = """
+    INSERT INTO analises (usuario_id, nome_amostra, parametro, valor1, valor2, valor3, media, desvio_padrao, coef_var,
+                          data, replicatas, n_replicatas)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def agora() -> str:
+    """Carimbo de data gravado em ``analises.data`` e ``anotacoes.data``."""
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def parametros_analise(usuario_id, nome_amostra, parametro, valores, media, desvio_padrao, coef_var, data) -> tuple:
+    """Parâmetros de ``SQL_INSERIR_ANALISE``: replicatas empacotadas e as três primeiras em valor1..3."""
+    valores = list(valores)
+    return (usuario_id, nome_amostra, parametro, *colunas_legado(valores), media, desvio_padrao, coef_var, data,
+            empacotar(valores), len(valores))
+
+
+def registrar_resultado(banco, usuario_id: int, nome_amostra: str, parametro: str, resultado, indice: int = 0) -> dict:
+    """Grava a amostra ``indice`` de um ``ResultadoCalculo`` e devolve os valores gravados."""
+    linha = {
+        "replicatas": [float(v) for v in resultado.valores(indice)],
+        "media": float(resultado.media[indice]),
+        "desvio_padrao": float(resultado.desvio_padrao[indice]),
+        "coef_var": float(resultado.coef_var[indice]),
+    }
+    banco.gravar(SQL_INSERIR_ANALISE, parametros_analise(usuario_id, nome_amostra, parametro, *linha.values(), agora()),
+                 usuario_id)
+    return linha
+
+
+def adicionar_replicata(banco, usuario_id: int, analise_id: int, valor: float, casas: int = 2) -> dict | None:
+    """Acrescenta uma replicata a uma análise e atualiza média, DP e CV pelo acumulador de Welford.
+
+    ``None`` se a análise não existe, é de outro usuário ou não tem replicatas
+    (carboidratos por diferença); ``ValueError`` acima de ``REPLICATAS_MAXIMAS``.
+    """
+    from centesimais.calculos import AcumuladorReplicatas
+
+    with banco.escrita(usuario_id) as conn:
+        linha = conn.execute("SELECT replicatas FROM analises WHERE id = ? AND usuario_id = ?",
+                             (analise_id, usuario_id)).fetchone()
+        if linha is None or not linha[0]:
+            return None
+        valores = [*desempacotar(linha[0]), round(float(valor), casas)]
+        if len(valores) > REPLICATAS_MAXIMAS:
+            raise ValueError(f"no máximo {REPLICATAS_MAXIMAS} replicatas por análise")
+        # O estado parte das replicatas gravadas, pois media/desvio_padrao estão arredondados
+        acumulador = AcumuladorReplicatas.de_valores(valores)
+        resultado = {
+            "replicatas": valores,
+            "media": round(acumulador.media, casas),
+            "desvio_padrao": round(acumulador.desvio_padrao, casas),
+            "coef_var": round(acumulador.coef_var, casas),
+        }
+        conn.execute("""
+            UPDATE analises SET valor1 = ?, valor2 = ?, valor3 = ?, media = ?, desvio_padrao = ?, coef_var = ?,
+                                replicatas = ?, n_replicatas = ?
+            WHERE id = ?
+        """, (*colunas_legado(valores), resultado["media"], resultado["desvio_padrao"], resultado["coef_var"],
+              empacotar(valores), len(valores), analise_id))
+    return resultado
+
+
+def carboidratos_por_diferenca(umidade: float, cinzas: float, proteinas: float, lipidios: float,
+                               fibras: float) -> float:
+    """100 − (umidade + cinzas + proteínas + lipídios + fibras), em %."""
+    return round(100 - (umidade + cinzas + proteinas + lipidios + fibras), 2)
+
+
+def registrar_carboidratos(banco, usuario_id: int, nome_amostra: str, carboidratos: float):
+    banco.gravar(
+        "INSERT INTO analises (usuario_id, nome_amostra, parametro, media, data) VALUES (?, ?, ?, ?, ?)",
+        (usuario_id, nome_amostra, CARBOIDRATOS[0], carboidratos, agora()), usuario_id
+    )
+
+
+def excluir_analise(banco, usuario_id: int, analise_id: int) -> bool:
+    """Remove uma análise do usuário; ``False`` se o id não existe ou é de outro usuário."""
+    return banco.gravar("DELETE FROM analises WHERE id = ? AND usuario_id = ?", (analise_id, usuario_id),
+                        usuario_id).linhas > 0
+
+
+def atualizar_media(banco, usuario_id: int, analise_id: int, media: float) -> bool:
+    return banco.gravar("UPDATE analises SET media = ? WHERE id = ? AND usuario_id = ?",
+                        (media, analise_id, usuario_id), usuario_id).linhas > 0
+
+
+def recalcular_derivados(banco):
+    """Refaz composição, resumo diário, cartas de controle e índices de busca a partir de ``analises``.
+
+    Os gatilhos já mantêm essas tabelas; isto é manutenção, para depois de
+    cargas feitas por fora do app ou de uma mudança nas fórmulas.
+    """
+    with banco.escrita() as conn:
+        reconstruir_composicao(conn)
+        reconstruir_resumo_diario(conn)
+        reconstruir_pontos(conn)
+        reconstruir_busca(conn)
@@ -0,0 +1,340 @@
+"""API HTTP (JSON) para o LIMS enviar e buscar resultados, ao lado do app Streamlit.
+
+Um serviço Tornado (o servidor que o próprio Streamlit usa) sobre o mesmo
+``banco.db``; em WAL, os dois processos leem e gravam ao mesmo tempo::
+
+    python -m centesimais --banco banco.db api [--porta 8502] [--endereco 127.0.0.1]
+
+Rotas, sob ``/api/v1``:
+
+* ``POST /token`` com ``{"email", "senha"}``: devolve o mesmo token assinado
+  das sessões do app (``centesimais.autenticacao``), a enviar nas demais
+  rotas como ``Authorization: Bearer <token>``; ``DELETE /token`` revoga
+  todos os tokens do usuário, como sair do app;
+* ``POST /analises`` com ``{"analises": [{"amostra", "parametro",
+  "replicatas": [...], "data"}, ...]}``: até ``LOTE_MAXIMO`` análises,
+  calculadas de uma vez e gravadas numa única transação; as inválidas voltam
+  em ``rejeitadas`` com o índice e o motivo, sem impedir as demais;
+* ``GET /analises`` (filtros ``parametro``, ``amostra``, ``desde``, ``ate``),
+  ``GET /composicao`` e ``GET /anotacoes``: páginas de ``limite`` itens com o
+  cursor ``proxima`` para a página seguinte, por chave como no painel
+  (``centesimais.painel``), sem ``OFFSET``.
+
+Usuários comuns só leem e gravam os próprios dados; administradores podem
+passar ``usuario`` (id) na query string. O laço de eventos só trata HTTP e
+JSON: as consultas rodam num pool de threads, cada uma com uma conexão do
+pool de leitura do ``BancoDados``, e o bcrypt do login no ``PoolSenhas``.
+"""
+
+import asyncio
+import base64
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+import tornado.web
+from tornado.ioloop import IOLoop
+
+from centesimais import calculos
+from centesimais.analises import SQL_INSERIR_ANALISE, agora, parametros_analise
+from centesimais.autenticacao import ServidorOcupado, autenticar, emitir_token, encerrar_sessoes, validar_token
+from centesimais.composicao import COLUNAS
+from centesimais.conexao import LEITORES_PADRAO
+from centesimais.importacao import normalizar_parametro
+from centesimais.painel import FiltrosAnalises, sql_pagina
+from centesimais.replicatas import REPLICATAS_MAXIMAS, REPLICATAS_MINIMAS, desempacotar
+
+PORTA_PADRAO = 8502
+LOTE_MAXIMO = 5_000  # análises por POST
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1_000
+CORPO_MAXIMO = 16 * 1024 * 1024  # bytes
+
+SQL_COMPOSICAO = f"""
+    SELECT {", ".join(COLUNAS)} FROM composicao
+    WHERE usuario_id = ? AND nome_amostra {{comparacao}} ?
+    ORDER BY nome_amostra
+    LIMIT ?
+"""
+
+SQL_ANOTACOES = """
+    SELECT id, titulo, conteudo, data FROM anotacoes
+    WHERE usuario_id = ? AND (data, id) < (?, ?)
+    ORDER BY data DESC, id DESC
+    LIMIT ?
+"""
+
+
+# ---------------------- CURSORES ----------------------
+def codificar_cursor(chave) -> str:
+    """Cursor opaco para o cliente: a chave da última linha da página, em JSON base64."""
+    return base64.urlsafe_b64encode(json.dumps(chave).encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def decodificar_cursor(cursor: str) -> list:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise tornado.web.HTTPError(400, reason="cursor inválido") from None
+
+
+def _pagina(linhas: list, limite: int, chave) -> tuple:
+    """(linhas da página, cursor da próxima ou ``None``); a consulta pede ``limite + 1`` linhas."""
+    if len(linhas) <= limite:
+        return linhas, None
+    linhas = linhas[:limite]
+    return linhas, codificar_cursor(chave(linhas[-1]))
+
+
+# ---------------------- VALIDAÇÃO DO LOTE ----------------------
+def _analise(item) -> tuple:
+    """(amostra, parâmetro, replicatas, data) de um item do POST; ``ValueError`` com o motivo."""
+    if not isinstance(item, dict):
+        raise ValueError("cada análise deve ser um objeto")
+    amostra = str(item.get("amostra") or "").strip()
+    if not amostra:
+        raise ValueError("amostra sem nome")
+    parametro = normalizar_parametro(item.get("parametro") or "")
+    if parametro is None:
+        raise ValueError(f"parâmetro desconhecido: {item.get('parametro')!r}")
+    replicatas = item.get("replicatas")
+    if not isinstance(replicatas, list) or not REPLICATAS_MINIMAS <= len(replicatas) <= REPLICATAS_MAXIMAS:
+        raise ValueError(f"replicatas deve ser uma lista de {REPLICATAS_MINIMAS} a {REPLICATAS_MAXIMAS} números")
+    if not all(isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v) for v in replicatas):
+        raise ValueError("replicatas deve conter apenas números")
+    if not all(0 <= v <= 100 for v in replicatas):
+        raise ValueError("resultado fora do intervalo 0–100 %")
+    data = item.get("data")
+    if data is None:
+        data = agora()
+    else:
+        try:
+            data = datetime.fromisoformat(str(data)).strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            raise ValueError(f"data inválida: {data!r}") from None
+    return amostra, parametro, replicatas, data
+
+
+def gravar_lote(banco, usuario_id: int, itens: list) -> dict:
+    """Valida, calcula média/DP/CV de todas as análises numa passada e grava as válidas numa transação."""
+    import numpy as np
+
+    validas, rejeitadas = [], []
+    for indice, item in enumerate(itens):
+        try:
+            validas.append(_analise(item))
+        except ValueError as erro:
+            rejeitadas.append({"indice": indice, "motivo": str(erro)})
+    ids = []
+    if validas:
+        n = np.array([len(replicatas) for _, _, replicatas, _ in validas])
+        matriz = np.full((len(validas), int(n.max())), np.nan)
+        for linha, (_, _, replicatas, _) in enumerate(validas):
+            matriz[linha, :n[linha]] = replicatas
+        resultado = calculos.estatisticas(matriz, n=n)
+        registros = [
+            parametros_analise(usuario_id, amostra, parametro, resultado.valores(i).tolist(), float(resultado.media[i]),
+                               float(resultado.desvio_padrao[i]), float(resultado.coef_var[i]), data)
+            for i, (amostra, parametro, _, data) in enumerate(validas)
+        ]
+        with banco.escrita(usuario_id) as conn:
+            conn.executemany(SQL_INSERIR_ANALISE, registros)
+            # Um único escritor e AUTOINCREMENT: os ids do lote são consecutivos até o último
+            ultimo = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        ids = list(range(ultimo - len(registros) + 1, ultimo + 1))
+    return {"inseridas": len(ids), "ids": ids, "rejeitadas": rejeitadas}
+
+
+# ---------------------- CONSULTAS ----------------------
+def listar_analises(banco, filtros: FiltrosAnalises, apos, limite: int) -> dict:
+    sql, params = sql_pagina(filtros, tuple(apos) if apos else None, limite)
+    with banco.leitura() as conn:
+        linhas = conn.execute(sql, params).fetchall()
+    linhas, proxima = _pagina(linhas, limite, lambda linha: [linha[9], linha[0]])
+    return {
+        "analises": [
+            {"id": id_, "usuario": usuario, "amostra": amostra, "parametro": parametro, "n_replicatas": n,
+             "replicatas": list(desempacotar(blob)), "media": media, "desvio_padrao": desvio, "coef_var": coef_var,
+             "data": data}
+            for id_, usuario, amostra, parametro, n, blob, media, desvio, coef_var, data in linhas
+        ],
+        "proxima": proxima,
+    }
+
+
+def listar_composicao(banco, usuario_id: int, apos, limite: int) -> dict:
+    # Sem cursor, ">= ''" inclui a amostra de nome vazio; com cursor, ">" pula a já entregue
+    sql = SQL_COMPOSICAO.format(comparacao=">=" if apos is None else ">")
+    with banco.leitura() as conn:
+        linhas = conn.execute(sql, (usuario_id, "" if apos is None else apos, limite + 1)).fetchall()
+    linhas, proxima = _pagina(linhas, limite, lambda linha: linha[0])
+    return {"composicao": [dict(zip(COLUNAS, linha)) for linha in linhas], "proxima": proxima}
+
+
+def listar_anotacoes(banco, usuario_id: int, apos, limite: int) -> dict:
+    # Sem cursor, começa depois da maior chave possível
+    data, id_ = apos or ("\uffff", 0)
+    with banco.leitura() as conn:
+        linhas = conn.execute(SQL_ANOTACOES, (usuario_id, data, id_, limite + 1)).fetchall()
+    linhas, proxima = _pagina(linhas, limite, lambda linha: [linha[3], linha[0]])
+    return {"anotacoes": [dict(zip(("id", "titulo", "conteudo", "data"), linha)) for linha in linhas],
+            "proxima": proxima}
+
+
+# ---------------------- ROTAS ----------------------
+class _Rota(tornado.web.RequestHandler):
+    """Base das rotas: JSON nas respostas e nos erros, token Bearer e execução no pool de threads."""
+
+    publica = False
+
+    def initialize(self, banco, executor):
+        self.banco = banco
+        self.executor = executor
+        self.usuario = None
+
+    def executar(self, funcao, *args):
+        return IOLoop.current().run_in_executor(self.executor, funcao, *args)
+
+    async def prepare(self):
+        if self.publica:
+            return
+        cabecalho = self.request.headers.get("Authorization", "")
+        token = cabecalho[len("Bearer "):].strip() if cabecalho.startswith("Bearer ") else None
+        self.usuario = token and await self.executar(validar_token, self.banco, token)
+        if not self.usuario:
+            raise tornado.web.HTTPError(401, reason="token ausente, inválido ou expirado")
+
+    def write_error(self, status_code, **kwargs):
+        self.finish({"erro": self._reason})
+
+    def corpo(self) -> dict:
+        try:
+            corpo = json.loads(self.request.body or b"null")
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="corpo não é JSON válido") from None
+        if not isinstance(corpo, dict):
+            raise tornado.web.HTTPError(400, reason="o corpo deve ser um objeto JSON")
+        return corpo
+
+    def usuario_alvo(self) -> int:
+        """Dono dos dados da requisição: o do token ou, para administradores, o ``usuario`` informado."""
+        informado = self.get_query_argument("usuario", None)
+        if informado is None or informado == str(self.usuario["id"]):
+            return self.usuario["id"]
+        if self.usuario["tipo"] != "admin":
+            raise tornado.web.HTTPError(403, reason="apenas administradores consultam outros usuários")
+        if not informado.isdigit():
+            raise tornado.web.HTTPError(400, reason="usuario deve ser um id numérico")
+        return int(informado)
+
+    def limite(self) -> int:
+        try:
+            limite = int(self.get_query_argument("limite", str(LIMITE_PADRAO)))
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="limite deve ser um número") from None
+        return min(max(limite, 1), LIMITE_MAXIMO)
+
+    def cursor(self, composto: bool = True):
+        """Chave do cursor: [data, id] nas listas por data ou o nome da amostra na composição."""
+        cursor = self.get_query_argument("cursor", None)
+        if cursor is None:
+            return None
+        chave = decodificar_cursor(cursor)
+        if composto:
+            valido = isinstance(chave, list) and len(chave) == 2 and isinstance(chave[0], str) and type(chave[1]) is int
+        else:
+            valido = isinstance(chave, str)
+        if not valido:
+            raise tornado.web.HTTPError(400, reason="cursor inválido")
+        return chave
+
+    def data(self, nome: str) -> date | None:
+        valor = self.get_query_argument(nome, None)
+        try:
+            return None if valor is None else date.fromisoformat(valor)
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason=f"{nome} deve ser uma data AAAA-MM-DD") from None
+
+
+class RotaToken(_Rota):
+    @property
+    def publica(self) -> bool:
+        return self.request.method == "POST"  # DELETE revoga os tokens do próprio usuário
+
+    async def post(self):
+        corpo = self.corpo()
+        try:
+            usuario = await self.executar(autenticar, self.banco, str(corpo.get("email", "")), str(corpo.get("senha", "")))
+        except ServidorOcupado as erro:
+            self.set_header("Retry-After", "5")
+            raise tornado.web.HTTPError(503, reason=str(erro)) from None
+        if usuario is None:
+            raise tornado.web.HTTPError(401, reason="e-mail ou senha incorretos")
+        token = emitir_token(self.banco, usuario)
+        self.write({"token": token, "expira_em": int(token.split(".")[1]),
+                    "usuario": {chave: usuario[chave] for chave in ("id", "nome", "email", "tipo")}})
+
+    async def delete(self):
+        await self.executar(encerrar_sessoes, self.banco, self.usuario["id"])
+        self.set_status(204)
+
+
+class RotaAnalises(_Rota):
+    async def get(self):
+        # Administrador sem ``usuario`` na query string: análises de todos
+        todos = self.usuario["tipo"] == "admin" and self.get_query_argument("usuario", None) is None
+        filtros = FiltrosAnalises(
+            amostra=self.get_query_argument("amostra", ""),
+            parametro=self.get_query_argument("parametro", None),
+            usuario_id=None if todos else self.usuario_alvo(),
+            data_inicio=self.data("desde"),
+            data_fim=self.data("ate"),
+        )
+        self.write(await self.executar(listar_analises, self.banco, filtros, self.cursor(), self.limite()))
+
+    async def post(self):
+        itens = self.corpo().get("analises")
+        if not isinstance(itens, list) or not itens:
+            raise tornado.web.HTTPError(400, reason="informe uma lista não vazia em 'analises'")
+        if len(itens) > LOTE_MAXIMO:
+            raise tornado.web.HTTPError(413, reason=f"no máximo {LOTE_MAXIMO} análises por requisição")
+        resultado = await self.executar(gravar_lote, self.banco, self.usuario_alvo(), itens)
+        self.set_status(201 if resultado["inseridas"] else 422)
+        self.write(resultado)
+
+
+class RotaComposicao(_Rota):
+    async def get(self):
+        self.write(await self.executar(listar_composicao, self.banco, self.usuario_alvo(), self.cursor(composto=False),
+                                       self.limite()))
+
+
+class RotaAnotacoes(_Rota):
+    async def get(self):
+        self.write(await self.executar(listar_anotacoes, self.banco, self.usuario_alvo(), self.cursor(),
+                                       self.limite()))
+
+
+def criar_aplicacao(banco, trabalhadores: int = LEITORES_PADRAO) -> tornado.web.Application:
+    """Aplicação Tornado das rotas; ``trabalhadores`` threads executam as consultas (uma conexão de leitura cada)."""
+    contexto = {"banco": banco, "executor": ThreadPoolExecutor(trabalhadores, thread_name_prefix="api")}
+    return tornado.web.Application([
+        (r"/api/v1/token", RotaToken, contexto),
+        (r"/api/v1/analises", RotaAnalises, contexto),
+        (r"/api/v1/composicao", RotaComposicao, contexto),
+        (r"/api/v1/anotacoes", RotaAnotacoes, contexto),
+    ])
+
+
+async def servir(banco, porta: int = PORTA_PADRAO, endereco: str = "127.0.0.1", trabalhadores: int = LEITORES_PADRAO,
+                 pronto=None):
+    """Atende até o processo ser interrompido; ``pronto()`` é chamado quando a porta está aberta."""
+    servidor = criar_aplicacao(banco, trabalhadores).listen(porta, address=endereco, max_body_size=CORPO_MAXIMO,
+                                                            xheaders=True)
+    if pronto:
+        pronto()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        servidor.stop()
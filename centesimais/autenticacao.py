@@ -0,0 +1,279 @@
+"""Senhas (bcrypt) num pool limitado de trabalhadores e tokens de sessão assinados.
+
+O bcrypt é caro de propósito (≈0,3 s por verificação no custo 12). Quando uma
+turma inteira entra ao mesmo tempo, dezenas de verificações simultâneas
+disputam a CPU e todas as sessões do Streamlit travam. Aqui cada hash roda em
+``PoolSenhas``: no máximo ``trabalhadores`` ao mesmo tempo (o bcrypt libera o
+GIL) e no máximo ``fila_maxima`` esperando; além disso o login é recusado com
+``ServidorOcupado`` em vez de empilhar mais trabalho. ``estatisticas()`` expõe
+a profundidade da fila.
+
+Configuração por variáveis de ambiente:
+
+* ``CENTESIMAIS_BCRYPT_CUSTO``: fator de trabalho dos novos hashes (padrão 12).
+  Hashes com custo diferente são refeitos de forma transparente no login.
+* ``CENTESIMAIS_BCRYPT_TRABALHADORES`` e ``CENTESIMAIS_BCRYPT_FILA``.
+* ``CENTESIMAIS_SEGREDO``: chave dos tokens de sessão; sem ela, uma chave
+  aleatória é criada uma vez em ``.centesimais_segredo`` ao lado do banco.
+
+O token de sessão (``id.expiração.assinatura``, HMAC-SHA256) fica na URL
+(``st.query_params``), de modo que recarregar a página não exige nova
+verificação bcrypt. A assinatura depende do hash da senha e de
+``usuarios.versao_sessao``: trocar a senha ou sair (``encerrar_sessoes``)
+invalida os tokens emitidos antes.
+
+Compromisso: na URL, o token vai para o histórico do navegador, favoritos e
+logs de proxies, e quem o tiver entra como o usuário até ``VALIDADE_TOKEN``
+ou até ele sair. Sair revoga no servidor, mas revoga todas as sessões do
+usuário, em todos os navegadores (e os tokens da API): é o preço de não
+guardar uma linha por sessão.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import bcrypt
+
+CUSTO_PADRAO = 12
+VALIDADE_TOKEN = 8 * 3600  # segundos: um dia de trabalho no laboratório
+
+CAMPOS_USUARIO = ("id", "nome", "email", "tipo", "senha_hash", "versao_sessao")
+SQL_USUARIO = f"SELECT {', '.join(CAMPOS_USUARIO)} FROM usuarios WHERE {{chave}} = ?"
+
+
+def _inteiro_ambiente(nome: str, padrao: int) -> int:
+    try:
+        return int(os.environ[nome])
+    except (KeyError, ValueError):
+        return padrao
+
+
+def custo_configurado() -> int:
+    """Custo bcrypt dos novos hashes, limitado ao intervalo aceito pela biblioteca (4–31)."""
+    return min(max(_inteiro_ambiente("CENTESIMAIS_BCRYPT_CUSTO", CUSTO_PADRAO), 4), 31)
+
+
+def custo_do_hash(senha_hash) -> int | None:
+    """Custo gravado no hash ("$2b$12$..."), ou ``None`` se o formato não for reconhecido."""
+    if isinstance(senha_hash, str):
+        senha_hash = senha_hash.encode("utf-8")
+    partes = senha_hash.split(b"$")
+    try:
+        return int(partes[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class ServidorOcupado(RuntimeError):
+    """A fila de verificações de senha está cheia; o usuário deve tentar de novo em instantes."""
+
+
+# ---------------------- POOL DE HASH ----------------------
+class PoolSenhas:
+    """Executor limitado para ``bcrypt.hashpw``/``checkpw`` com contadores de fila."""
+
+    def __init__(self, trabalhadores: int | None = None, fila_maxima: int | None = None,
+                 custo: int | None = None):
+        self.trabalhadores = trabalhadores or _inteiro_ambiente(
+            "CENTESIMAIS_BCRYPT_TRABALHADORES", os.cpu_count() or 1
+        )
+        self.fila_maxima = fila_maxima if fila_maxima is not None else _inteiro_ambiente("CENTESIMAIS_BCRYPT_FILA", 64)
+        self.custo = custo or custo_configurado()
+        self._executor = ThreadPoolExecutor(self.trabalhadores, thread_name_prefix="bcrypt")
+        self._vagas = threading.BoundedSemaphore(self.trabalhadores + self.fila_maxima)
+        self._trava = threading.Lock()
+        self.em_fila = 0
+        self.em_execucao = 0
+        self.concluidas = 0
+        self.recusadas = 0
+        self.maior_fila = 0
+        self._segundos_espera = 0.0
+
+    def _executar(self, funcao, *args):
+        # Sem esperar vaga: com a fila cheia a recusa é imediata, sem prender a thread da sessão
+        if not self._vagas.acquire(blocking=False):
+            with self._trava:
+                self.recusadas += 1
+            raise ServidorOcupado("Muitos logins simultâneos. Tente novamente em alguns segundos.")
+        enviado = time.perf_counter()
+        with self._trava:
+            self.em_fila += 1
+            self.maior_fila = max(self.maior_fila, self.em_fila)
+
+        def tarefa():
+            with self._trava:
+                self.em_fila -= 1
+                self.em_execucao += 1
+                self._segundos_espera += time.perf_counter() - enviado
+            try:
+                return funcao(*args)
+            finally:
+                with self._trava:
+                    self.em_execucao -= 1
+                    self.concluidas += 1
+                self._vagas.release()
+
+        return self._executor.submit(tarefa).result()
+
+    def gerar_hash(self, senha: str) -> bytes:
+        return self._executar(bcrypt.hashpw, senha.encode("utf-8"), bcrypt.gensalt(self.custo))
+
+    def verificar(self, senha: str, senha_hash) -> bool:
+        if isinstance(senha_hash, str):
+            senha_hash = senha_hash.encode("utf-8")
+        try:
+            return self._executar(bcrypt.checkpw, senha.encode("utf-8"), senha_hash)
+        except ValueError:  # hash corrompido ou em formato desconhecido
+            return False
+
+    def precisa_rehash(self, senha_hash) -> bool:
+        return custo_do_hash(senha_hash) != self.custo
+
+    def estatisticas(self) -> dict:
+        with self._trava:
+            return {
+                "em_fila": self.em_fila,
+                "em_execucao": self.em_execucao,
+                "maior_fila": self.maior_fila,
+                "concluidas": self.concluidas,
+                "recusadas": self.recusadas,
+                "espera_media": self._segundos_espera / self.concluidas if self.concluidas else 0.0,
+                "custo": self.custo,
+            }
+
+
+_pool = None
+_trava_pool = threading.Lock()
+
+
+def obter_pool() -> PoolSenhas:
+    """Pool compartilhado por processo (todas as sessões Streamlit disputam a mesma CPU)."""
+    global _pool
+    with _trava_pool:
+        if _pool is None:
+            _pool = PoolSenhas()
+        return _pool
+
+
+# ---------------------- LOGIN ----------------------
+_hash_ficticio = None
+
+
+def _comparar_ficticio(pool: PoolSenhas, senha: str):
+    """Gasta o mesmo tempo de uma verificação real quando o e-mail não existe."""
+    global _hash_ficticio
+    if _hash_ficticio is None:
+        _hash_ficticio = pool.gerar_hash(secrets.token_hex(16))
+    pool.verificar(senha, _hash_ficticio)
+
+
+def autenticar(banco, email: str, senha: str, pool: PoolSenhas | None = None) -> dict | None:
+    """Usuário (``CAMPOS_USUARIO``) se a senha confere; refaz o hash se o custo mudou."""
+    pool = pool or obter_pool()
+    with banco.leitura() as conn:
+        dados = conn.execute(SQL_USUARIO.format(chave="email"), (email,)).fetchone()
+    if dados is None:
+        _comparar_ficticio(pool, senha)
+        return None
+    usuario = dict(zip(CAMPOS_USUARIO, dados))
+    if not pool.verificar(senha, usuario["senha_hash"]):
+        return None
+
+    if pool.precisa_rehash(usuario["senha_hash"]):
+        novo_hash = pool.gerar_hash(senha)
+        # Só troca se ninguém alterou a senha no meio tempo
+        banco.gravar("UPDATE usuarios SET senha_hash = ? WHERE id = ? AND senha_hash = ?",
+                     (novo_hash, usuario["id"], usuario["senha_hash"]), usuario["id"])
+        usuario["senha_hash"] = novo_hash
+    return usuario
+
+
+# ---------------------- TOKEN DE SESSÃO ----------------------
+TAMANHO_SEGREDO = 32  # bytes
+TENTATIVAS_SEGREDO = 5  # leituras de um arquivo de chave vazio ou incompleto antes de desistir
+_segredo = None
+
+
+def _ler_segredo(arquivo: Path) -> bytes:
+    for _ in range(TENTATIVAS_SEGREDO):
+        segredo = arquivo.read_bytes()
+        if len(segredo) >= TAMANHO_SEGREDO:
+            return segredo
+        time.sleep(0.05)  # criado por uma versão que escrevia a chave depois de criar o arquivo
+    raise RuntimeError(f"chave de sessão vazia ou incompleta em {arquivo}; apague o arquivo ou defina "
+                       "CENTESIMAIS_SEGREDO")
+
+
+def _segredo_sessao(banco) -> bytes:
+    global _segredo
+    if _segredo is None:
+        ambiente = os.environ.get("CENTESIMAIS_SEGREDO")
+        if ambiente:
+            _segredo = ambiente.encode("utf-8")
+        else:
+            arquivo = Path(banco.caminho).with_name(".centesimais_segredo")
+            if arquivo.exists():
+                _segredo = _ler_segredo(arquivo)
+            else:
+                # A chave é escrita inteira num arquivo temporário e só então ganha o nome definitivo
+                # (``link`` falha se outro processo chegou antes): ninguém lê um arquivo pela metade
+                segredo = secrets.token_bytes(TAMANHO_SEGREDO)
+                descritor, temporario = tempfile.mkstemp(dir=arquivo.parent, prefix=".centesimais_segredo-")
+                try:
+                    with os.fdopen(descritor, "wb") as saida:
+                        saida.write(segredo)
+                    os.link(temporario, arquivo)
+                    _segredo = segredo
+                except FileExistsError:
+                    _segredo = _ler_segredo(arquivo)
+                finally:
+                    os.unlink(temporario)
+    return _segredo
+
+
+def _assinatura(banco, usuario: dict, expira: int) -> str:
+    senha_hash = usuario["senha_hash"]
+    if isinstance(senha_hash, str):
+        senha_hash = senha_hash.encode("utf-8")
+    mensagem = b"%d.%d.%d." % (usuario["id"], expira, usuario["versao_sessao"]) + senha_hash
+    digest = hmac.new(_segredo_sessao(banco), mensagem, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def emitir_token(banco, usuario: dict, validade: int = VALIDADE_TOKEN) -> str:
+    expira = int(time.time()) + validade
+    return f"{usuario['id']}.{expira}.{_assinatura(banco, usuario, expira)}"
+
+
+def validar_token(banco, token: str) -> dict | None:
+    """Usuário do token se a assinatura confere e ele não expirou; sem bcrypt, só uma consulta."""
+    try:
+        usuario_id, expira, assinatura = token.split(".")
+        usuario_id, expira = int(usuario_id), int(expira)
+    except (AttributeError, ValueError):
+        return None
+    if expira < time.time():
+        return None
+    with banco.leitura() as conn:
+        dados = conn.execute(SQL_USUARIO.format(chave="id"), (usuario_id,)).fetchone()
+    if dados is None:
+        return None
+    usuario = dict(zip(CAMPOS_USUARIO, dados))
+    # Em bytes: com str, compare_digest levanta TypeError para caracteres fora do ASCII vindos da URL
+    esperada = _assinatura(banco, usuario, expira).encode("ascii")
+    if not hmac.compare_digest(assinatura.encode("utf-8", "surrogateescape"), esperada):
+        return None
+    return usuario
+
+
+def encerrar_sessoes(banco, usuario_id: int):
+    """Revoga todos os tokens já emitidos para o usuário (no app e na API), em todos os navegadores."""
+    banco.gravar("UPDATE usuarios SET versao_sessao = versao_sessao + 1 WHERE id = ?", (usuario_id,), usuario_id)
@@ -0,0 +1,83 @@
+"""Busca textual (SQLite FTS5) em anotações e nomes de amostras.
+
+As tabelas virtuais ``anotacoes_fts`` (título e conteúdo) e ``amostras_fts``
+(``analises.nome_amostra``) usam as próprias tabelas como conteúdo externo e
+são mantidas por gatilhos (ver migração 6). A consulta digitada vira uma busca
+por prefixo de cada termo, sem acentos nem diferença de maiúsculas, e os
+resultados saem ordenados por relevância (BM25), com os termos destacados.
+"""
+
+import re
+
+import pandas as pd
+
+LIMITE_RESULTADOS = 50
+# Marcadores do highlight()/snippet(); caracteres de controle não aparecem nos textos
+INICIO_DESTAQUE = "\x02"
+FIM_DESTAQUE = "\x03"
+
+# Título pesa mais que o conteúdo no BM25
+SQL_BUSCAR_ANOTACOES = f"""
+    SELECT a.id, a.titulo, a.conteudo, a.data,
+           highlight(anotacoes_fts, 0, '{INICIO_DESTAQUE}', '{FIM_DESTAQUE}') AS titulo_destacado,
+           snippet(anotacoes_fts, 1, '{INICIO_DESTAQUE}', '{FIM_DESTAQUE}', '…', 24) AS trecho,
+           bm25(anotacoes_fts, 10.0, 1.0) AS relevancia
+    FROM anotacoes_fts JOIN anotacoes a ON a.id = anotacoes_fts.rowid
+    WHERE anotacoes_fts MATCH ? AND a.usuario_id = ?
+    ORDER BY relevancia
+    LIMIT ?
+"""
+
+# MATERIALIZED impede que o SQLite achate a subconsulta no GROUP BY, onde highlight() não pode ser usado
+SQL_BUSCAR_AMOSTRAS = f"""
+    WITH acertos AS MATERIALIZED (
+        SELECT a.usuario_id, a.nome_amostra, a.data,
+               highlight(amostras_fts, 0, '{INICIO_DESTAQUE}', '{FIM_DESTAQUE}') AS destaque,
+               bm25(amostras_fts) AS relevancia
+        FROM amostras_fts JOIN analises a ON a.id = amostras_fts.rowid
+        WHERE amostras_fts MATCH ? {{filtro}}
+    )
+    SELECT acertos.usuario_id, u.nome AS usuario, acertos.nome_amostra, MIN(destaque) AS destaque,
+           COUNT(*) AS analises, MAX(acertos.data) AS ultima_analise, MIN(relevancia) AS relevancia
+    FROM acertos LEFT JOIN usuarios u ON u.id = acertos.usuario_id
+    GROUP BY acertos.usuario_id, acertos.nome_amostra
+    ORDER BY relevancia, acertos.nome_amostra
+    LIMIT ?
+"""
+
+
+def consulta_fts(texto: str) -> str | None:
+    """Converte o texto digitado numa consulta FTS5: todos os termos, cada um como prefixo.
+
+    Aspas e operadores do usuário são neutralizados; ``None`` se não sobrar termo.
+    """
+    termos = re.findall(r"\w+", texto or "")
+    if not termos:
+        return None
+    return " ".join(f'"{termo}"*' for termo in termos)
+
+
+def destacar(texto, inicio: str = "**", fim: str = "**") -> str:
+    """Troca os marcadores de ``highlight()``/``snippet()`` pelos delimitadores desejados."""
+    return str(texto or "").replace(INICIO_DESTAQUE, inicio).replace(FIM_DESTAQUE, fim)
+
+
+def buscar_anotacoes(banco, usuario_id, texto: str, limite: int = LIMITE_RESULTADOS) -> pd.DataFrame:
+    """Anotações do usuário que casam com ``texto``, com título destacado e trecho do conteúdo."""
+    consulta = consulta_fts(texto)
+    if consulta is None:
+        return pd.DataFrame()
+    return banco.consultar(SQL_BUSCAR_ANOTACOES, (consulta, usuario_id, limite), usuario_id)
+
+
+def buscar_amostras(banco, texto: str, usuario_id=None, limite: int = LIMITE_RESULTADOS) -> pd.DataFrame:
+    """Amostras (por usuário) cujo nome casa com ``texto``, da mais relevante para a menos."""
+    consulta = consulta_fts(texto)
+    if consulta is None:
+        return pd.DataFrame()
+    params = [consulta]
+    filtro = ""
+    if usuario_id is not None:
+        filtro = "AND a.usuario_id = ?"
+        params.append(usuario_id)
+    return banco.consultar(SQL_BUSCAR_AMOSTRAS.format(filtro=filtro), (*params, limite), usuario_id)
@@ -0,0 +1,107 @@
+"""Cache de consultas versionado por escrita, para as reexecuções do Streamlit.
+
+Cada resultado fica guardado sob a chave (sql, parâmetros, escopo, versão do
+escopo, geração). O escopo é o ``usuario_id`` da consulta ou ``None`` para
+consultas globais (painel do administrador). Toda escrita de um usuário
+incrementa a versão dele e a versão global; uma escrita sem dono conhecido
+incrementa a geração, que entra em todas as chaves. As chaves antigas
+simplesmente deixam de ser usadas e saem pelo LRU. Interações que não gravam
+nada (digitar num ``number_input``, trocar de aba) são atendidas sem tocar no
+SQLite.
+
+Escritas feitas por outros processos (CLI, API) não passam por este contador;
+``ttl`` limita por quanto tempo um resultado pode ficar desatualizado.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+CAPACIDADE_PADRAO = 256  # entradas
+LIMITE_BYTES_PADRAO = 64 * 1024 * 1024
+TTL_PADRAO = 60.0  # segundos
+
+
+class CacheConsultas:
+    """LRU limitado por número de entradas e por memória, com contadores de acerto."""
+
+    def __init__(self, capacidade: int = CAPACIDADE_PADRAO, limite_bytes: int = LIMITE_BYTES_PADRAO,
+                 ttl: float = TTL_PADRAO):
+        self.capacidade = capacidade
+        self.limite_bytes = limite_bytes
+        self.ttl = ttl
+        self._entradas = OrderedDict()  # chave -> (DataFrame, bytes, criado_em)
+        self._versoes = {}
+        self._geracao = 0  # escritas sem dono: mudam todas as chaves, inclusive de escopos nunca gravados
+        self._bytes = 0
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.removidas = 0
+
+    def versao(self, usuario_id=None) -> tuple:
+        """(versão do escopo, geração): muda a cada escrita que afeta as consultas do escopo."""
+        return self._versoes.get(usuario_id, 0), self._geracao
+
+    def invalidar(self, usuario_id=None):
+        """Registra uma escrita: novas versões para o usuário e para o escopo global (``None``: tudo)."""
+        with self._trava:
+            if usuario_id is None:
+                self._geracao += 1
+            else:
+                self._versoes[None] = self._versoes.get(None, 0) + 1
+                self._versoes[usuario_id] = self._versoes.get(usuario_id, 0) + 1
+
+    def _remover_antigas(self):
+        while self._entradas and (len(self._entradas) > self.capacidade or self._bytes > self.limite_bytes):
+            _, (_, tamanho, _) = self._entradas.popitem(last=False)
+            self._bytes -= tamanho
+            self.removidas += 1
+
+    def obter(self, sql: str, params=(), usuario_id=None, carregar=None) -> "pd.DataFrame":
+        """Devolve o resultado em cache ou chama ``carregar()`` e guarda o DataFrame.
+
+        O DataFrame devolvido é compartilhado entre sessões: não o modifique no lugar.
+        """
+        chave = (sql, tuple(params), usuario_id, self.versao(usuario_id))
+        agora = time.monotonic()
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and agora - entrada[2] <= self.ttl:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return entrada[0]
+            self.falhas += 1
+
+        df = carregar()
+        tamanho = int(df.memory_usage(index=True, deep=True).sum())
+        with self._trava:
+            anterior = self._entradas.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            if tamanho <= self.limite_bytes:
+                self._entradas[chave] = (df, tamanho, agora)
+                self._bytes += tamanho
+                self._remover_antigas()
+        return df
+
+    def estatisticas(self) -> dict:
+        with self._trava:
+            total = self.acertos + self.falhas
+            return {
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": self.acertos / total if total else 0.0,
+                "removidas": self.removidas,
+            }
+
+    def limpar(self):
+        with self._trava:
+            self._entradas.clear()
+            self._bytes = 0
@@ -0,0 +1,198 @@
+"""Motor de cálculo vetorizado dos métodos centesimais.
+
+Todas as funções recebem arrays NumPy (ou escalares/listas) de formato
+``(n_amostras, n_replicatas)`` e calculam todas as replicatas de todas as
+amostras numa única passada. Denominadores nulos ou negativos resultam em
+``NaN`` para que o chamador decida entre rejeitar a leitura ou exibir zero.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+FATOR_PROTEINA_PADRAO = 6.25
+MASSA_MOLAR_NITROGENIO = 14.007
+
+# Leituras brutas exigidas por método, na ordem dos argumentos das funções abaixo
+CAMPOS = {
+    "Umidade": ("peso_cadinho", "peso_cadinho_amostra", "peso_cadinho_seco"),
+    "Cinzas": ("peso_cadinho", "peso_cadinho_amostra", "peso_cadinho_cinzas"),
+    "Proteínas": ("volume_hcl", "volume_branco", "normalidade", "peso_amostra"),
+    "Lipídios": ("peso_frasco_vazio", "peso_frasco_lipidios", "peso_amostra"),
+    "Fibras Totais": ("peso_residuo", "correcao_proteina", "correcao_cinzas", "peso_amostra"),
+}
+
+
+def _array(valor) -> np.ndarray:
+    return np.asarray(valor, dtype=np.float64)
+
+
+def _percentual(numerador, denominador) -> np.ndarray:
+    """numerador / denominador * 100, com NaN onde o denominador não é positivo."""
+    numerador, denominador = np.broadcast_arrays(_array(numerador), _array(denominador))
+    saida = np.full(numerador.shape, np.nan)
+    np.divide(numerador, denominador, out=saida, where=denominador > 0)
+    return saida * 100
+
+
+# ---------------------- MÉTODOS ----------------------
+def umidade(peso_cadinho, peso_cadinho_amostra, peso_cadinho_seco) -> np.ndarray:
+    """Umidade (%) por secagem em estufa a 105 °C — AOAC 925.10."""
+    peso_cadinho = _array(peso_cadinho)
+    peso_umida = _array(peso_cadinho_amostra) - peso_cadinho
+    peso_seca = _array(peso_cadinho_seco) - peso_cadinho
+    return _percentual(peso_umida - peso_seca, peso_umida)
+
+
+def cinzas(peso_cadinho, peso_cadinho_amostra, peso_cadinho_cinzas) -> np.ndarray:
+    """Cinzas (%) por incineração em mufla a 550 °C — AOAC 923.03."""
+    peso_cadinho = _array(peso_cadinho)
+    return _percentual(_array(peso_cadinho_cinzas) - peso_cadinho, _array(peso_cadinho_amostra) - peso_cadinho)
+
+
+def proteinas(volume_hcl, volume_branco, normalidade, peso_amostra, fator=FATOR_PROTEINA_PADRAO) -> np.ndarray:
+    """Proteínas (%) pelo nitrogênio total Kjeldahl — AOAC 920.87."""
+    miliequivalentes = (_array(volume_hcl) - _array(volume_branco)) * _array(normalidade)
+    nitrogenio = _percentual(miliequivalentes * MASSA_MOLAR_NITROGENIO, _array(peso_amostra) * 1000) / 100
+    return nitrogenio * _array(fator)
+
+
+def proteinas_por_nitrogenio(teor_nitrogenio, fator=FATOR_PROTEINA_PADRAO) -> np.ndarray:
+    """Proteínas (%) a partir do teor de nitrogênio já determinado."""
+    return _array(teor_nitrogenio) * _array(fator)
+
+
+def lipidios(peso_frasco_vazio, peso_frasco_lipidios, peso_amostra) -> np.ndarray:
+    """Lipídios (%) por extração etérea (Soxhlet) — AOAC 920.39."""
+    return _percentual(_array(peso_frasco_lipidios) - _array(peso_frasco_vazio), peso_amostra)
+
+
+def fibras(peso_residuo, correcao_proteina, correcao_cinzas, peso_amostra) -> np.ndarray:
+    """Fibra alimentar total (%) por digestão enzimática — AOAC 985.29."""
+    residuo = _array(peso_residuo) - _array(correcao_proteina) - _array(correcao_cinzas)
+    return _percentual(residuo, peso_amostra)
+
+
+METODOS = {
+    "Umidade": umidade,
+    "Cinzas": cinzas,
+    "Proteínas": proteinas,
+    "Lipídios": lipidios,
+    "Fibras Totais": fibras,
+}
+
+
+# ---------------------- ESTATÍSTICAS DAS REPLICATAS ----------------------
+@dataclass
+class ResultadoCalculo:
+    """Resultados por replicata e estatísticas por amostra (eixo 0).
+
+    Linhas com menos replicatas que a maior vêm completadas com NaN à direita;
+    ``n`` diz quantas são válidas em cada linha.
+    """
+
+    replicatas: np.ndarray
+    media: np.ndarray
+    desvio_padrao: np.ndarray
+    coef_var: np.ndarray
+    n: np.ndarray | None = None
+
+    def valores(self, indice: int = 0) -> np.ndarray:
+        """Replicatas válidas da amostra ``indice``."""
+        linha = self.replicatas[indice]
+        return linha if self.n is None else linha[:int(self.n[indice])]
+
+
+@dataclass
+class AcumuladorReplicatas:
+    """Média e variância de uma amostra pelo algoritmo de Welford.
+
+    Uma passada, numericamente estável (sem Σx² − (Σx)²/n), e atualizável:
+    ``adicionar`` incorpora uma nova replicata sem revisitar as anteriores.
+    """
+
+    n: int = 0
+    media: float = 0.0
+    m2: float = 0.0  # Σ(x − média)²
+
+    @classmethod
+    def de_valores(cls, valores) -> "AcumuladorReplicatas":
+        acumulador = cls()
+        for valor in valores:
+            acumulador.adicionar(valor)
+        return acumulador
+
+    def adicionar(self, valor: float) -> "AcumuladorReplicatas":
+        self.n += 1
+        delta = valor - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (valor - self.media)
+        return self
+
+    @property
+    def desvio_padrao(self) -> float:
+        """Desvio padrão amostral (n − 1); zero com uma única replicata."""
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else 0.0
+
+    @property
+    def coef_var(self) -> float:
+        return self.desvio_padrao * 100 / self.media if self.media else 0.0
+
+
+def welford(replicatas, n=None) -> tuple:
+    """(n, média, M2) de cada linha, numa única passada pelas colunas.
+
+    É o ``AcumuladorReplicatas`` aplicado a todas as amostras ao mesmo tempo.
+    ``n`` (por linha) limita as colunas válidas; NaN dentro delas se propaga.
+    """
+    replicatas = np.atleast_2d(_array(replicatas))
+    linhas, colunas = replicatas.shape
+    limite = np.full(linhas, colunas) if n is None else np.minimum(np.broadcast_to(_array(n), linhas), colunas)
+    contagem, media, m2 = np.zeros(linhas), np.zeros(linhas), np.zeros(linhas)
+    for coluna in range(colunas):
+        ativa = coluna < limite
+        valor = replicatas[:, coluna]
+        contagem += ativa
+        delta = np.where(ativa, valor - media, 0.0)
+        media += np.divide(delta, contagem, out=np.zeros(linhas), where=contagem > 0)
+        m2 += np.where(ativa, delta * (valor - media), 0.0)
+    media[contagem == 0] = np.nan
+    return contagem.astype(np.int64), media, m2
+
+
+def estatisticas(replicatas, casas: int | None = 2, n=None) -> ResultadoCalculo:
+    """Média, desvio padrão amostral e CV (%) de cada linha de ``replicatas``.
+
+    Com ``casas`` definido, as replicatas são arredondadas antes das
+    estatísticas e todos os resultados são arredondados, como nos formulários.
+    CV é zero quando a média é zero e o desvio é zero com uma única replicata.
+    ``n`` dá o nº de replicatas válidas por linha (as demais colunas são ignoradas).
+    """
+    replicatas = np.atleast_2d(_array(replicatas))
+    if casas is not None:
+        replicatas = replicatas.round(casas)
+    contagem, media, m2 = welford(replicatas, n)
+    desvio = np.zeros_like(media)
+    np.sqrt(np.divide(m2, contagem - 1, out=desvio, where=contagem > 1), out=desvio)
+    coef_var = np.zeros_like(media)
+    np.divide(desvio * 100, media, out=coef_var, where=media != 0)
+    if casas is not None:
+        media, desvio, coef_var = media.round(casas), desvio.round(casas), coef_var.round(casas)
+    return ResultadoCalculo(replicatas, media, desvio, coef_var, contagem)
+
+
+def calcular(parametro: str, leituras: dict, casas: int | None = 2, preencher: float | None = None) -> ResultadoCalculo:
+    """Aplica o método de ``parametro`` às leituras brutas e resume as replicatas.
+
+    ``leituras`` mapeia os nomes de ``CAMPOS[parametro]`` (e, para Proteínas,
+    opcionalmente ``fator``) para arrays ``(n_amostras, n_replicatas)``.
+    ``preencher`` substitui os NaN de denominador inválido (os formulários usam 0).
+    """
+    metodo = METODOS[parametro]
+    argumentos = {campo: leituras[campo] for campo in CAMPOS[parametro]}
+    if parametro == "Proteínas" and "fator" in leituras:
+        argumentos["fator"] = leituras["fator"]
+    replicatas = metodo(**argumentos)
+    if preencher is not None:
+        replicatas = np.nan_to_num(replicatas, nan=preencher)
+    return estatisticas(replicatas, casas)
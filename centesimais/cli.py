@@ -0,0 +1,303 @@
+"""Linha de comando para rotinas em lote (cron), sem Streamlit.
+
+    python -m centesimais [--banco banco.db] importar leituras.csv --usuario ana@lab.br
+    python -m centesimais importar analises.parquet [--usuario ana@lab.br]
+    python -m centesimais exportar --formato xlsx [--usuario ana@lab.br] [--parametro Cinzas] [--saida arq.xlsx]
+    python -m centesimais exportar --formato parquet|arrow [--sem-particao] [--saida analises.parquet]
+    python -m centesimais pacote [--formatos pdf xlsx] [--usuario ana@lab.br] [--trabalhadores N]
+    python -m centesimais recalcular
+    python -m centesimais discrepantes [--confianca 0.95] [--saida suspeitas.csv]
+    python -m centesimais ingerir PASTA --usuario ana@lab.br [--mapa amostras.csv] [--replicatas 3] [--uma-vez]
+    python -m centesimais api [--porta 8502] [--endereco 127.0.0.1]
+    python -m centesimais instantaneo [--forcar]
+
+Os subcomandos também aceitam os nomes em inglês (``import``, ``export``,
+``bundle``, ``recompute``, ``outliers``, ``ingest``, ``serve``, ``snapshot``). Usuários são informados pelo e-mail ou pelo id.
+O código de saída é 0 em caso de sucesso, 1 se houve linhas rejeitadas na
+importação e 2 para erros de uso.
+"""
+
+import argparse
+import shutil
+import sys
+import time
+from pathlib import Path
+
+from centesimais.conexao import BancoDados
+
+FORMATOS = {"pdf": "pdf", "xlsx": "xlsx", "excel": "xlsx", "parquet": "parquet", "arrow": "arrow"}
+FORMATOS_COLUNARES = ("parquet", "arrow")
+EXTENSOES_COLUNARES = (".parquet", ".arrow", ".feather", ".ipc")
+
+
+class ErroUso(Exception):
+    """Argumento válido para o argparse, mas inconsistente com o banco (usuário inexistente etc.)."""
+
+
+def _usuario(banco, valor: str | None) -> int | None:
+    """Id do usuário informado por e-mail ou id; ``None`` se não informado."""
+    if valor is None:
+        return None
+    with banco.leitura() as conn:
+        if valor.isdigit():
+            linha = conn.execute("SELECT id FROM usuarios WHERE id = ?", (int(valor),)).fetchone()
+        else:
+            linha = conn.execute("SELECT id FROM usuarios WHERE email = ?", (valor,)).fetchone()
+    if linha is None:
+        raise ErroUso(f"usuário não encontrado: {valor}")
+    return linha[0]
+
+
+# ---------------------- SUBCOMANDOS ----------------------
+def _colunar(arquivo: Path) -> bool:
+    """Parquet/Arrow: arquivo com a extensão ou pasta particionada de ``exportar``."""
+    return arquivo.is_dir() or arquivo.suffix.lower() in EXTENSOES_COLUNARES
+
+
+def importar(banco, args) -> int:
+    from centesimais.importacao import importar_arquivo
+
+    usuario_id = _usuario(banco, args.usuario)
+    codigo = 0
+    for arquivo in args.arquivos:
+        try:
+            if _colunar(arquivo):
+                from centesimais.colunar import importar_colunar
+
+                resultado = importar_colunar(banco, arquivo, usuario_id)
+            elif usuario_id is None:
+                raise ErroUso(f"{arquivo}: informe --usuario para importar leituras de CSV/XLSX")
+            else:
+                resultado = importar_arquivo(banco, usuario_id, arquivo)
+        except (OSError, ValueError) as erro:
+            raise ErroUso(f"{arquivo}: {erro}") from erro
+        print(f"{arquivo}: {resultado.analises_inseridas} análises de {resultado.linhas_lidas} linhas "
+              f"em {resultado.segundos:.2f}s ({resultado.linhas_por_segundo:,.0f} linhas/s), "
+              f"{len(resultado.rejeitadas)} rejeitada(s)")
+        if not resultado.rejeitadas.empty:
+            codigo = 1
+            if args.rejeitadas is not None:
+                destino = args.rejeitadas
+                if len(args.arquivos) > 1:
+                    destino = destino.with_name(f"{destino.stem}_{arquivo.stem}{destino.suffix}")
+                resultado.rejeitadas.to_csv(destino, index=False)
+                print(f"  linhas rejeitadas em {destino}")
+            else:
+                for linha in resultado.rejeitadas.itertuples(index=False):
+                    print(f"  linha {linha.linha}: {linha.motivo}", file=sys.stderr)
+    return codigo
+
+
+def exportar(banco, args) -> int:
+    from centesimais.relatorios import exportar_excel, exportar_pdf
+
+    usuario_id = _usuario(banco, args.usuario)
+    formato = FORMATOS[args.formato]
+    inicio = time.perf_counter()
+    if formato in FORMATOS_COLUNARES:
+        return exportar_colunar(banco, args, usuario_id, formato)
+    if formato == "pdf":
+        titulo = f"Relatório de Análises — {args.parametro}" if args.parametro else "Relatório de Análises"
+        temporario = exportar_pdf(banco, usuario_id, args.parametro, titulo)
+    else:
+        temporario = exportar_excel(banco, usuario_id, args.parametro)
+    destino = args.saida or Path(
+        "_".join(["analises", str(usuario_id or "todos"), *([args.parametro] if args.parametro else [])]) + f".{formato}"
+    )
+    shutil.move(temporario, destino)
+    print(f"{destino} ({destino.stat().st_size / 1024:,.0f} KiB) em {time.perf_counter() - inicio:.2f}s")
+    return 0
+
+
+def exportar_colunar(banco, args, usuario_id, formato) -> int:
+    from centesimais import colunar
+
+    inicio = time.perf_counter()
+    destino = args.saida or Path(
+        "_".join(["analises", str(usuario_id or "todos"), *([args.parametro] if args.parametro else [])])
+        + colunar.FORMATOS[formato][1]
+    )
+    linhas = colunar.exportar_colunar(banco, destino, formato, usuario_id, args.parametro, not args.sem_particao)
+    arquivos = [destino] if destino.is_file() else [a for a in destino.rglob("*") if a.is_file()]
+    tamanho = sum(arquivo.stat().st_size for arquivo in arquivos)
+    print(f"{destino} ({linhas} análises, {len(arquivos)} arquivo(s), {tamanho / 1024:,.0f} KiB) "
+          f"em {time.perf_counter() - inicio:.2f}s")
+    return 0
+
+
+def pacote(banco, args) -> int:
+    from centesimais.pacotes import gerar_pacote
+
+    usuario_id = _usuario(banco, args.usuario)
+    inicio = time.perf_counter()
+
+    def progresso(feitos, total, nome):
+        print(f"\r{feitos}/{total} {nome[:60]:60}", end="", flush=True)
+
+    temporario = gerar_pacote(banco, usuario_id, args.formatos, args.trabalhadores, progresso)
+    destino = args.saida or Path(f"relatorios_{usuario_id or 'laboratorio'}.zip")
+    shutil.move(temporario, destino)
+    print(f"\n{destino} ({destino.stat().st_size / 1024:,.0f} KiB) em {time.perf_counter() - inicio:.2f}s")
+    return 0
+
+
+def recalcular(banco, args) -> int:
+    from centesimais.analises import recalcular_derivados
+
+    inicio = time.perf_counter()
+    recalcular_derivados(banco)
+    with banco.leitura() as conn:
+        amostras = conn.execute("SELECT COUNT(*) FROM composicao").fetchone()[0]
+    print(f"composição ({amostras} amostras), resumo diário, cartas de controle e busca recalculados em {time.perf_counter() - inicio:.2f}s")
+    return 0
+
+
+def discrepantes(banco, args) -> int:
+    from centesimais.discrepantes import suspeitas, varrer
+
+    resultado = varrer(banco, args.confianca,
+                       progresso=lambda testadas: print(f"\r{testadas} análises testadas", end="", flush=True))
+    testes = ", ".join(f"{n} por {teste}" for teste, n in sorted(resultado.por_teste.items())) or "nenhuma"
+    print(f"\n{resultado.suspeitas} replicata(s) suspeita(s) ({testes}) com {resultado.confianca:.0%} de confiança "
+          f"em {resultado.segundos:.2f}s ({resultado.analises_por_segundo:,.0f} análises/s)")
+    if args.saida is not None:
+        suspeitas(banco).to_csv(args.saida, index=False)
+        print(f"suspeitas em {args.saida}")
+    return 0
+
+
+def ingerir(banco, args) -> int:
+    from centesimais.ingestao import Ingestor, ler_mapa
+
+    if not args.pasta.is_dir():
+        raise ErroUso(f"pasta não encontrada: {args.pasta}")
+    usuario_id = _usuario(banco, args.usuario)
+    try:
+        mapa = ler_mapa(banco, args.mapa) if args.mapa is not None else None
+    except (OSError, ValueError) as erro:
+        raise ErroUso(f"{args.mapa}: {erro}") from erro
+    ingestor = Ingestor(banco, args.pasta, usuario_id, mapa, args.replicatas, args.inatividade * 60)
+
+    def mostrar(resultado):
+        if resultado.linhas or resultado.analises:
+            print(f"{resultado.arquivos} arquivo(s), {resultado.linhas} linhas ({resultado.linhas_por_segundo:,.0f}/s): "
+                  f"{resultado.leituras} leituras, {resultado.analises} análises gravadas, "
+                  f"{resultado.rejeitadas} rejeitada(s), {resultado.pendentes} leituras aguardando", flush=True)
+
+    if args.uma_vez:
+        mostrar(ingestor.ciclo())
+        return 0
+    print(f"observando {args.pasta} (Ctrl+C para encerrar)", flush=True)
+    try:
+        ingestor.executar(args.intervalo, ao_ciclo=mostrar)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def api(banco, args) -> int:
+    import asyncio
+
+    from centesimais.api import servir
+
+    def pronto():
+        print(f"API em http://{args.endereco}:{args.porta}/api/v1 (Ctrl+C para encerrar)", flush=True)
+
+    try:
+        asyncio.run(servir(banco, args.porta, args.endereco, args.trabalhadores, pronto))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def instantaneo(banco, args) -> int:
+    gestor = banco.instantaneo
+    inicio = time.perf_counter()
+    retrato = gestor.gerar(forcar=args.forcar)
+    print(f"{retrato.pasta} (versão {retrato.versao}, {retrato.linhas} análises, {retrato.bytes / 1e6:.1f} MB) "
+          + (f"gerado em {time.perf_counter() - inicio:.2f}s" if gestor.geracoes else "já atualizado"))
+    return 0
+
+
+# ---------------------- ENTRADA ----------------------
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="centesimais", description=__doc__.splitlines()[0])
+    parser.add_argument("--banco", type=Path, default=Path("banco.db"), help="arquivo SQLite (padrão: banco.db)")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    p = comandos.add_parser("importar", aliases=["import"],
+                            help="importa leituras brutas de CSV/XLSX ou análises de Parquet/Arrow")
+    p.add_argument("arquivos", type=Path, nargs="+")
+    p.add_argument("--usuario", default=None,
+                   help="e-mail ou id do dono das análises; obrigatório em CSV/XLSX, "
+                        "em Parquet/Arrow substitui o usuario_id do arquivo")
+    p.add_argument("--rejeitadas", type=Path, default=None,
+                   help="CSV das linhas rejeitadas (com vários arquivos, um por arquivo, com o nome dele como sufixo)")
+    p.set_defaults(executar=importar)
+
+    p = comandos.add_parser("exportar", aliases=["export"],
+                            help="gera o relatório PDF ou Excel, ou exporta as análises em Parquet/Arrow")
+    p.add_argument("--formato", choices=list(FORMATOS), default="xlsx")
+    p.add_argument("--usuario", default=None, help="e-mail ou id; padrão: todos os usuários")
+    p.add_argument("--parametro", default=None)
+    p.add_argument("--saida", type=Path, default=None)
+    p.add_argument("--sem-particao", action="store_true",
+                   help="Parquet/Arrow num único arquivo em vez de uma pasta por parâmetro")
+    p.set_defaults(executar=exportar)
+
+    p = comandos.add_parser("pacote", aliases=["bundle"], help="ZIP com um relatório por usuário × parâmetro")
+    p.add_argument("--formatos", nargs="+", choices=["pdf", "xlsx"], default=["pdf", "xlsx"])
+    p.add_argument("--usuario", default=None, help="e-mail ou id; padrão: todos os usuários")
+    p.add_argument("--trabalhadores", type=int, default=None, help="processos (padrão: número de CPUs)")
+    p.add_argument("--saida", type=Path, default=None)
+    p.set_defaults(executar=pacote)
+
+    p = comandos.add_parser("recalcular", aliases=["recompute"],
+                            help="refaz composição, resumo diário, cartas de controle e índices de busca")
+    p.set_defaults(executar=recalcular)
+
+    p = comandos.add_parser("discrepantes", aliases=["outliers"],
+                            help="Dixon Q (n = 3) e Grubbs (n ≥ 4) em todas as replicatas gravadas")
+    p.add_argument("--confianca", type=float, choices=[0.90, 0.95, 0.99], default=0.95)
+    p.add_argument("--saida", type=Path, default=None, help="CSV com as análises marcadas")
+    p.set_defaults(executar=discrepantes)
+
+    p = comandos.add_parser("ingerir", aliases=["ingest"],
+                            help="observa uma pasta de arquivos da balança e do titulador e grava as análises")
+    p.add_argument("pasta", type=Path)
+    p.add_argument("--usuario", required=True, help="e-mail ou id do dono das análises fora do mapa")
+    p.add_argument("--mapa", type=Path, default=None, help="CSV/XLSX com codigo;amostra[;usuario]")
+    p.add_argument("--replicatas", type=int, default=None,
+                   help="fecha a análise com este nº de replicatas completas (padrão: só por inatividade)")
+    p.add_argument("--inatividade", type=float, default=10.0,
+                   help="minutos sem leituras novas para fechar uma análise com replicatas faltando")
+    p.add_argument("--intervalo", type=float, default=2.0, help="segundos entre varreduras da pasta")
+    p.add_argument("--uma-vez", action="store_true", help="uma única passada, para cron")
+    p.set_defaults(executar=ingerir)
+
+    p = comandos.add_parser("api", aliases=["serve"], help="API HTTP JSON para o LIMS (envio em lote e consultas)")
+    p.add_argument("--porta", type=int, default=8502)
+    p.add_argument("--endereco", default="127.0.0.1", help="0.0.0.0 para aceitar conexões de outras máquinas")
+    p.add_argument("--trabalhadores", type=int, default=8, help="threads de consulta ao banco")
+    p.set_defaults(executar=api)
+
+    p = comandos.add_parser("instantaneo", aliases=["snapshot"],
+                            help="gera o instantâneo colunar do painel se analises mudou (para cron)")
+    p.add_argument("--forcar", action="store_true", help="gera mesmo sem alterações")
+    p.set_defaults(executar=instantaneo)
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    if not args.banco.exists():
+        # Em rotinas agendadas, um caminho errado não deve criar um banco vazio
+        parser.error(f"banco não encontrado: {args.banco}")
+    banco = BancoDados(args.banco)
+    try:
+        return args.executar(banco, args)
+    except ErroUso as erro:
+        parser.error(str(erro))
+    finally:
+        banco.fechar()
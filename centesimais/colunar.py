@@ -0,0 +1,312 @@
+"""Exportação e importação colunar (Parquet e Arrow IPC) da tabela de análises.
+
+Para quem analisa os dados em pandas, Polars ou DuckDB, em vez do Excel do
+relatório. As colunas saem tipadas (``ESQUEMA``): as replicatas viram uma
+lista de float64 montada direto dos BLOBs (``centesimais.replicatas``), sem
+passar por texto, e ``data`` vira timestamp. As linhas são lidas do cursor em
+blocos de ``TAMANHO_LOTE`` e gravadas bloco a bloco, com memória constante.
+
+Por padrão o destino é uma pasta particionada por parâmetro, no formato Hive
+(``parametro=Cinzas/parte-0.parquet``), que os leitores remontam com a
+coluna ``parametro``::
+
+    pd.read_parquet("analises.parquet")
+    pl.scan_parquet("analises.parquet/**/*.parquet", hive_partitioning=True)
+    ds.dataset("analises.arrow", format="arrow", partitioning="hive").to_table()
+
+O Arrow IPC sai sem compressão, para ser mapeado em memória sem cópia. Com
+``particionar=False``, um único arquivo (é o que o app oferece para
+download). ``importar_colunar`` faz o caminho inverso, numa transação.
+"""
+
+import time
+from datetime import datetime
+from operator import itemgetter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from centesimais import calculos
+from centesimais.analises import SQL_INSERIR_ANALISE
+from centesimais.importacao import ResultadoImportacao
+from centesimais.relatorios import arquivo_temporario
+from centesimais.replicatas import REPLICATAS_MAXIMAS, REPLICATAS_MINIMAS, colunas_legado
+
+TAMANHO_LOTE = 65_536  # linhas por fetchmany = linhas por grupo no Parquet
+COMPRESSAO_PARQUET = "zstd"
+# formato -> (formato do pyarrow.dataset, extensão)
+FORMATOS = {"parquet": ("parquet", ".parquet"), "arrow": ("ipc", ".arrow")}
+EXTENSOES = {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow"}
+
+ESQUEMA = pa.schema([
+    ("id", pa.int64()),
+    ("usuario_id", pa.int64()),
+    ("nome_amostra", pa.string()),
+    ("parametro", pa.string()),
+    ("n_replicatas", pa.int8()),
+    ("replicatas", pa.list_(pa.float64())),
+    ("media", pa.float64()),
+    ("desvio_padrao", pa.float64()),
+    ("coef_var", pa.float64()),
+    ("data", pa.timestamp("s")),
+])
+PARTICAO = ds.partitioning(pa.schema([("parametro", pa.string())]), flavor="hive")
+
+SQL_COLUNAR = """
+    SELECT id, usuario_id, nome_amostra, parametro, n_replicatas, replicatas, media, desvio_padrao, coef_var, data
+    FROM analises {filtro}
+    ORDER BY parametro, nome_amostra, data
+"""
+
+
+def sql_colunar(usuario_id=None, parametro=None) -> tuple:
+    condicoes, params = [], []
+    if usuario_id is not None:
+        condicoes.append("usuario_id = ?")
+        params.append(usuario_id)
+    if parametro is not None:
+        condicoes.append("parametro = ?")
+        params.append(parametro)
+    filtro = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+    return SQL_COLUNAR.format(filtro=filtro), tuple(params)
+
+
+# ---------------------- EXPORTAÇÃO ----------------------
+def _replicatas(blobs) -> pa.ListArray:
+    """Lista de float64 por linha a partir dos BLOBs empacotados (nula sem replicatas)."""
+    tamanhos = np.fromiter((len(blob) // 8 if blob else 0 for blob in blobs), dtype=np.int32, count=len(blobs))
+    deslocamentos = np.zeros(len(blobs) + 1, dtype=np.int32)
+    np.cumsum(tamanhos, out=deslocamentos[1:])
+    valores = np.frombuffer(b"".join(blob for blob in blobs if blob), dtype="<f8")
+    nulas = pa.array([not blob for blob in blobs], type=pa.bool_())
+    return pa.ListArray.from_arrays(pa.array(deslocamentos), pa.array(valores), mask=nulas)
+
+
+def _datas(textos) -> pa.TimestampArray:
+    """Textos "AAAA-MM-DD[ HH:MM:SS]" do banco como timestamp; datas ilegíveis ficam nulas."""
+    texto = pa.array(textos, type=pa.string())
+    try:
+        return pc.cast(texto, pa.timestamp("s"))
+    except pa.ArrowInvalid:
+        def converter(valor):
+            try:
+                return datetime.fromisoformat(valor)
+            except (TypeError, ValueError):
+                return None
+        return pa.array([converter(valor) for valor in textos], type=pa.timestamp("s"))
+
+
+def lote_arrow(registros: list) -> pa.RecordBatch:
+    """Linhas de ``SQL_COLUNAR`` como um RecordBatch de ``ESQUEMA``."""
+    (ids, usuarios, amostras, parametros, n, blobs, medias, desvios, coeficientes, datas) = zip(*registros)
+    return pa.RecordBatch.from_arrays([
+        pa.array(ids, type=pa.int64()),
+        pa.array(usuarios, type=pa.int64()),
+        pa.array(amostras, type=pa.string()),
+        pa.array(parametros, type=pa.string()),
+        pa.array(n, type=pa.int8()),
+        _replicatas(blobs),
+        pa.array(medias, type=pa.float64()),
+        pa.array(desvios, type=pa.float64()),
+        pa.array(coeficientes, type=pa.float64()),
+        _datas(datas),
+    ], schema=ESQUEMA)
+
+
+def lotes_arrow(cursor, tamanho_lote: int = TAMANHO_LOTE):
+    while True:
+        bloco = cursor.fetchmany(tamanho_lote)
+        if not bloco:
+            return
+        yield lote_arrow(bloco)
+
+
+def escrever_colunar(cursor, destino, formato: str = "parquet", particionar: bool = True,
+                     tamanho_lote: int = TAMANHO_LOTE) -> int:
+    """Grava as linhas de ``cursor`` (``SQL_COLUNAR``) em ``destino``; retorna o nº de linhas."""
+    formato_ds, extensao = FORMATOS[formato]
+    total = 0
+
+    def contar(lotes):
+        nonlocal total
+        for lote in lotes:
+            total += lote.num_rows
+            yield lote
+
+    lotes = contar(lotes_arrow(cursor, tamanho_lote))
+    if particionar:
+        opcoes = None
+        if formato == "parquet":
+            opcoes = ds.ParquetFileFormat().make_write_options(compression=COMPRESSAO_PARQUET)
+        ds.write_dataset(
+            pa.RecordBatchReader.from_batches(ESQUEMA, lotes), destino, format=formato_ds, file_options=opcoes,
+            partitioning=PARTICAO, basename_template=f"parte-{{i}}{extensao}", preserve_order=True,
+            existing_data_behavior="delete_matching",
+        )
+    elif formato == "parquet":
+        with pq.ParquetWriter(destino, ESQUEMA, compression=COMPRESSAO_PARQUET) as escritor:
+            for lote in lotes:
+                escritor.write_batch(lote)
+    else:
+        with pa.OSFile(str(destino), "wb") as arquivo, pa.ipc.new_file(arquivo, ESQUEMA) as escritor:
+            for lote in lotes:
+                escritor.write_batch(lote)
+    return total
+
+
+def exportar_colunar(banco, destino, formato: str = "parquet", usuario_id=None, parametro=None,
+                     particionar: bool = True) -> int:
+    """Exporta as análises filtradas para ``destino`` (pasta, ou arquivo sem particionar)."""
+    sql, params = sql_colunar(usuario_id, parametro)
+    with banco.leitura() as conn:
+        return escrever_colunar(conn.execute(sql, params), destino, formato, particionar)
+
+
+def exportar_parquet(banco, usuario_id=None, parametro=None) -> Path:
+    """Um único Parquet das análises filtradas num arquivo temporário, como os relatórios."""
+    destino = arquivo_temporario(".parquet")
+    exportar_colunar(banco, destino, "parquet", usuario_id, parametro, particionar=False)
+    return destino
+
+
+# ---------------------- IMPORTAÇÃO ----------------------
+def abrir_colunar(origem) -> ds.Dataset:
+    """Dataset de um arquivo ou de uma pasta particionada, com o formato deduzido pela extensão."""
+    origem = Path(origem)
+    if origem.is_dir():
+        extensoes = {arquivo.suffix for arquivo in origem.rglob("*") if arquivo.is_file()}
+        formato = next((EXTENSOES[e] for e in sorted(extensoes) if e in EXTENSOES), None)
+        if formato is None:
+            raise ValueError(f"nenhum arquivo Parquet ou Arrow em {origem}")
+        return ds.dataset(origem, format=FORMATOS[formato][0], partitioning="hive",
+                          exclude_invalid_files=True)
+    if origem.suffix.lower() not in EXTENSOES:
+        raise ValueError(f"extensão não reconhecida: {origem.name} (use .parquet ou .arrow)")
+    return ds.dataset(origem, format=FORMATOS[EXTENSOES[origem.suffix.lower()]][0])
+
+
+def _motivo_replicatas(replicatas: np.ndarray) -> str | None:
+    """Por que as replicatas de uma linha não podem ser gravadas (``None`` se podem), como em ``api._analise``."""
+    if not REPLICATAS_MINIMAS <= len(replicatas) <= REPLICATAS_MAXIMAS:
+        return f"{len(replicatas)} replicata(s); são necessárias de {REPLICATAS_MINIMAS} a {REPLICATAS_MAXIMAS}"
+    if not np.isfinite(replicatas).all():
+        return "replicata vazia ou não numérica"
+    if ((replicatas < 0) | (replicatas > 100)).any():
+        return "resultado fora do intervalo 0–100 %"
+    return None
+
+
+def _registros(lote: pa.RecordBatch, usuario_id, usuarios: set, primeira_linha: int, rejeitadas: list) -> list:
+    """Parâmetros de ``SQL_INSERIR_ANALISE`` das linhas válidas de ``lote``.
+
+    Média, desvio padrão e CV são recalculados das replicatas (``calculos.estatisticas``), sem confiar nos do
+    arquivo; só as linhas sem replicatas (carboidratos por diferença) usam a ``media`` informada.
+    """
+    colunas = lote.schema.names
+    amostras = lote.column("nome_amostra").to_pylist()
+    parametros = lote.column("parametro").cast(pa.string()).to_pylist()
+    medias = lote.column("media").to_pylist()
+    if usuario_id is None:
+        usuarios_linha = lote.column("usuario_id").to_pylist()
+    else:
+        usuarios_linha = [usuario_id] * lote.num_rows
+    datas = [None] * lote.num_rows
+    if "data" in colunas:
+        data = lote.column("data")
+        if pa.types.is_timestamp(data.type) or pa.types.is_date(data.type):
+            data = pc.strftime(data.cast(pa.timestamp("s")), "%Y-%m-%d %H:%M:%S")
+        datas = data.to_pylist()
+
+    valores, deslocamentos = np.empty(0), np.zeros(lote.num_rows + 1, dtype=np.int64)
+    nulas = np.ones(lote.num_rows, dtype=bool)
+    if "replicatas" in colunas:
+        lista = lote.column("replicatas")
+        # Replicatas nulas dentro da lista viram NaN e são recusadas como não numéricas
+        valores = lista.flatten().to_numpy(zero_copy_only=False).astype("<f8")
+        deslocamentos = lista.offsets.to_numpy().astype(np.int64)
+        deslocamentos -= deslocamentos[0]
+        nulas = lista.is_null().to_numpy(zero_copy_only=False)
+
+    sem_replicatas, com_replicatas = [], []
+    for i in range(lote.num_rows):
+        replicatas = None if nulas[i] else valores[deslocamentos[i]:deslocamentos[i + 1]]
+        motivo = None
+        if not amostras[i] or not parametros[i]:
+            motivo = "amostra ou parâmetro ausente"
+        elif usuarios_linha[i] not in usuarios:
+            motivo = f"usuário {usuarios_linha[i]} não existe"
+        elif replicatas is not None and len(replicatas):
+            motivo = _motivo_replicatas(replicatas)
+        elif medias[i] is None or not np.isfinite(medias[i]):
+            motivo = "média ausente"
+        elif not 0 <= medias[i] <= 100:
+            motivo = "resultado fora do intervalo 0–100 %"
+        if motivo:
+            rejeitadas.append({"linha": primeira_linha + i, "amostra": amostras[i], "parametro": parametros[i],
+                               "motivo": motivo})
+        elif replicatas is None or not len(replicatas):
+            sem_replicatas.append(i)
+        else:
+            com_replicatas.append(i)
+
+    # Sem replicatas (carboidratos por diferença): como ``registrar_carboidratos``
+    registros = [(usuarios_linha[i], amostras[i], parametros[i], None, None, None, medias[i], None, None, datas[i],
+                  None, None) for i in sem_replicatas]
+    if com_replicatas:
+        n = np.diff(deslocamentos)[com_replicatas]
+        matriz = np.full((len(com_replicatas), int(n.max())), np.nan)
+        for linha, i in enumerate(com_replicatas):
+            matriz[linha, :n[linha]] = valores[deslocamentos[i]:deslocamentos[i + 1]]
+        resultado = calculos.estatisticas(matriz, n=n)
+        for linha, i in enumerate(com_replicatas):
+            replicatas = valores[deslocamentos[i]:deslocamentos[i + 1]]
+            registros.append((usuarios_linha[i], amostras[i], parametros[i], *colunas_legado(replicatas.tolist()),
+                              float(resultado.media[linha]), float(resultado.desvio_padrao[linha]),
+                              float(resultado.coef_var[linha]), datas[i], replicatas.tobytes(), len(replicatas)))
+    return registros
+
+
+def importar_colunar(banco, origem, usuario_id: int | None = None) -> ResultadoImportacao:
+    """Grava numa transação as análises de um Parquet/Arrow (arquivo ou pasta particionada).
+
+    Aceita o que ``exportar_colunar`` gera; exige ``nome_amostra``,
+    ``parametro`` e ``media``, e ``usuario_id`` quando o dono não é informado.
+    Os ids do arquivo são descartados (as análises recebem ids novos), média,
+    desvio e CV são recalculados das replicatas e as tabelas derivadas são
+    atualizadas pelos gatilhos, como em qualquer inserção. Linhas sem os
+    campos obrigatórios, de usuários inexistentes ou com replicatas fora das
+    regras do app (quantidade, valores não numéricos ou fora de 0–100 %)
+    voltam em ``rejeitadas``. O arquivo inteiro é lido e validado antes de
+    ``banco.escrita``, que fica com a trava só durante os INSERTs (a memória
+    cresce com o arquivo, não com o banco).
+    """
+    inicio = time.perf_counter()
+    dataset = abrir_colunar(origem)
+    exigidas = ["nome_amostra", "parametro", "media"] + (["usuario_id"] if usuario_id is None else [])
+    ausentes = [c for c in exigidas if c not in dataset.schema.names]
+    if ausentes:
+        raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(ausentes)}")
+    opcionais = ["usuario_id", "data", "replicatas"]
+    colunas = [c for c in dict.fromkeys(exigidas + opcionais) if c in dataset.schema.names]
+
+    with banco.leitura() as conn:
+        usuarios = {linha[0] for linha in conn.execute("SELECT id FROM usuarios")}
+    lidas, registros, rejeitadas = 0, [], []
+    for lote in dataset.to_batches(columns=colunas, batch_size=TAMANHO_LOTE):
+        registros.extend(_registros(lote, usuario_id, usuarios, lidas + 1, rejeitadas))
+        lidas += lote.num_rows
+    # Por dono e amostra: os gatilhos da composição, busca e resumo atualizam páginas vizinhas
+    registros.sort(key=itemgetter(0, 1))
+    with banco.escrita(usuario_id) as conn:
+        conn.executemany(SQL_INSERIR_ANALISE, registros)
+    return ResultadoImportacao(
+        linhas_lidas=lidas,
+        analises_inseridas=len(registros),
+        segundos=time.perf_counter() - inicio,
+        rejeitadas=pd.DataFrame(rejeitadas, columns=["linha", "amostra", "parametro", "motivo"]),
+    )
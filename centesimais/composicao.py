@@ -0,0 +1,91 @@
+"""Composição centesimal por amostra: médias por parâmetro, carboidratos e VET.
+
+A tabela ``composicao`` guarda uma linha por (usuario_id, nome_amostra) e é
+mantida por gatilhos em ``analises`` (ver migração 4): cada INSERT, UPDATE ou
+DELETE recalcula apenas a amostra afetada. A leitura do painel é, portanto,
+uma busca pela chave primária, sem escrita durante a renderização.
+"""
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Coluna da composição -> nomes de parâmetro gravados pelo app.py e pelo 0app.py
+COMPONENTES = {
+    "umidade": ("Umidade",),
+    "cinzas": ("Cinzas",),
+    "proteinas": ("Proteínas",),
+    "lipidios": ("Lipídios",),
+    "fibras": ("Fibras Totais", "Fibras"),
+}
+CARBOIDRATOS = ("Carboidratos por Diferença", "Carboidratos")
+
+# Fatores de Atwater (kcal/g)
+KCAL_PROTEINAS = 4
+KCAL_CARBOIDRATOS = 4
+KCAL_LIPIDIOS = 9
+
+COLUNAS = ("nome_amostra", *COMPONENTES, "carboidratos", "vet")
+
+
+def _media(nomes) -> str:
+    lista = ", ".join(f"'{nome}'" for nome in nomes)
+    return f"AVG(CASE WHEN parametro IN ({lista}) THEN media END)"
+
+
+def sql_recalcular(condicao: str) -> str:
+    """INSERT OR REPLACE das amostras cujas análises satisfazem ``condicao``.
+
+    Carboidratos = 100 − (umidade + cinzas + proteínas + lipídios + fibras)
+    quando os cinco componentes existem; senão, o valor informado manualmente
+    (se houver). VET = 4·proteínas + 4·carboidratos + 9·lipídios (kcal/100 g).
+    Usado pelos gatilhos (com NEW./OLD.) e pela reconstrução completa. Análises
+    sem dono ou sem nome de amostra (permitidas no esquema original) ficam de
+    fora: não têm linha em ``composicao``.
+    """
+    medias = ",\n                ".join(f"{_media(nomes)} AS {coluna}" for coluna, nomes in COMPONENTES.items())
+    arredondadas = ", ".join(f"ROUND({coluna}, 2)" for coluna in COMPONENTES)
+    soma = " + ".join(COMPONENTES)
+    return f"""
+    INSERT OR REPLACE INTO composicao (usuario_id, {", ".join(COLUNAS)})
+    SELECT usuario_id, nome_amostra, {arredondadas},
+           ROUND(carboidratos, 2),
+           ROUND({KCAL_PROTEINAS} * proteinas + {KCAL_CARBOIDRATOS} * carboidratos + {KCAL_LIPIDIOS} * lipidios, 2)
+    FROM (
+        SELECT *, COALESCE(100 - ({soma}), carboidratos_informados) AS carboidratos
+        FROM (
+            SELECT usuario_id, nome_amostra,
+                {medias},
+                {_media(CARBOIDRATOS)} AS carboidratos_informados
+            FROM analises
+            WHERE ({condicao}) AND usuario_id IS NOT NULL AND nome_amostra IS NOT NULL
+            GROUP BY usuario_id, nome_amostra
+        )
+    )"""
+
+
+def carregar_composicao(conn, usuario_id: int, limite: int = -1, deslocamento: int = 0) -> "pd.DataFrame":
+    """Composição de uma página de amostras do usuário (``limite=-1`` traz todas)."""
+    import pandas as pd  # as migrações importam este módulo só pelo SQL; pandas fica para a leitura
+
+    cursor = conn.execute(
+        f"""
+        SELECT {", ".join(COLUNAS)} FROM composicao
+        WHERE usuario_id = ?
+        ORDER BY nome_amostra
+        LIMIT ? OFFSET ?
+        """,
+        (usuario_id, limite, deslocamento)
+    )
+    return pd.DataFrame(cursor.fetchall(), columns=list(COLUNAS))
+
+
+def contar_amostras(conn, usuario_id: int) -> int:
+    return conn.execute("SELECT COUNT(*) FROM composicao WHERE usuario_id = ?", (usuario_id,)).fetchone()[0]
+
+
+def reconstruir_composicao(conn):
+    """Recalcula a tabela inteira a partir de ``analises`` (manutenção), na transação de quem chama."""
+    conn.execute("DELETE FROM composicao")
+    conn.execute(sql_recalcular("1 = 1"))
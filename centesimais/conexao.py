@@ -0,0 +1,199 @@
+"""Gerenciador de conexões SQLite seguro para várias sessões Streamlit simultâneas.
+
+O banco roda em modo WAL, de modo que leitores não bloqueiam o escritor. As
+leituras usam um pool de conexões somente leitura; as escritas passam por uma
+única conexão de escrita, serializada por um lock e aberta com
+``BEGIN IMMEDIATE``. Uso::
+
+    banco = BancoDados("banco.db")
+    with banco.leitura() as conn:
+        conn.execute("SELECT ...").fetchall()
+    with banco.escrita(usuario_id) as conn:   # commit ao sair, rollback em exceção
+        conn.execute("INSERT ...")
+    df = banco.consultar("SELECT ...", params, usuario_id)   # DataFrame, via cache
+    banco.gravar("INSERT ...", params, usuario_id).id   # um comando, com commit em grupo
+
+As escritas informam o usuário afetado para que o cache de consultas
+(``centesimais.cache``) descarte apenas os resultados daquele usuário.
+Gravações de um só comando vão por ``gravar``, que as junta com as de outras
+sessões num único commit (``centesimais.fila_escrita``).
+"""
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from centesimais.cache import CacheConsultas
+from centesimais.migracoes import migrar
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from centesimais.fila_escrita import FilaEscrita, Gravacao
+    from centesimais.instantaneo import GestorInstantaneo
+
+TIMEOUT_PADRAO = 30.0  # segundos de espera por um lock antes de "database is locked"
+LEITORES_PADRAO = 8
+
+
+class BancoDados:
+    """Pool de conexões de leitura e conexão única de escrita para um arquivo SQLite."""
+
+    def __init__(self, caminho="banco.db", leitores: int = LEITORES_PADRAO, timeout: float = TIMEOUT_PADRAO):
+        self.caminho = Path(caminho).resolve()
+        self.timeout = timeout
+        self._max_leitores = leitores
+        self._leitores = queue.LifoQueue()
+        self._criados = 0
+        self._trava_pool = threading.Lock()
+        self._trava_escrita = threading.RLock()
+        self._profundidade = 0
+        self._dono_escrita = None
+        self._afetados = set()
+        self._fila = None
+        self._instantaneo = None
+        self.cache = CacheConsultas()
+
+        self._escritor = self._conectar(somente_leitura=False)
+        self._escritor.execute("PRAGMA journal_mode=WAL")
+        # Em WAL, synchronous=NORMAL é seguro contra corrupção e evita um fsync por transação
+        self._escritor.execute("PRAGMA synchronous=NORMAL")
+        with self._trava_escrita:
+            migrar(self._escritor)
+
+    def _conectar(self, somente_leitura: bool) -> sqlite3.Connection:
+        if somente_leitura:
+            conn = sqlite3.connect(f"{self.caminho.as_uri()}?mode=ro", uri=True,
+                                   timeout=self.timeout, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.caminho, timeout=self.timeout, check_same_thread=False,
+                                   isolation_level="IMMEDIATE")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.timeout * 1000)}")
+        return conn
+
+    def _obter_leitor(self) -> sqlite3.Connection:
+        try:
+            return self._leitores.get_nowait()
+        except queue.Empty:
+            pass
+        with self._trava_pool:
+            if self._criados < self._max_leitores:
+                self._criados += 1
+                return self._conectar(somente_leitura=True)
+        return self._leitores.get(timeout=self.timeout)
+
+    @contextmanager
+    def leitura(self):
+        """Empresta uma conexão somente leitura do pool."""
+        conn = self._obter_leitor()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._leitores.put(conn)
+
+    @contextmanager
+    def escrita(self, usuario_id=None):
+        """Transação de escrita exclusiva: commit ao sair do bloco, rollback em caso de erro.
+
+        ``usuario_id`` é o dono dos dados alterados; ``None`` invalida o cache inteiro.
+        """
+        with self._trava_escrita:
+            # Blocos aninhados na mesma thread participam da transação do bloco mais externo
+            externa = self._profundidade == 0
+            if externa:
+                self._dono_escrita = threading.get_ident()
+            self._profundidade += 1
+            self._afetados.add(usuario_id)
+            try:
+                yield self._escritor
+            except BaseException:
+                if externa:
+                    self._escritor.rollback()
+                    self._afetados.clear()
+                raise
+            finally:
+                self._profundidade -= 1
+                if externa:
+                    self._dono_escrita = None
+            if externa:
+                self._escritor.commit()
+                for afetado in self._afetados:
+                    self.cache.invalidar(afetado)
+                self._afetados.clear()
+
+    def consultar(self, sql: str, params=(), usuario_id=None) -> "pd.DataFrame":
+        """``pd.read_sql_query`` com cache versionado pelas escritas do escopo.
+
+        ``usuario_id`` é o escopo da consulta (``None`` para consultas globais).
+        """
+        import pandas as pd  # só na primeira consulta tabular; a tela de login não precisa
+
+        def carregar():
+            with self.leitura() as conn:
+                return pd.read_sql_query(sql, conn, params=tuple(params))
+
+        return self.cache.obter(sql, params, usuario_id, carregar)
+
+    @property
+    def fila(self) -> "FilaEscrita":
+        """Fila de escrita com commit em grupo, criada (com sua thread) no primeiro uso."""
+        with self._trava_pool:
+            if self._fila is None:
+                from centesimais.fila_escrita import FilaEscrita
+
+                self._fila = FilaEscrita(self)
+            return self._fila
+
+    @property
+    def instantaneo(self) -> "GestorInstantaneo":
+        """Instantâneo colunar de ``analises`` mapeado em memória, para os agregados do painel."""
+        with self._trava_pool:
+            if self._instantaneo is None:
+                from centesimais.instantaneo import GestorInstantaneo
+
+                self._instantaneo = GestorInstantaneo(self)
+            return self._instantaneo
+
+    def gravar(self, sql: str, params=(), usuario_id=None) -> "Gravacao":
+        """Executa um comando de escrita pela fila e espera o commit do lote.
+
+        Devolve ``Gravacao(id, linhas)``; um erro do comando (por exemplo
+        ``sqlite3.IntegrityError``) é levantado aqui, sem afetar o restante do lote.
+        """
+        if self._dono_escrita == threading.get_ident():
+            # Já dentro de um bloco ``escrita`` desta thread: a fila esperaria por este mesmo lock
+            from centesimais.fila_escrita import Gravacao
+
+            with self.escrita(usuario_id) as conn:
+                cursor = conn.execute(sql, tuple(params))
+            return Gravacao(cursor.lastrowid, cursor.rowcount)
+        return self.fila.gravar(sql, params, usuario_id)
+
+    def fechar(self):
+        if self._fila is not None:
+            self._fila.fechar()
+        with self._trava_escrita:
+            self._escritor.close()
+        while True:
+            try:
+                self._leitores.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_bancos = {}
+_trava_bancos = threading.Lock()
+
+
+def obter_banco(caminho="banco.db") -> BancoDados:
+    """Instância compartilhada por processo para ``caminho`` (o Streamlit reexecuta o script a cada interação)."""
+    chave = Path(caminho).resolve()
+    with _trava_bancos:
+        if chave not in _bancos:
+            _bancos[chave] = BancoDados(chave)
+        return _bancos[chave]
@@ -0,0 +1,190 @@
+"""Cartas de controle de Shewhart dos materiais de referência.
+
+Uma amostra marcada em ``controles`` (por nome, para o laboratório todo) é
+um material de controle: cada análise dela com média vira um ponto em
+``pontos_controle``, numa série por (parâmetro, amostra), na ordem em que as
+análises são gravadas. Para cada ponto ficam guardados, no momento da
+gravação:
+
+* a linha central e a variância das ``JANELA`` análises anteriores da série
+  (média móvel; os limites só valem a partir de ``MINIMO_PONTOS`` anteriores);
+* a zona do ponto: sinal = lado da linha central, 1 = até 1σ, 2 = até 2σ,
+  3 = até 3σ, 4 = além de 3σ;
+* as regras de Western Electric violadas, como máscara de bits (``REGRAS``).
+
+Tudo é mantido por gatilhos em ``analises`` (migração 10), como a
+composição e o resumo diário: o INSERT de uma análise de controle lê só as
+``JANELA`` anteriores da série, qualquer que seja o caminho de gravação
+(telas, importação, CLI). Editar a média recalcula os pontos seguintes da
+série e excluir recalcula a série; renomear amostras ou parâmetros pede
+``recalcular_derivados``. As telas desenham as cartas direto desses pontos,
+sem reler o histórico de ``analises``.
+"""
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+JANELA = 20
+MINIMO_PONTOS = 10
+
+# Bit -> regra de Western Electric
+REGRAS = {
+    1: "1 ponto além de 3σ",
+    2: "2 de 3 além de 2σ do mesmo lado",
+    4: "4 de 5 além de 1σ do mesmo lado",
+    8: "8 seguidos do mesmo lado",
+}
+
+# Os gatilhos não aceitam apelido no UPDATE: o ponto recalculado é referido pelo nome da tabela
+PONTO = "pontos_controle"
+
+SQL_SERIE = """
+    SELECT p.seq, p.data, p.valor, p.n, p.linha_central, p.variancia, p.zona, p.regras,
+           a.id AS analise_id, u.nome AS usuario
+    FROM pontos_controle p
+    LEFT JOIN analises a ON a.id = p.analise_id
+    LEFT JOIN usuarios u ON u.id = a.usuario_id
+    WHERE p.parametro = ? AND p.nome_amostra = ?
+    ORDER BY p.seq
+"""
+
+SQL_INSERIR_PONTOS = """
+    INSERT INTO pontos_controle (analise_id, nome_amostra, parametro, seq, data, valor)
+    SELECT id, nome_amostra, parametro, ROW_NUMBER() OVER (PARTITION BY parametro, nome_amostra ORDER BY id), data, media
+    FROM analises
+    WHERE nome_amostra IN (SELECT nome_amostra FROM controles) AND parametro IS NOT NULL AND media IS NOT NULL
+"""
+
+
+# ---------------------- SQL DOS GATILHOS ----------------------
+def _anteriores(coluna: str, quantos: int, inclusive: bool) -> str:
+    """Subconsulta com ``coluna`` dos ``quantos`` pontos da série até o ponto (ou antes dele)."""
+    return f"""(
+            SELECT {coluna} FROM pontos_controle AS j
+            WHERE j.parametro = {PONTO}.parametro AND j.nome_amostra = {PONTO}.nome_amostra
+              AND j.seq {'<=' if inclusive else '<'} {PONTO}.seq
+            ORDER BY j.seq DESC LIMIT {quantos}
+        )"""
+
+
+def _regra(bit: int, zona_minima: int, pontos: int, exigidos: int) -> str:
+    """``bit`` se ``exigidos`` dos últimos ``pontos`` estão na zona ``zona_minima`` ou além, do lado do ponto."""
+    lado = f"(CASE WHEN {PONTO}.zona > 0 THEN 1 ELSE -1 END)"
+    return (f"(CASE WHEN abs({PONTO}.zona) >= {zona_minima} AND (\n"
+            f"            SELECT COUNT(*) FROM {_anteriores('zona', pontos, True)} WHERE zona * {lado} >= {zona_minima}\n"
+            f"        ) >= {exigidos} THEN {bit} ELSE 0 END)")
+
+
+def sql_recalcular_pontos(condicao: str) -> list:
+    """UPDATEs que recalculam, em ordem, os pontos que satisfazem ``condicao``.
+
+    Os limites de um ponto dependem só dos valores anteriores, e as regras só
+    das zonas; por isso três UPDATEs (limites, zona, regras) bastam para
+    qualquer trecho da série. Usado pelos gatilhos (com NEW./OLD.) e pela
+    reconstrução completa.
+    """
+    desvio2 = f"({PONTO}.valor - {PONTO}.linha_central) * ({PONTO}.valor - {PONTO}.linha_central)"
+    # Variância por Σx e Σx²: a raiz fica no pandas, pois sqrt() depende de como o SQLite foi compilado
+    return [
+        f"""
+        UPDATE pontos_controle SET (n, linha_central, variancia) = (
+            SELECT COUNT(*), AVG(valor), (SUM(valor * valor) - SUM(valor) * SUM(valor) / COUNT(*)) / (COUNT(*) - 1)
+            FROM {_anteriores('valor', JANELA, False)}
+        )
+        WHERE {condicao}
+        """,
+        f"""
+        UPDATE pontos_controle SET zona = CASE WHEN n >= {MINIMO_PONTOS} AND variancia > 0 THEN
+            (CASE WHEN valor >= linha_central THEN 1 ELSE -1 END) * (CASE
+                WHEN {desvio2} <= variancia THEN 1
+                WHEN {desvio2} <= 4 * variancia THEN 2
+                WHEN {desvio2} <= 9 * variancia THEN 3
+                ELSE 4 END)
+        END
+        WHERE {condicao}
+        """,
+        f"""
+        UPDATE pontos_controle SET regras = CASE WHEN zona IS NULL THEN 0 ELSE
+            (CASE WHEN abs(zona) = 4 THEN 1 ELSE 0 END)
+            + {_regra(2, 3, 3, 2)}
+            + {_regra(4, 2, 5, 4)}
+            + {_regra(8, 1, 8, 8)}
+        END
+        WHERE {condicao}
+        """,
+    ]
+
+
+def sql_serie(parametro: str, nome_amostra: str, desde: str = "1") -> str:
+    """Condição de ``sql_recalcular_pontos`` para uma série a partir do ponto ``desde``."""
+    return f"{PONTO}.parametro = {parametro} AND {PONTO}.nome_amostra = {nome_amostra} AND {PONTO}.seq >= {desde}"
+
+
+def reconstruir_pontos(conn, nome_amostra: str | None = None):
+    """Refaz as séries a partir de ``analises`` (de uma amostra de controle ou de todas)."""
+    if nome_amostra is None:
+        conn.execute("DELETE FROM pontos_controle")
+        conn.execute(SQL_INSERIR_PONTOS)
+        condicao, params = "1 = 1", ()
+    else:
+        conn.execute("DELETE FROM pontos_controle WHERE nome_amostra = ?", (nome_amostra,))
+        conn.execute(SQL_INSERIR_PONTOS + " AND nome_amostra = ?", (nome_amostra,))
+        condicao, params = "nome_amostra = ?", (nome_amostra,)
+    for sql in sql_recalcular_pontos(condicao):
+        conn.execute(sql, params)
+
+
+# ---------------------- CONTROLES ----------------------
+def designar_controle(banco, nome_amostra: str, descricao: str = "") -> int:
+    """Marca a amostra como material de controle e monta as séries com as análises já gravadas.
+
+    Retorna o número de pontos das séries.
+    """
+    from centesimais.analises import agora  # analises importa as migrações, que importam este módulo
+
+    with banco.escrita() as conn:
+        conn.execute("INSERT OR REPLACE INTO controles (nome_amostra, descricao, criado_em) VALUES (?, ?, ?)",
+                     (nome_amostra, descricao, agora()))
+        reconstruir_pontos(conn, nome_amostra)
+        return conn.execute("SELECT COUNT(*) FROM pontos_controle WHERE nome_amostra = ?",
+                            (nome_amostra,)).fetchone()[0]
+
+
+def remover_controle(banco, nome_amostra: str) -> bool:
+    """Desfaz a marcação e apaga as séries; as análises continuam gravadas."""
+    with banco.escrita() as conn:
+        conn.execute("DELETE FROM pontos_controle WHERE nome_amostra = ?", (nome_amostra,))
+        cursor = conn.execute("DELETE FROM controles WHERE nome_amostra = ?", (nome_amostra,))
+    return cursor.rowcount > 0
+
+
+def listar_controles(banco) -> "pd.DataFrame":
+    """Uma linha por controle × parâmetro, com o número de pontos e de violações e a data do último ponto."""
+    return banco.consultar("""
+        SELECT c.nome_amostra, c.descricao, p.parametro, COUNT(p.seq) AS pontos,
+               COALESCE(SUM(p.regras > 0), 0) AS violacoes, MAX(p.data) AS ultimo_ponto
+        FROM controles c LEFT JOIN pontos_controle p ON p.nome_amostra = c.nome_amostra
+        GROUP BY c.nome_amostra, p.parametro
+        ORDER BY c.nome_amostra, p.parametro
+    """)
+
+
+# ---------------------- LEITURA ----------------------
+def descrever_regras(mascara) -> str:
+    return "; ".join(texto for bit, texto in REGRAS.items() if int(mascara or 0) & bit)
+
+
+def carta(banco, parametro: str, nome_amostra: str) -> "pd.DataFrame":
+    """Pontos da série com linha central, limites de 1σ, 2σ e 3σ e as regras violadas, já calculados."""
+    import numpy as np
+
+    df = banco.consultar(SQL_SERIE, (parametro, nome_amostra))
+    desvio = np.sqrt(df["variancia"].where(df["zona"].notna()))
+    return df.assign(
+        desvio=desvio,
+        **{f"{sinal}{k}σ": df["linha_central"] + fator * k * desvio
+           for k in (1, 2, 3) for sinal, fator in (("+", 1), ("-", -1))},
+        violacoes=df["regras"].map(descrever_regras),
+    )
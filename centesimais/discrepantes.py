@@ -0,0 +1,202 @@
+"""Varredura de replicatas discrepantes (Dixon Q e Grubbs) em todas as análises.
+
+Uma triplicata com uma pesagem errada só aparece como CV alto, que ninguém
+revisa linha a linha. A varredura testa a replicata mais afastada de cada
+análise gravada:
+
+* n = 3: teste Q de Dixon (r10), Q = lacuna / amplitude;
+* 4 ≤ n ≤ 10: teste de Grubbs bilateral, G = max|xᵢ − x̄| / s;
+* duplicatas não têm teste possível e ficam de fora.
+
+``analises.replicatas`` é lido em blocos por id; em cada bloco os BLOBs são
+concatenados num único array e as análises com o mesmo n viram uma matriz
+(análises × n), testada de uma vez no NumPy, sem laço por análise. As
+suspeitas ficam na tabela ``replicatas_suspeitas`` (migração 9), substituída
+a cada varredura, e cada execução é registrada em ``varreduras``; apagar a
+análise ou acrescentar uma replicata remove a marcação até a varredura
+seguinte.
+
+Os valores críticos são os tabelados (Rorabacher, 1991, para Q; ASTM E178
+para G). As replicatas são gravadas arredondadas, e empates como 2,50; 2,50;
+2,51 dariam Q = 1: uma lacuna que não passa de ``resolucao`` não é marcada.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from centesimais.analises import agora
+from centesimais.replicatas import REPLICATAS_MAXIMAS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DIXON = "Dixon Q"
+GRUBBS = "Grubbs"
+CONFIANCA_PADRAO = 0.95
+RESOLUCAO_PADRAO = 0.01  # passo de arredondamento das replicatas (casas=2)
+TAMANHO_BLOCO = 100_000
+
+# Valores críticos por nível de confiança, indexados por n
+CRITICOS_DIXON = {
+    0.90: {3: 0.941},
+    0.95: {3: 0.970},
+    0.99: {3: 0.994},
+}
+CRITICOS_GRUBBS = {
+    0.90: {4: 1.463, 5: 1.672, 6: 1.822, 7: 1.938, 8: 2.032, 9: 2.110, 10: 2.176},
+    0.95: {4: 1.481, 5: 1.715, 6: 1.887, 7: 2.020, 8: 2.126, 9: 2.215, 10: 2.290},
+    0.99: {4: 1.496, 5: 1.764, 6: 1.973, 7: 2.139, 8: 2.274, 9: 2.387, 10: 2.482},
+}
+CONFIANCAS = tuple(CRITICOS_GRUBBS)
+
+SQL_BLOCO = """
+    SELECT id, n_replicatas, replicatas FROM analises
+    WHERE id > ? AND n_replicatas >= 3 AND n_replicatas <= ?
+    ORDER BY id LIMIT ?
+"""
+
+SQL_SUSPEITAS = """
+    SELECT a.id, u.nome AS usuario, a.nome_amostra AS amostra, a.parametro, a.n_replicatas AS n,
+           a.replicatas, s.teste, s.posicao, s.valor, s.estatistica, s.critico, a.media, a.data
+    FROM replicatas_suspeitas s
+    JOIN analises a ON a.id = s.analise_id
+    LEFT JOIN usuarios u ON u.id = a.usuario_id
+    ORDER BY s.estatistica / s.critico DESC, a.data DESC
+"""
+
+
+@dataclass
+class ResultadoVarredura:
+    """Resumo de uma varredura."""
+
+    analises_testadas: int
+    segundos: float
+    confianca: float
+    por_teste: dict = field(default_factory=dict)  # teste -> nº de suspeitas
+
+    @property
+    def suspeitas(self) -> int:
+        return sum(self.por_teste.values())
+
+    @property
+    def analises_por_segundo(self) -> float:
+        return self.analises_testadas / self.segundos if self.segundos else float("inf")
+
+
+def _critico(confianca: float, n: int) -> tuple:
+    if confianca not in CRITICOS_GRUBBS:
+        raise ValueError(f"confiança deve ser uma de {', '.join(f'{c:.0%}' for c in CONFIANCAS)}")
+    if n == 3:
+        return DIXON, CRITICOS_DIXON[confianca][3]
+    return GRUBBS, CRITICOS_GRUBBS[confianca][n]
+
+
+def testar(valores, confianca: float = CONFIANCA_PADRAO, resolucao: float = RESOLUCAO_PADRAO) -> tuple:
+    """Testa cada linha de uma matriz (análises × n), todas com o mesmo n (3 a 10).
+
+    Retorna ``(teste, critico, suspeita, coluna, estatistica)``: o nome do
+    teste e o valor crítico usados e, por linha, se a replicata mais afastada
+    é discrepante, a coluna dela e a estatística Q ou G.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    n = valores.shape[1]
+    teste, critico = _critico(confianca, n)
+    linhas = np.arange(len(valores))
+    if teste == DIXON:
+        ordem = np.argsort(valores, axis=1)
+        ordenados = np.take_along_axis(valores, ordem, axis=1)
+        amplitude = ordenados[:, -1] - ordenados[:, 0]
+        lacuna_baixa = ordenados[:, 1] - ordenados[:, 0]
+        lacuna_alta = ordenados[:, -1] - ordenados[:, -2]
+        alta = lacuna_alta >= lacuna_baixa
+        lacuna = np.where(alta, lacuna_alta, lacuna_baixa)
+        coluna = np.where(alta, ordem[:, -1], ordem[:, 0])
+        estatistica = np.divide(lacuna, amplitude, out=np.zeros(len(valores)), where=amplitude > 0)
+    else:
+        media = valores.mean(axis=1)
+        desvio = valores.std(axis=1, ddof=1)
+        afastamento = np.abs(valores - media[:, None])
+        coluna = afastamento.argmax(axis=1)
+        # Lacuna até a replicata vizinha mais próxima, para o critério de resolução
+        lacuna = np.abs(valores - valores[linhas, coluna][:, None])
+        lacuna[linhas, coluna] = np.inf
+        lacuna = lacuna.min(axis=1)
+        estatistica = np.divide(afastamento[linhas, coluna], desvio, out=np.zeros(len(valores)), where=desvio > 0)
+    suspeita = (estatistica > critico) & (lacuna > resolucao * (1 + 1e-9))
+    return teste, critico, suspeita, coluna, estatistica
+
+
+def _blocos(conn, tamanho: int):
+    """(ids, n, valores planos, início de cada análise em valores) por bloco de ``tamanho`` análises."""
+    ultimo = 0
+    while True:
+        linhas = conn.execute(SQL_BLOCO, (ultimo, REPLICATAS_MAXIMAS, tamanho)).fetchall()
+        if not linhas:
+            return
+        ids, _, blobs = zip(*linhas)
+        ids = np.array(ids, dtype=np.int64)
+        ns = np.fromiter((len(blob) // 8 for blob in blobs), dtype=np.int64, count=len(blobs))
+        planos = np.frombuffer(b"".join(blobs), dtype="<f8")
+        yield ids, ns, planos, np.cumsum(ns) - ns
+        ultimo = int(ids[-1])
+
+
+def varrer(banco, confianca: float = CONFIANCA_PADRAO, resolucao: float = RESOLUCAO_PADRAO,
+           tamanho_bloco: int = TAMANHO_BLOCO, progresso=None) -> ResultadoVarredura:
+    """Testa todas as análises com 3 ou mais replicatas e regrava ``replicatas_suspeitas``.
+
+    ``progresso(testadas)`` é chamado a cada bloco.
+    """
+    _critico(confianca, 3)  # valida a confiança antes de ler o banco
+    inicio = time.perf_counter()
+    marcadas, testadas, por_teste = [], 0, {}
+    with banco.leitura() as conn:
+        for ids, ns, planos, inicios in _blocos(conn, tamanho_bloco):
+            for n in np.unique(ns[(ns >= 3) & (ns <= REPLICATAS_MAXIMAS)]):
+                selecao = ns == n
+                matriz = planos[inicios[selecao][:, None] + np.arange(n)]
+                teste, critico, suspeita, coluna, estatistica = testar(matriz, confianca, resolucao)
+                if suspeita.any():
+                    por_teste[teste] = por_teste.get(teste, 0) + int(suspeita.sum())
+                    linhas = np.flatnonzero(suspeita)
+                    marcadas.extend(zip(
+                        ids[selecao][linhas].tolist(), [teste] * len(linhas), (coluna[linhas] + 1).tolist(),
+                        matriz[linhas, coluna[linhas]].tolist(), np.round(estatistica[linhas], 4).tolist(),
+                        [critico] * len(linhas),
+                    ))
+            testadas += len(ids)
+            if progresso:
+                progresso(testadas)
+    resultado = ResultadoVarredura(testadas, time.perf_counter() - inicio, confianca, por_teste)
+    verificada_em = agora()
+    with banco.escrita() as conn:
+        conn.execute("DELETE FROM replicatas_suspeitas")
+        conn.executemany("""
+            INSERT INTO replicatas_suspeitas (analise_id, teste, posicao, valor, estatistica, critico, confianca,
+                                              verificada_em)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (linha + (confianca, verificada_em) for linha in marcadas))
+        conn.execute(
+            "INSERT INTO varreduras (executada_em, confianca, analises_testadas, suspeitas, segundos) VALUES (?, ?, ?, ?, ?)",
+            (verificada_em, confianca, testadas, resultado.suspeitas, round(resultado.segundos, 3))
+        )
+    return resultado
+
+
+def suspeitas(banco) -> "pd.DataFrame":
+    """Análises marcadas na última varredura, das mais discrepantes (estatística / crítico) para as menos."""
+    from centesimais.replicatas import formatar
+
+    df = banco.consultar(SQL_SUSPEITAS)
+    return df.assign(replicatas=df["replicatas"].map(formatar))
+
+
+def ultima_varredura(banco) -> dict | None:
+    """Registro da varredura mais recente em ``varreduras``, ou ``None`` se nunca houve."""
+    with banco.leitura() as conn:
+        cursor = conn.execute("SELECT * FROM varreduras ORDER BY id DESC LIMIT 1")
+        linha = cursor.fetchone()
+    return None if linha is None else dict(zip((c[0] for c in cursor.description), linha))
@@ -0,0 +1,160 @@
+"""Fila de escrita com commit em grupo para gravações de uma linha.
+
+Salvar uma análise, uma anotação ou uma edição é um único comando seguido de
+commit. Com instrumentos e várias sessões gravando ao mesmo tempo, cada
+commit disputa o lock de escrita e grava mais um quadro de commit no WAL
+(com ``synchronous=NORMAL`` não há fsync por commit, mas a espera pelo lock
+e o quadro extra continuam), e esse custo fixo domina. Aqui uma
+única thread escritora recebe os comandos por uma fila, junta os pendentes
+por até ``espera`` segundos ou ``lote_maximo`` comandos e grava o lote numa
+só transação de ``banco.escrita``.
+
+Cada comando roda num SAVEPOINT próprio: um erro (e-mail repetido, por
+exemplo) desfaz só aquele comando e chega ao chamador pelo futuro dele; os
+demais do lote são gravados. Os futuros são resolvidos só depois do commit,
+com o ``Gravacao`` do comando (``lastrowid`` e linhas afetadas).
+``estatisticas()`` expõe o tamanho dos lotes e a latência dos commits.
+
+Uso, via ``BancoDados``::
+
+    banco.gravar("INSERT INTO anotacoes (...) VALUES (?, ?, ?, ?)", params, usuario_id).id
+    futuro = banco.fila.enviar(sql, params, usuario_id)   # sem esperar o commit
+"""
+
+import queue
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import NamedTuple
+
+ESPERA_PADRAO = 0.001  # segundos juntando comandos depois do primeiro do lote
+LOTE_MAXIMO_PADRAO = 256
+AMOSTRAS_LATENCIA = 1000  # commits recentes usados na mediana e no p95
+
+
+class Gravacao(NamedTuple):
+    """Resultado de um comando gravado: ``lastrowid`` e número de linhas afetadas."""
+
+    id: int | None
+    linhas: int
+
+
+class _Comando(NamedTuple):
+    sql: str
+    params: tuple
+    usuario_id: int | None
+    futuro: Future
+    enviado: float
+
+
+class FilaEscrita:
+    """Thread escritora única que grava os comandos recebidos em lotes, um commit por lote."""
+
+    def __init__(self, banco, espera: float = ESPERA_PADRAO, lote_maximo: int = LOTE_MAXIMO_PADRAO):
+        self.banco = banco
+        self.espera = espera
+        self.lote_maximo = lote_maximo
+        self._fila = queue.SimpleQueue()
+        self._trava = threading.Lock()
+        self.lotes = 0
+        self.comandos = 0
+        self.erros = 0
+        self.maior_lote = 0
+        self._segundos_espera = 0.0
+        self._latencias = deque(maxlen=AMOSTRAS_LATENCIA)
+        self._thread = threading.Thread(target=self._executar, name="fila-escrita", daemon=True)
+        self._thread.start()
+
+    def enviar(self, sql: str, params=(), usuario_id=None) -> Future:
+        """Enfileira um comando; o futuro recebe o ``Gravacao`` depois do commit (ou a exceção do comando)."""
+        if not self._thread.is_alive():
+            raise RuntimeError("fila de escrita encerrada")
+        futuro = Future()
+        self._fila.put(_Comando(sql, tuple(params), usuario_id, futuro, time.perf_counter()))
+        return futuro
+
+    def gravar(self, sql: str, params=(), usuario_id=None, timeout: float | None = None) -> Gravacao:
+        return self.enviar(sql, params, usuario_id).result(timeout)
+
+    # ---------------------- THREAD ESCRITORA ----------------------
+    def _proximo_lote(self) -> tuple:
+        """(comandos, encerrar): bloqueia pelo primeiro e junta os que chegarem até o prazo."""
+        primeiro = self._fila.get()
+        if primeiro is None:
+            return [], True
+        lote = [primeiro]
+        prazo = time.perf_counter() + self.espera
+        while len(lote) < self.lote_maximo:
+            try:
+                comando = self._fila.get(timeout=max(prazo - time.perf_counter(), 0))
+            except queue.Empty:
+                break
+            if comando is None:
+                return lote, True
+            lote.append(comando)
+        return lote, False
+
+    def _gravar_lote(self, lote: list):
+        inicio = time.perf_counter()
+        resultados = []
+        try:
+            with self.banco.escrita(lote[0].usuario_id) as conn:
+                if not conn.in_transaction:
+                    # Sem isto, o SAVEPOINT abriria a transação e o RELEASE faria um commit por comando
+                    conn.execute("BEGIN IMMEDIATE")
+                for comando in lote:
+                    conn.execute("SAVEPOINT gravacao")
+                    try:
+                        with self.banco.escrita(comando.usuario_id):
+                            cursor = conn.execute(comando.sql, comando.params)
+                        resultados.append(Gravacao(cursor.lastrowid, cursor.rowcount))
+                    except Exception as erro:  # só este comando é desfeito
+                        conn.execute("ROLLBACK TO gravacao")
+                        resultados.append(erro)
+                    conn.execute("RELEASE gravacao")
+        except BaseException as erro:  # commit falhou: nada do lote foi gravado
+            resultados = [erro] * len(lote)
+        fim = time.perf_counter()
+
+        with self._trava:
+            self.lotes += 1
+            self.comandos += len(lote)
+            self.erros += sum(isinstance(r, BaseException) for r in resultados)
+            self.maior_lote = max(self.maior_lote, len(lote))
+            self._segundos_espera += sum(inicio - comando.enviado for comando in lote)
+            self._latencias.append(fim - inicio)
+        for comando, resultado in zip(lote, resultados):
+            if isinstance(resultado, BaseException):
+                comando.futuro.set_exception(resultado)
+            else:
+                comando.futuro.set_result(resultado)
+
+    def _executar(self):
+        encerrar = False
+        while not encerrar:
+            lote, encerrar = self._proximo_lote()
+            lote = [comando for comando in lote if comando.futuro.set_running_or_notify_cancel()]
+            if lote:
+                self._gravar_lote(lote)
+
+    def fechar(self, timeout: float | None = None):
+        """Grava o que já está na fila e encerra a thread."""
+        self._fila.put(None)
+        self._thread.join(timeout)
+
+    def estatisticas(self) -> dict:
+        with self._trava:
+            latencias = sorted(self._latencias)
+            return {
+                "lotes": self.lotes,
+                "comandos": self.comandos,
+                "erros": self.erros,
+                "em_fila": self._fila.qsize(),
+                "lote_medio": self.comandos / self.lotes if self.lotes else 0.0,
+                "maior_lote": self.maior_lote,
+                "espera_media": self._segundos_espera / self.comandos if self.comandos else 0.0,
+                "commit_mediano": statistics.median(latencias) if latencias else 0.0,
+                "commit_p95": latencias[int(0.95 * (len(latencias) - 1))] if latencias else 0.0,
+            }
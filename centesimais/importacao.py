@@ -0,0 +1,181 @@
+"""Importação em lote de leituras brutas (CSV/XLSX) para a tabela de análises.
+
+Cada linha do arquivo é uma repetição de uma amostra: as colunas ``amostra`` e
+``parametro`` identificam a análise e as demais trazem as pesagens ou volumes
+do método (ver ``PARAMETROS``). Linhas inválidas são rejeitadas sem abortar o
+lote; cada amostra precisa de ``REPLICATAS_MINIMAS`` a ``REPLICATAS_MAXIMAS``
+leituras válidas (duplicata, triplicata ou mais), e as análises completas são
+gravadas com um único ``executemany`` dentro de uma única transação.
+
+A leitura do arquivo e os cálculos acontecem antes de ``banco.escrita``: a
+trava do escritor fica presa só durante o INSERT, e as demais gravações do app
+não esperam pelo parsing de uma planilha grande.
+"""
+
+import time
+import unicodedata
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from centesimais import calculos
+from centesimais.analises import SQL_INSERIR_ANALISE, agora, parametros_analise
+from centesimais.replicatas import REPLICATAS_MAXIMAS, REPLICATAS_MINIMAS
+
+# Colunas brutas exigidas por parâmetro (mesmos campos dos formulários do app.py)
+PARAMETROS = calculos.CAMPOS
+
+
+def normalizar_chave(texto) -> str:
+    """Normaliza nomes de colunas e parâmetros (sem acento, minúsculo, com _)."""
+    sem_acento = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode()
+    return "_".join(sem_acento.strip().lower().split())
+
+
+_ALIASES = {normalizar_chave(p): p for p in PARAMETROS}
+_ALIASES["fibras"] = "Fibras Totais"
+_ALIASES["proteina"] = "Proteínas"
+
+
+def normalizar_parametro(texto) -> str | None:
+    """Nome canônico do parâmetro (``"proteina"`` → ``"Proteínas"``); ``None`` se desconhecido."""
+    return _ALIASES.get(normalizar_chave(texto))
+
+
+def _numerico(serie: pd.Series) -> pd.Series:
+    """Converte textos como '12,3456' ou '12.3456' em float (NaN se inválido)."""
+    texto = serie.astype(str).str.strip().str.replace(",", ".", regex=False)
+    return pd.to_numeric(texto, errors="coerce")
+
+
+@dataclass
+class ResultadoImportacao:
+    """Resumo de um lote importado."""
+
+    linhas_lidas: int
+    analises_inseridas: int
+    segundos: float
+    rejeitadas: pd.DataFrame = field(default_factory=pd.DataFrame)
+
+    @property
+    def linhas_por_segundo(self) -> float:
+        return self.linhas_lidas / self.segundos if self.segundos else float("inf")
+
+
+def ler_planilha(arquivo, nome: str | None = None) -> pd.DataFrame:
+    """Lê um CSV (separador detectado automaticamente) ou XLSX como texto."""
+    nome = nome or getattr(arquivo, "name", str(arquivo))
+    if nome.lower().endswith((".xlsx", ".xlsm")):
+        return pd.read_excel(arquivo, dtype=str)
+    return pd.read_csv(arquivo, dtype=str, sep=None, engine="python", encoding="utf-8-sig")
+
+
+def calcular_lote(leituras: pd.DataFrame):
+    """Valida e calcula as leituras brutas.
+
+    Retorna ``(analises, rejeitadas)``: um DataFrame com uma linha por
+    análise completa (valor1..valorN completados com NaN, n_replicatas, media,
+    desvio_padrao, coef_var) e outro com
+    as linhas rejeitadas e o motivo. A linha informada é a do arquivo original
+    (cabeçalho = linha 1).
+    """
+    df = leituras.rename(columns=normalizar_chave).reset_index(drop=True)
+    ausentes = [c for c in ("amostra", "parametro") if c not in df.columns]
+    if ausentes:
+        raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(ausentes)}")
+
+    df["linha"] = df.index + 2
+    df["amostra"] = df["amostra"].fillna("").astype(str).str.strip()
+    parametro_informado = df["parametro"]
+    df["parametro"] = df["parametro"].map(lambda p: normalizar_parametro(p) if pd.notna(p) else None)
+    df["resultado"] = np.nan
+    motivo = pd.Series(None, index=df.index, dtype=object)
+    motivo[df["amostra"] == ""] = "amostra sem nome"
+    motivo[motivo.isna() & df["parametro"].isna()] = "parâmetro desconhecido"
+
+    for parametro, campos in PARAMETROS.items():
+        selecao = (df["parametro"] == parametro) & motivo.isna()
+        if not selecao.any():
+            continue
+        faltando = [c for c in campos if c not in df.columns]
+        if faltando:
+            motivo[selecao] = f"colunas ausentes para {parametro}: {', '.join(faltando)}"
+            continue
+
+        valores = {c: _numerico(df.loc[selecao, c]) for c in campos}
+        leituras = {c: serie.to_numpy() for c, serie in valores.items()}
+        if parametro == "Proteínas" and "fator" in df.columns:
+            leituras["fator"] = _numerico(df.loc[selecao, "fator"]).fillna(calculos.FATOR_PROTEINA_PADRAO).to_numpy()
+        resultado = pd.Series(calculos.METODOS[parametro](**leituras), index=valores[campos[0]].index)
+
+        incompleta = pd.concat([valores[c] for c in campos], axis=1).isna().any(axis=1)
+        motivo[incompleta[incompleta].index] = "leitura vazia ou não numérica"
+        sem_massa = resultado.isna() & ~incompleta
+        motivo[sem_massa[sem_massa].index] = "massa de amostra nula ou negativa"
+        fora = ~resultado.between(0, 100) & resultado.notna()
+        motivo[fora[fora].index] = "resultado fora do intervalo 0–100 %"
+        df.loc[selecao, "resultado"] = resultado.round(2)
+
+    validas = df[motivo.isna()]
+    if "replicata" in validas.columns:
+        validas = validas.assign(_ordem=_numerico(validas["replicata"])).sort_values(["_ordem", "linha"])
+    grupos = validas.groupby(["amostra", "parametro"], sort=False)
+    tamanho = grupos["resultado"].transform("size")
+    aceitas = tamanho.between(REPLICATAS_MINIMAS, REPLICATAS_MAXIMAS)
+    incompletas = validas.index[~aceitas]
+    motivo[incompletas] = [
+        f"{n} leitura(s) válida(s) para a amostra; são necessárias de {REPLICATAS_MINIMAS} a {REPLICATAS_MAXIMAS}"
+        for n in tamanho[incompletas]
+    ]
+
+    validas = validas.loc[aceitas].copy()
+    validas["repeticao"] = validas.groupby(["amostra", "parametro"], sort=False).cumcount() + 1
+    analises = validas.pivot(index=["amostra", "parametro"], columns="repeticao", values="resultado")
+    analises.columns = [f"valor{i}" for i in analises.columns]
+    # Colunas explícitas: sem nenhuma análise válida, -1 não tem como ser deduzido de um array vazio
+    valores = analises.to_numpy(dtype=float).reshape(len(analises), analises.shape[1])
+    n = (~np.isnan(valores)).sum(axis=1)  # leituras válidas ficam à esquerda; NaN só completa a linha
+    estatisticas = calculos.estatisticas(valores, n=n)
+    analises["n_replicatas"] = n
+    analises["media"] = estatisticas.media
+    analises["desvio_padrao"] = estatisticas.desvio_padrao
+    analises["coef_var"] = estatisticas.coef_var
+    analises = analises.reset_index()
+
+    rejeitada = motivo.notna()
+    # Filtradas antes do assign: num DataFrame vazio, a série inteira traria o próprio índice
+    rejeitadas = df.loc[rejeitada, ["linha", "amostra"]].assign(
+        parametro=df["parametro"].fillna(parametro_informado)[rejeitada], motivo=motivo[rejeitada]
+    )
+    return analises, rejeitadas.sort_values("linha").reset_index(drop=True)
+
+
+def importar_leituras(banco, usuario_id: int, leituras: pd.DataFrame) -> ResultadoImportacao:
+    """Calcula um lote de leituras e grava as análises numa única transação (só o INSERT com a trava)."""
+    inicio = time.perf_counter()
+    analises, rejeitadas = calcular_lote(leituras)
+    data = agora()
+    colunas = [c for c in analises.columns if c.startswith("valor")]
+    valores = analises[colunas].to_numpy(dtype=float)
+    registros = [
+        parametros_analise(usuario_id, a.amostra, a.parametro, valores[i, :a.n_replicatas].tolist(),
+                           a.media, a.desvio_padrao, a.coef_var, data)
+        for i, a in enumerate(analises.itertuples(index=False))
+    ]
+    with banco.escrita(usuario_id) as conn:
+        conn.executemany(SQL_INSERIR_ANALISE, registros)
+    return ResultadoImportacao(
+        linhas_lidas=len(leituras),
+        analises_inseridas=len(registros),
+        segundos=time.perf_counter() - inicio,
+        rejeitadas=rejeitadas,
+    )
+
+
+def importar_arquivo(banco, usuario_id: int, arquivo, nome: str | None = None) -> ResultadoImportacao:
+    """Lê um CSV/XLSX (caminho ou arquivo enviado) e importa suas leituras."""
+    inicio = time.perf_counter()
+    resultado = importar_leituras(banco, usuario_id, ler_planilha(arquivo, nome))
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
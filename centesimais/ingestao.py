@@ -0,0 +1,435 @@
+"""Ingestão contínua dos arquivos exportados pela balança e pelo titulador Kjeldahl.
+
+Em vez de redigitar pesagens e volumes nos formulários, os instrumentos
+exportam texto numa pasta observada por um ``Ingestor``. Cada arquivo começa
+por um cabeçalho e tem uma leitura por linha, campos separados por ``;``:
+
+* balança: ``data;id;metodo;etapa;replicata;massa[;unidade]``, uma pesagem
+  por linha; ``etapa`` é o campo do método (``peso_cadinho``,
+  ``peso_cadinho_seco``, ``peso_amostra``...) e a unidade é g (ou mg, kg);
+* titulador: ``data;id;replicata;volume;branco;normalidade``, uma titulação
+  de Proteínas por linha (a massa da amostra vem da balança).
+
+``id`` é o código digitado no instrumento; o mapa de amostras (CSV/XLSX com
+``codigo;amostra[;usuario]``) o traduz para o nome da amostra e o dono da
+análise, e códigos fora do mapa viram o próprio nome, do usuário padrão.
+
+Os arquivos são lidos de forma incremental: ``ingestao_arquivos`` guarda,
+por arquivo, o deslocamento em bytes até a última linha completa, e uma linha
+ainda sendo escrita fica para o ciclo seguinte. Cada lote de
+``LINHAS_POR_LOTE`` linhas vira leituras em ``leituras_pendentes`` na mesma
+transação que avança o deslocamento, de modo que uma interrupção não perde
+nem duplica leituras; a memória fica limitada a um lote, qualquer que seja o
+acúmulo de arquivos. Uma pesagem repetida substitui a anterior.
+
+Uma análise (amostra × parâmetro) é fechada quando tem ``replicatas``
+replicatas completas ou, com pelo menos ``REPLICATAS_MINIMAS``, quando passa
+``inatividade`` segundos sem leituras novas. As leituras passam pelo mesmo
+``calcular_lote`` da importação de planilhas e as análises são gravadas com
+um ``executemany``; linhas e replicatas recusadas ficam em
+``leituras_rejeitadas``, e um grupo que não fecha nenhuma análise sai de
+``leituras_pendentes`` do mesmo jeito, para não voltar a cada ciclo. Um grupo
+parado há ``inatividade`` segundos sem ``REPLICATAS_MINIMAS`` replicatas
+completas também vai para ``leituras_rejeitadas``, como "replicatas
+insuficientes".
+Arquivos que somem entre a varredura e a leitura são ignorados, e um erro num
+ciclo de ``executar`` fica em ``ultimo_erro`` sem interromper os seguintes.
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from centesimais.analises import SQL_INSERIR_ANALISE, agora, parametros_analise
+from centesimais.calculos import CAMPOS
+from centesimais.importacao import calcular_lote, ler_planilha, normalizar_chave, normalizar_parametro
+from centesimais.replicatas import REPLICATAS_MAXIMAS, REPLICATAS_MINIMAS
+
+logger = logging.getLogger(__name__)
+
+SEPARADOR = ";"
+EXTENSOES = (".csv", ".txt")
+LINHAS_POR_LOTE = 5_000
+ANALISES_POR_LOTE = 2_000
+INATIVIDADE_PADRAO = 600  # segundos sem leituras novas para fechar uma análise incompleta
+INTERVALO_PADRAO = 2.0  # segundos entre varreduras da pasta
+
+# Colunas exigidas no cabeçalho de cada formato
+FORMATOS = {
+    "balanca": ("data", "id", "metodo", "etapa", "replicata", "massa"),
+    "titulador": ("data", "id", "replicata", "volume", "branco", "normalidade"),
+}
+UNIDADES = {"g": 1.0, "mg": 0.001, "kg": 1000.0}
+# Coluna do titulador -> campo de Proteínas
+TITULADOR = {"volume": "volume_hcl", "branco": "volume_branco", "normalidade": "normalidade"}
+# Campos de cada método que vêm da balança
+PESAGENS = {parametro: tuple(c for c in campos if c not in TITULADOR.values()) for parametro, campos in CAMPOS.items()}
+FORMATOS_DATA = ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M")
+
+SQL_PONTOS = "SELECT caminho, inode, deslocamento, linhas, cabecalho FROM ingestao_arquivos"
+
+SQL_PONTO = """
+    INSERT INTO ingestao_arquivos (caminho, inode, deslocamento, linhas, cabecalho, atualizado_em)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (caminho) DO UPDATE SET inode = excluded.inode, deslocamento = excluded.deslocamento,
+        linhas = excluded.linhas, cabecalho = excluded.cabecalho, atualizado_em = excluded.atualizado_em
+"""
+
+SQL_LEITURA = """
+    INSERT INTO leituras_pendentes (usuario_id, nome_amostra, parametro, replicata, campo, valor, data, arquivo, linha,
+                                    recebida_em)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (usuario_id, nome_amostra, parametro, replicata, campo) DO UPDATE SET valor = excluded.valor,
+        data = excluded.data, arquivo = excluded.arquivo, linha = excluded.linha, recebida_em = excluded.recebida_em
+"""
+
+SQL_REJEITADA = """
+    INSERT INTO leituras_rejeitadas (arquivo, linha, conteudo, motivo, registrada_em) VALUES (?, ?, ?, ?, ?)
+"""
+
+# Uma replicata é completa quando tem todos os campos do método
+_REPLICATAS = f"""
+    replicatas AS (
+        SELECT usuario_id, nome_amostra, parametro, replicata, MAX(recebida_em) AS recebida_em,
+               COUNT(*) = CASE parametro {' '.join(f"WHEN '{p}' THEN {len(c)}" for p, c in CAMPOS.items())} END
+                   AS completa
+        FROM leituras_pendentes
+        GROUP BY usuario_id, nome_amostra, parametro, replicata
+    )"""
+
+# Leituras das análises prontas para fechar
+SQL_PRONTAS = f"""
+    WITH {_REPLICATAS}, prontas AS (
+        SELECT usuario_id, nome_amostra, parametro FROM replicatas
+        GROUP BY usuario_id, nome_amostra, parametro
+        HAVING SUM(completa) >= ? AND (SUM(completa) >= ? OR MAX(recebida_em) <= ?)
+        LIMIT ?
+    )
+    SELECT p.usuario_id, p.nome_amostra, p.parametro, p.replicata, p.campo, p.valor, p.data
+    FROM leituras_pendentes p JOIN prontas USING (usuario_id, nome_amostra, parametro)
+"""
+
+# Replicatas dos grupos parados há ``inatividade`` sem chegar a ``REPLICATAS_MINIMAS`` completas
+SQL_ABANDONADAS = f"""
+    WITH {_REPLICATAS}, abandonadas AS (
+        SELECT usuario_id, nome_amostra, parametro FROM replicatas
+        GROUP BY usuario_id, nome_amostra, parametro
+        HAVING SUM(completa) < ? AND MAX(recebida_em) <= ?
+    )
+    SELECT usuario_id, nome_amostra, parametro, replicata
+    FROM replicatas JOIN abandonadas USING (usuario_id, nome_amostra, parametro)
+    ORDER BY usuario_id, nome_amostra, parametro, replicata
+"""
+
+
+class _Ponto(NamedTuple):
+    """Onde a leitura de um arquivo parou."""
+
+    inode: int
+    deslocamento: int = 0
+    linhas: int = 0
+    cabecalho: str | None = None
+
+
+@dataclass
+class ResultadoCiclo:
+    """Resumo de uma passada pela pasta."""
+
+    arquivos: int = 0
+    linhas: int = 0
+    leituras: int = 0
+    rejeitadas: int = 0
+    analises: int = 0
+    pendentes: int = 0
+    segundos: float = 0.0
+
+    @property
+    def linhas_por_segundo(self) -> float:
+        return self.linhas / self.segundos if self.segundos else float("inf")
+
+
+def detectar_formato(colunas) -> str | None:
+    """Nome do formato cujas colunas obrigatórias estão todas no cabeçalho."""
+    for formato, exigidas in FORMATOS.items():
+        if set(exigidas) <= set(colunas):
+            return formato
+    return None
+
+
+def _colunas(cabecalho: str) -> list:
+    return [normalizar_chave(coluna) for coluna in cabecalho.split(SEPARADOR)]
+
+
+def _numero(texto: str) -> float:
+    try:
+        valor = float(texto.replace(",", "."))
+    except ValueError:
+        raise ValueError(f"valor não numérico: {texto!r}") from None
+    if not math.isfinite(valor):
+        raise ValueError(f"valor não numérico: {texto!r}")
+    return valor
+
+
+def _data(texto: str) -> str:
+    try:
+        momento = datetime.fromisoformat(texto)
+    except ValueError:
+        for formato in FORMATOS_DATA:
+            try:
+                momento = datetime.strptime(texto, formato)
+                break
+            except ValueError:
+                pass
+        else:
+            raise ValueError(f"data inválida: {texto!r}") from None
+    return momento.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def ler_mapa(banco, arquivo) -> dict:
+    """Mapa de amostras (``codigo``, ``amostra`` e, opcional, ``usuario`` por e-mail ou id) -> {código: (amostra, id)}."""
+    df = ler_planilha(arquivo).rename(columns=normalizar_chave).fillna("")
+    ausentes = {"codigo", "amostra"} - set(df.columns)
+    if ausentes:
+        raise ValueError(f"Colunas obrigatórias ausentes no mapa: {', '.join(sorted(ausentes))}")
+    with banco.leitura() as conn:
+        ids = dict(conn.execute("SELECT email, id FROM usuarios").fetchall())
+    ids.update({str(i): i for i in ids.values()})
+    mapa = {}
+    for linha in df.itertuples(index=False):
+        usuario = str(getattr(linha, "usuario", "")).strip()
+        if usuario and usuario not in ids:
+            raise ValueError(f"usuário do mapa não encontrado: {usuario}")
+        mapa[str(linha.codigo).strip()] = (str(linha.amostra).strip(), ids.get(usuario))
+    return mapa
+
+
+class Ingestor:
+    """Lê os arquivos novos (ou que cresceram) de ``pasta`` e fecha as análises completas."""
+
+    def __init__(self, banco, pasta, usuario_id: int, mapa: dict | None = None, replicatas: int | None = None,
+                 inatividade: float = INATIVIDADE_PADRAO, linhas_por_lote: int = LINHAS_POR_LOTE):
+        self.banco = banco
+        self.pasta = os.fspath(pasta)
+        self.usuario_id = usuario_id
+        self.mapa = mapa or {}
+        self.replicatas = replicatas or REPLICATAS_MAXIMAS
+        self.inatividade = inatividade
+        self.linhas_por_lote = linhas_por_lote
+        self.ultimo_erro: str | None = None
+
+    # ---------------------- LEITURA DOS ARQUIVOS ----------------------
+    def _arquivos(self) -> list:
+        """Arquivos de instrumento da pasta, dos mais antigos para os mais recentes."""
+        arquivos = []
+        with os.scandir(self.pasta) as entradas:
+            for entrada in entradas:
+                if entrada.is_file() and entrada.name.lower().endswith(EXTENSOES):
+                    try:
+                        arquivos.append((entrada.stat(), entrada.path))
+                    except FileNotFoundError:  # removido durante a varredura
+                        pass
+        arquivos.sort(key=lambda a: (a[0].st_mtime, a[1]))
+        return arquivos
+
+    def _leituras(self, formato: str, colunas: list, texto: str) -> list:
+        """(usuário, amostra, parâmetro, replicata, campo, valor, data) de uma linha; ``ValueError`` com o motivo."""
+        partes = [parte.strip() for parte in texto.split(SEPARADOR)]
+        if len(partes) != len(colunas):
+            raise ValueError(f"{len(partes)} campo(s); o cabeçalho tem {len(colunas)}")
+        campos = dict(zip(colunas, partes))
+        data = _data(campos["data"])
+        if not campos["id"]:
+            raise ValueError("leitura sem código de amostra")
+        nome, usuario_id = self.mapa.get(campos["id"], (campos["id"], None))
+        usuario_id = usuario_id or self.usuario_id
+        replicata = campos["replicata"]
+        if not replicata.isdigit() or not 1 <= int(replicata) <= REPLICATAS_MAXIMAS:
+            raise ValueError(f"replicata deve ser de 1 a {REPLICATAS_MAXIMAS}: {replicata!r}")
+        chave = (usuario_id, nome)
+
+        if formato == "titulador":
+            return [(*chave, "Proteínas", int(replicata), campo, _numero(campos[coluna]), data)
+                    for coluna, campo in TITULADOR.items()]
+        parametro = normalizar_parametro(campos["metodo"])
+        if parametro is None:
+            raise ValueError(f"método desconhecido: {campos['metodo']!r}")
+        etapa = normalizar_chave(campos["etapa"])
+        if etapa not in PESAGENS[parametro]:
+            raise ValueError(f"etapa desconhecida para {parametro}: {campos['etapa']!r}")
+        fator = UNIDADES.get(normalizar_chave(campos.get("unidade") or "g"))
+        if fator is None:
+            raise ValueError(f"unidade desconhecida: {campos['unidade']!r}")
+        return [(*chave, parametro, int(replicata), etapa, _numero(campos["massa"]) * fator, data)]
+
+    def _ler_lote(self, caminho: str, ponto: _Ponto, resultado: ResultadoCiclo) -> _Ponto | None:
+        """Processa até ``linhas_por_lote`` linhas completas a partir de ``ponto``; ``None`` se não há nenhuma."""
+        brutas = []
+        with open(caminho, "rb") as arquivo:
+            arquivo.seek(ponto.deslocamento)
+            for _ in range(self.linhas_por_lote):
+                bruta = arquivo.readline()
+                if not bruta.endswith(b"\n"):  # fim do arquivo ou linha ainda sendo escrita
+                    break
+                brutas.append(bruta)
+        if not brutas:
+            return None
+
+        recebida_em = agora()
+        cabecalho = ponto.cabecalho
+        colunas = formato = None
+        if cabecalho is not None:
+            colunas = _colunas(cabecalho)
+            formato = detectar_formato(colunas)
+        leituras, rejeitadas = [], []
+        for numero, bruta in enumerate(brutas, start=ponto.linhas + 1):
+            texto = bruta.decode("utf-8-sig" if numero == 1 else "utf-8", errors="replace").strip()
+            if not texto:
+                continue
+            if cabecalho is None:
+                cabecalho, colunas = texto, _colunas(texto)
+                formato = detectar_formato(colunas)
+                if formato is None:
+                    # Um registro só: as linhas de um arquivo desconhecido são puladas sem rejeição
+                    rejeitadas.append((caminho, numero, texto[:200], "cabeçalho de formato não reconhecido", recebida_em))
+                continue
+            if formato is None:
+                continue
+            try:
+                leituras.extend((*leitura, caminho, numero, recebida_em)
+                                for leitura in self._leituras(formato, colunas, texto))
+            except ValueError as erro:
+                rejeitadas.append((caminho, numero, texto[:200], str(erro), recebida_em))
+
+        novo = _Ponto(ponto.inode, ponto.deslocamento + sum(map(len, brutas)), ponto.linhas + len(brutas), cabecalho)
+        with self.banco.escrita(self.usuario_id) as conn:
+            conn.executemany(SQL_LEITURA, leituras)
+            conn.executemany(SQL_REJEITADA, rejeitadas)
+            conn.execute(SQL_PONTO, (caminho, *novo, recebida_em))
+        resultado.linhas += len(brutas)
+        resultado.leituras += len(leituras)
+        resultado.rejeitadas += len(rejeitadas)
+        return novo
+
+    def ler_arquivos(self, resultado: ResultadoCiclo):
+        with self.banco.leitura() as conn:
+            pontos = {linha[0]: _Ponto(*linha[1:]) for linha in conn.execute(SQL_PONTOS)}
+        for estado, caminho in self._arquivos():
+            ponto = pontos.get(caminho)
+            if ponto is not None and ponto.inode == estado.st_ino and ponto.deslocamento == estado.st_size:
+                continue
+            if ponto is None or ponto.inode != estado.st_ino or estado.st_size < ponto.deslocamento:
+                ponto = _Ponto(estado.st_ino)  # arquivo novo, substituído ou truncado: do início
+            lido = False
+            try:
+                while (novo := self._ler_lote(caminho, ponto, resultado)) is not None:
+                    ponto, lido = novo, True
+            except FileNotFoundError:  # removido depois da varredura; o que já foi lido está gravado
+                pass
+            resultado.arquivos += lido
+
+    # ---------------------- FECHAMENTO DAS ANÁLISES ----------------------
+    def _fechar_lote(self, conn, linhas: list, resultado: ResultadoCiclo):
+        """Calcula e grava as análises de um lote de leituras prontas e as tira de ``leituras_pendentes``.
+
+        As leituras saem de ``leituras_pendentes`` mesmo quando o grupo não fecha nenhuma análise: o que foi
+        recusado fica em ``leituras_rejeitadas``, com o motivo.
+        """
+        import pandas as pd
+
+        leituras = pd.DataFrame(linhas, columns=["usuario_id", "amostra", "parametro", "replicata", "campo", "valor",
+                                                 "data"])
+        chave = ["usuario_id", "amostra", "parametro"]
+        datas = leituras.groupby(chave)["data"].max()
+        largas = leituras.pivot(index=[*chave, "replicata"], columns="campo", values="valor").reset_index()
+        registrada_em = agora()
+        for usuario_id, grupo in largas.groupby("usuario_id"):
+            grupo = grupo.drop(columns="usuario_id").reset_index(drop=True)
+            try:
+                analises, rejeitadas = calcular_lote(grupo)
+                colunas = [c for c in analises.columns if c.startswith("valor")]
+                valores = analises[colunas].to_numpy(dtype=float)
+                novas = [
+                    parametros_analise(int(usuario_id), a.amostra, a.parametro, valores[i, :a.n_replicatas].tolist(),
+                                       a.media, a.desvio_padrao, a.coef_var, datas[(usuario_id, a.amostra, a.parametro)])
+                    for i, a in enumerate(analises.itertuples(index=False))
+                ]
+                recusadas = [
+                    (None, None, f"{r.amostra} · {r.parametro} · replicata {grupo['replicata'][r.linha - 2]}", r.motivo,
+                     registrada_em)
+                    for r in rejeitadas.itertuples(index=False)
+                ]
+            except Exception as erro:  # um grupo com dados que não se calculam não pode travar os ciclos seguintes
+                novas, recusadas = [], [
+                    (None, None, f"{r.amostra} · {r.parametro} · replicata {r.replicata}", f"falha no cálculo: {erro}",
+                     registrada_em)
+                    for r in grupo.itertuples(index=False)
+                ]
+            with self.banco.escrita(int(usuario_id)):
+                conn.executemany(SQL_INSERIR_ANALISE, novas)
+            conn.executemany(SQL_REJEITADA, recusadas)
+            resultado.analises += len(novas)
+            resultado.rejeitadas += len(recusadas)
+        conn.executemany("DELETE FROM leituras_pendentes WHERE usuario_id = ? AND nome_amostra = ? AND parametro = ?",
+                         [(int(u), a, p) for u, a, p in datas.index])
+
+    def fechar_analises(self, resultado: ResultadoCiclo):
+        limite = (datetime.now() - timedelta(seconds=self.inatividade)).strftime("%Y-%m-%d %H:%M:%S")
+        while True:
+            with self.banco.escrita(self.usuario_id) as conn:
+                linhas = conn.execute(SQL_PRONTAS, (REPLICATAS_MINIMAS, self.replicatas, limite,
+                                                    ANALISES_POR_LOTE)).fetchall()
+                if not linhas:
+                    break
+                self._fechar_lote(conn, linhas, resultado)
+        self.descartar_abandonadas(limite, resultado)
+
+    def descartar_abandonadas(self, limite: str, resultado: ResultadoCiclo):
+        """Leva para ``leituras_rejeitadas`` os grupos que pararam antes de ``REPLICATAS_MINIMAS`` completas."""
+        with self.banco.escrita(self.usuario_id) as conn:
+            replicatas = conn.execute(SQL_ABANDONADAS, (REPLICATAS_MINIMAS, limite)).fetchall()
+            if not replicatas:
+                return
+            registrada_em = agora()
+            conn.executemany(SQL_REJEITADA, [
+                (None, None, f"{amostra} · {parametro} · replicata {r}", "replicatas insuficientes", registrada_em)
+                for _, amostra, parametro, r in replicatas
+            ])
+            conn.executemany("DELETE FROM leituras_pendentes WHERE usuario_id = ? AND nome_amostra = ? AND parametro = ?",
+                             sorted({(u, a, p) for u, a, p, _ in replicatas}))
+        resultado.rejeitadas += len(replicatas)
+
+    # ---------------------- EXECUÇÃO ----------------------
+    def ciclo(self) -> ResultadoCiclo:
+        """Lê o que há de novo na pasta e fecha as análises prontas."""
+        inicio = time.perf_counter()
+        resultado = ResultadoCiclo()
+        self.ler_arquivos(resultado)
+        self.fechar_analises(resultado)
+        with self.banco.leitura() as conn:
+            resultado.pendentes = conn.execute("SELECT COUNT(*) FROM leituras_pendentes").fetchone()[0]
+        resultado.segundos = time.perf_counter() - inicio
+        return resultado
+
+    def executar(self, intervalo: float = INTERVALO_PADRAO, parar: threading.Event | None = None, ao_ciclo=None):
+        """Repete ``ciclo`` a cada ``intervalo`` segundos até ``parar`` ser sinalizado.
+
+        Para rodar em segundo plano: ``threading.Thread(target=ingestor.executar, kwargs={"parar": evento})``.
+        Um ciclo que falha é registrado no log e em ``ultimo_erro``; o seguinte tenta de novo.
+        """
+        parar = parar or threading.Event()
+        while not parar.is_set():
+            try:
+                resultado = self.ciclo()
+                self.ultimo_erro = None
+            except Exception as erro:
+                logger.exception("falha no ciclo de ingestão de %s", self.pasta)
+                self.ultimo_erro = repr(erro)
+            else:
+                if ao_ciclo:
+                    ao_ciclo(resultado)
+            parar.wait(intervalo)
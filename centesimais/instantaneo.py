@@ -0,0 +1,328 @@
+"""Instantâneo colunar de ``analises`` em disco, mapeado em memória pelo painel.
+
+O resumo estatístico e a tendência mensal do painel do administrador
+agregam sobre um retrato das colunas que eles usam, gravado como arquivos
+NumPy (``.npy``) e aberto com ``mmap_mode="r"``. Todas as sessões e todos os
+processos do mesmo banco mapeiam os mesmos arquivos, que ficam uma vez só no
+cache de páginas do sistema, e as agregações (``np.bincount``) não passam
+pelo SQLite; só a busca por nome de amostra consulta o índice FTS5 para
+obter os ids.
+
+Cada versão vai para uma pasta própria ao lado do banco
+(``banco.db.instantaneo/v000000001234/``), escrita num nome temporário e
+publicada por ``rename``; o arquivo ``atual`` aponta para a mais recente.
+Quem já mapeou uma versão antiga continua lendo-a até pedir a próxima.
+
+Política de atualização: o gatilho da migração 12 incrementa
+``alteracoes.versao`` a cada INSERT/UPDATE/DELETE em ``analises``.
+``GestorInstantaneo.obter`` compara esse contador com a versão do retrato e,
+se mudou e o retrato tem mais de ``intervalo`` segundos, gera outro numa
+thread, servindo o atual enquanto isso. O painel fica no máximo
+``intervalo`` segundos (mais o tempo de geração) atrás do banco, e uma
+rajada de gravações gera no máximo um retrato por intervalo. Sem retrato
+algum (banco novo ou geração falhando, por exemplo com o disco cheio),
+``obter`` dispara a geração e devolve ``None``: o painel agrega então no
+rollup ``resumo_diario``, mantido pelos gatilhos da migração 7.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from centesimais.busca import consulta_fts
+
+INTERVALO_PADRAO = 30.0  # segundos entre retratos enquanto houver alterações
+TAMANHO_LOTE = 65_536  # linhas por fetchmany na geração
+TENTATIVAS_ABERTURA = 3  # releituras de ``atual`` quando a versão lida some antes de ser aberta
+SEM_PARAMETRO = -1
+# coluna -> dtype do .npy
+COLUNAS = {
+    "id": np.int64,
+    "usuario_id": np.int64,
+    "parametro": np.int16,  # índice em ``parametros``; SEM_PARAMETRO se nulo ou vazio
+    "dia": "datetime64[D]",  # NaT se a data for ilegível
+    "media": np.float64,  # NaN se nula
+}
+
+SQL_VERSAO = "SELECT versao FROM alteracoes WHERE tabela = 'analises'"
+SQL_PARAMETROS = "SELECT DISTINCT parametro FROM analises WHERE parametro <> '' ORDER BY parametro"
+# Dias desde 1970-01-01 (NULL se a data for ilegível), prontos para datetime64[D]
+SQL_INSTANTANEO = """
+    SELECT id, COALESCE(usuario_id, 0), parametro,
+           CAST(julianday(substr(data, 1, 10)) - 2440587.5 AS INTEGER), media
+    FROM analises ORDER BY id
+"""
+NAT = np.datetime64("NaT", "D").astype(np.int64)
+
+
+def versao_banco(conn) -> int:
+    return conn.execute(SQL_VERSAO).fetchone()[0]
+
+
+def ids_busca(banco, amostra: str):
+    """Ids das análises cujo nome casa com a busca (índice FTS5), ou ``None`` sem busca."""
+    consulta = consulta_fts(amostra)
+    if consulta is None:
+        return None
+    with banco.leitura() as conn:
+        linhas = conn.execute("SELECT rowid FROM amostras_fts WHERE amostras_fts MATCH ?", (consulta,)).fetchall()
+    return np.fromiter((linha[0] for linha in linhas), dtype=np.int64, count=len(linhas))
+
+
+@dataclass(frozen=True, eq=False)
+class Instantaneo:
+    """Uma versão mapeada em memória (somente leitura) das colunas de ``analises``."""
+
+    versao: int
+    criado_em: float
+    pasta: Path
+    parametros: tuple
+    id: np.ndarray
+    usuario_id: np.ndarray
+    parametro: np.ndarray
+    dia: np.ndarray
+    media: np.ndarray
+
+    @classmethod
+    def abrir(cls, pasta: Path) -> "Instantaneo":
+        meta = json.loads((pasta / "meta.json").read_text(encoding="utf-8"))
+        colunas = {nome: np.load(pasta / f"{nome}.npy", mmap_mode="r") for nome in COLUNAS}
+        return cls(meta["versao"], meta["criado_em"], pasta, tuple(meta["parametros"]), **colunas)
+
+    @property
+    def linhas(self) -> int:
+        return len(self.id)
+
+    @property
+    def bytes(self) -> int:
+        return sum(getattr(self, nome).nbytes for nome in COLUNAS)
+
+    def selecao(self, filtros, ids=None) -> np.ndarray:
+        """Máscara das análises com média e parâmetro que passam nos filtros do painel (``FiltrosAnalises``)."""
+        mascara = (self.parametro != SEM_PARAMETRO) & ~np.isnan(self.media)
+        if filtros.usuario_id is not None:
+            mascara &= self.usuario_id == filtros.usuario_id
+        if filtros.parametro:
+            if filtros.parametro not in self.parametros:
+                return np.zeros(self.linhas, dtype=bool)
+            mascara &= self.parametro == self.parametros.index(filtros.parametro)
+        # Comparações com NaT são falsas: sem data legível, a análise sai do período, como no SQL
+        if filtros.data_inicio is not None:
+            mascara &= self.dia >= np.datetime64(filtros.data_inicio, "D")
+        if filtros.data_fim is not None:
+            mascara &= self.dia <= np.datetime64(filtros.data_fim, "D")
+        if ids is not None:
+            mascara &= np.isin(self.id, ids)
+        return mascara
+
+    def resumo(self, filtros, ids=None) -> pd.DataFrame:
+        """Mesmas colunas de ``painel.resumo_parametros``: total, média e desvio padrão das médias."""
+        mascara = self.selecao(filtros, ids)
+        grupos, valores = self.parametro[mascara], self.media[mascara]
+        tamanho = len(self.parametros)
+        n = np.bincount(grupos, minlength=tamanho)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            media = np.bincount(grupos, valores, minlength=tamanho) / n
+            # Duas passadas: soma dos quadrados dos desvios, sem o cancelamento de Σx² − (Σx)²/n
+            desvios = np.bincount(grupos, (valores - media[grupos]) ** 2, minlength=tamanho)
+            desvio_padrao = np.where(n > 1, np.sqrt(desvios / (n - 1)), np.nan)
+        presentes = n > 0
+        return pd.DataFrame({
+            "Análise": np.array(self.parametros, dtype=object)[presentes],
+            "Total": n[presentes],
+            "Média Geral": media[presentes],
+            "Desvio Padrão": desvio_padrao[presentes],
+        })
+
+    def tendencia(self, filtros, ids=None) -> pd.DataFrame:
+        """Mesmo formato de ``painel.tendencia_mensal``: meses (AAAA-MM) nas linhas, parâmetros nas colunas."""
+        mascara = self.selecao(filtros, ids) & ~np.isnat(self.dia)
+        if not mascara.any():
+            return pd.DataFrame(columns=["mes", "parametro", "media"]).pivot(index="mes", columns="parametro",
+                                                                             values="media")
+        meses = self.dia[mascara].astype("datetime64[M]").astype(np.int64)
+        tamanho = len(self.parametros)
+        chaves, grupos = np.unique(meses * tamanho + self.parametro[mascara], return_inverse=True)
+        medias = np.bincount(grupos, self.media[mascara]) / np.bincount(grupos)
+        tendencia = pd.DataFrame({
+            "mes": np.datetime_as_string((chaves // tamanho).astype("datetime64[M]"), unit="M"),
+            "parametro": np.array(self.parametros, dtype=object)[chaves % tamanho],
+            "media": medias,
+        })
+        return tendencia.pivot(index="mes", columns="parametro", values="media")
+
+
+class GestorInstantaneo:
+    """Gera, publica e reabre os instantâneos de um ``BancoDados``; um por banco em cada processo."""
+
+    def __init__(self, banco, pasta=None, intervalo: float = INTERVALO_PADRAO):
+        self.banco = banco
+        self.pasta = Path(pasta) if pasta is not None else banco.caminho.with_name(banco.caminho.name + ".instantaneo")
+        self.intervalo = intervalo
+        self._trava = threading.Lock()
+        self._trava_geracao = threading.Lock()
+        self._atual = None
+        self._gerando = False
+        self.geracoes = 0
+        self.ultima_geracao = None  # segundos
+        self.ultimo_erro = None
+
+    # ---------------------- LEITURA ----------------------
+    def _apontada(self) -> str | None:
+        try:
+            return (self.pasta / "atual").read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            return None
+
+    def _publicado(self) -> Instantaneo | None:
+        """Versão apontada por ``atual``, reaproveitando o mapeamento se já estiver aberta.
+
+        Entre ler ``atual`` e abrir a pasta, outro processo pode publicar uma versão mais nova e apagar a
+        lida: relê o apontador e tenta de novo. Se a pasta apontada não existe, fica com a versão já mapeada
+        (``None`` sem nenhuma, e ``obter`` gera outra).
+        """
+        nome = self._apontada()
+        with self._trava:
+            for _ in range(TENTATIVAS_ABERTURA):
+                if nome is None:
+                    break
+                if self._atual is not None and self._atual.pasta.name == nome:
+                    return self._atual
+                try:
+                    self._atual = Instantaneo.abrir(self.pasta / nome)
+                    return self._atual
+                except FileNotFoundError:
+                    apontada, nome = nome, self._apontada()
+                    if nome == apontada:
+                        break
+            return self._atual
+
+    def obter(self) -> Instantaneo | None:
+        """Instantâneo publicado; dispara a geração de outro se ``analises`` mudou (ver política no módulo).
+
+        ``None`` enquanto nenhum foi publicado: a primeira geração roda em segundo plano.
+        """
+        atual = self._publicado()
+        if atual is None:
+            self._gerar_em_segundo_plano()
+            return None
+        if time.time() - atual.criado_em >= self.intervalo:
+            with self.banco.leitura() as conn:
+                mudou = versao_banco(conn) != atual.versao
+            if mudou:
+                self._gerar_em_segundo_plano()
+        return atual
+
+    def estatisticas(self) -> dict:
+        atual = self._atual
+        return {
+            "versao": atual.versao if atual else None,
+            "linhas": atual.linhas if atual else 0,
+            "bytes": atual.bytes if atual else 0,
+            "idade": time.time() - atual.criado_em if atual else None,
+            "gerando": self._gerando,
+            "geracoes": self.geracoes,
+            "ultima_geracao": self.ultima_geracao,
+            "ultimo_erro": self.ultimo_erro,
+        }
+
+    # ---------------------- GERAÇÃO ----------------------
+    def _gerar_em_segundo_plano(self):
+        with self._trava:
+            if self._gerando:
+                return
+            self._gerando = True
+
+        def executar():
+            try:
+                self.gerar()
+                self.ultimo_erro = None
+            except Exception as erro:  # o painel segue com o retrato anterior
+                self.ultimo_erro = repr(erro)
+            finally:
+                self._gerando = False
+
+        threading.Thread(target=executar, name="instantaneo", daemon=True).start()
+
+    def gerar(self, forcar: bool = False) -> Instantaneo:
+        """Gera e publica o retrato da versão atual de ``analises`` (não refaz uma versão já publicada)."""
+        with self._trava_geracao:
+            inicio = time.perf_counter()
+            self.pasta.mkdir(parents=True, exist_ok=True)
+            with self.banco.leitura() as conn:
+                # Uma transação de leitura: contador, parâmetros e linhas do mesmo momento
+                conn.execute("BEGIN")
+                versao = versao_banco(conn)
+                destino = self.pasta / f"v{versao:012d}"
+                atual = self._publicado()
+                if atual is not None and atual.versao == versao and not forcar:
+                    return atual
+                if not destino.exists() or forcar:
+                    self._escrever(conn, versao, destino)
+            self._publicar(destino.name)
+            self.geracoes += 1
+            self.ultima_geracao = time.perf_counter() - inicio
+            return self._publicado()
+
+    def _escrever(self, conn, versao: int, destino: Path):
+        parametros = [linha[0] for linha in conn.execute(SQL_PARAMETROS)]
+        codigos = {parametro: i for i, parametro in enumerate(parametros)}
+        total = conn.execute("SELECT COUNT(*) FROM analises").fetchone()[0]
+        temporaria = Path(tempfile.mkdtemp(dir=self.pasta, prefix=".gerando-"))
+        try:
+            # Escritos direto no arquivo, bloco a bloco: a memória não cresce com a tabela
+            colunas = {nome: np.lib.format.open_memmap(temporaria / f"{nome}.npy", mode="w+", dtype=tipo,
+                                                       shape=(total,))
+                       for nome, tipo in COLUNAS.items()}
+            cursor = conn.execute(SQL_INSTANTANEO)
+            posicao = 0
+            while posicao < total:
+                bloco = cursor.fetchmany(TAMANHO_LOTE)
+                if not bloco:
+                    break
+                ids, usuarios, nomes, dias, medias = zip(*bloco)
+                fatia = slice(posicao, posicao + len(bloco))
+                colunas["id"][fatia] = ids
+                colunas["usuario_id"][fatia] = usuarios
+                colunas["parametro"][fatia] = [codigos.get(nome, SEM_PARAMETRO) for nome in nomes]
+                colunas["dia"].view(np.int64)[fatia] = [NAT if dia is None else dia for dia in dias]
+                colunas["media"][fatia] = np.array(medias, dtype=np.float64)  # None -> NaN
+                posicao += len(bloco)
+            for coluna in colunas.values():
+                coluna.flush()
+            del colunas
+            meta = {"versao": versao, "criado_em": time.time(), "linhas": total, "parametros": parametros}
+            (temporaria / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+            if destino.exists():  # forçado: substitui a mesma versão
+                shutil.rmtree(destino, ignore_errors=True)
+            try:
+                temporaria.rename(destino)
+            except OSError:
+                # Outro processo publicou a mesma versão primeiro; o conteúdo é o mesmo
+                shutil.rmtree(temporaria, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(temporaria, ignore_errors=True)
+            raise
+
+    def _publicar(self, nome: str):
+        """Aponta ``atual`` para ``nome`` (troca atômica) e apaga as versões anteriores."""
+        publicado = self._apontada() or ""
+        if nome < publicado and (self.pasta / publicado).is_dir():
+            # Outro processo já publicou uma versão mais nova enquanto esta era gerada
+            shutil.rmtree(self.pasta / nome, ignore_errors=True)
+            return
+        apontador = self.pasta / f".atual-{os.getpid()}-{threading.get_ident()}"
+        apontador.write_text(nome, encoding="utf-8")
+        os.replace(apontador, self.pasta / "atual")
+        for antiga in self.pasta.glob("v*"):
+            if antiga.name < nome:
+                # Quem ainda mapeia a versão antiga segue lendo (POSIX); no Windows fica para a próxima limpeza
+                shutil.rmtree(antiga, ignore_errors=True)
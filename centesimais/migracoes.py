@@ -0,0 +1,463 @@
+"""Migrações versionadas do banco SQLite (banco.db).
+
+Cada migração roda uma única vez, numa transação própria, e fica registrada
+na tabela ``schema_version``. Bancos antigos criados pelo ``app.py`` ou pelo
+``0app.py`` são atualizados no lugar, sem perda de dados.
+"""
+
+from datetime import datetime
+
+from centesimais.composicao import sql_recalcular
+from centesimais.controle import sql_recalcular_pontos, sql_serie
+from centesimais.replicatas import empacotar
+
+
+def _colunas(conn, tabela: str) -> set:
+    return {linha[1] for linha in conn.execute(f"PRAGMA table_info({tabela})")}
+
+
+def _renomear_coluna(conn, tabela: str, antiga: str, nova: str):
+    colunas = _colunas(conn, tabela)
+    if antiga in colunas and nova not in colunas:
+        conn.execute(f"ALTER TABLE {tabela} RENAME COLUMN {antiga} TO {nova}")
+
+
+# ---------------------- MIGRAÇÕES ----------------------
+def _tabelas_iniciais(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS usuarios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        senha_hash TEXT NOT NULL,
+        tipo TEXT NOT NULL DEFAULT 'usuario'
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS analises (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        usuario_id INTEGER,
+        nome_amostra TEXT,
+        parametro TEXT,
+        valor1 REAL,
+        valor2 REAL,
+        valor3 REAL,
+        media REAL,
+        desvio_padrao REAL,
+        coef_var REAL,
+        data TEXT,
+        FOREIGN KEY(usuario_id) REFERENCES usuarios(id)
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS anotacoes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        usuario_id INTEGER,
+        titulo TEXT,
+        conteudo TEXT,
+        data TEXT,
+        FOREIGN KEY(usuario_id) REFERENCES usuarios(id)
+    )
+    ''')
+
+
+def _unificar_colunas(conn):
+    """O app.py criava usuarios.senha e anotacoes.texto; o 0app.py, senha_hash e conteudo."""
+    _renomear_coluna(conn, "usuarios", "senha", "senha_hash")
+    _renomear_coluna(conn, "anotacoes", "texto", "conteudo")
+
+
+def _indices_compostos(conn):
+    # Painel por amostra e carboidratos: cobre "WHERE usuario_id AND nome_amostra" lendo parametro e media
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_analises_usuario_amostra ON analises (usuario_id, nome_amostra, parametro, media)")
+    # Análises finalizadas, exportações e relatórios por parâmetro, mais recentes primeiro
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_analises_usuario_parametro ON analises (usuario_id, parametro, data)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_analises_usuario_data ON analises (usuario_id, data)")
+    # Painel do administrador: ORDER BY data DESC sobre todos os usuários
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_analises_data ON analises (data)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_anotacoes_usuario_data ON anotacoes (usuario_id, data)")
+    conn.execute("ANALYZE")
+
+
+def _composicao_materializada(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS composicao (
+        usuario_id INTEGER NOT NULL,
+        nome_amostra TEXT NOT NULL,
+        umidade REAL,
+        cinzas REAL,
+        proteinas REAL,
+        lipidios REAL,
+        fibras REAL,
+        carboidratos REAL,
+        vet REAL,
+        PRIMARY KEY (usuario_id, nome_amostra)
+    ) WITHOUT ROWID
+    ''')
+    _gatilhos_composicao(conn)
+    conn.execute("DELETE FROM composicao")
+    conn.execute(sql_recalcular("1 = 1"))
+
+
+def _gatilhos_composicao(conn):
+    # Só análises com dono e nome de amostra têm linha em composicao (as duas colunas são NOT NULL lá)
+    com_chave = "{linha}.usuario_id IS NOT NULL AND {linha}.nome_amostra IS NOT NULL"
+    novo = sql_recalcular("usuario_id = NEW.usuario_id AND nome_amostra = NEW.nome_amostra")
+    antigo = sql_recalcular("usuario_id = OLD.usuario_id AND nome_amostra = OLD.nome_amostra")
+    remover_antigo = "DELETE FROM composicao WHERE usuario_id = OLD.usuario_id AND nome_amostra = OLD.nome_amostra"
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_composicao_insert AFTER INSERT ON analises
+    WHEN {com_chave.format(linha="NEW")} BEGIN
+        {novo};
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_composicao_update
+    AFTER UPDATE OF usuario_id, nome_amostra, parametro, media ON analises
+    WHEN ({com_chave.format(linha="OLD")}) OR ({com_chave.format(linha="NEW")}) BEGIN
+        {remover_antigo};
+        {antigo};
+        {novo};
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_composicao_delete AFTER DELETE ON analises
+    WHEN {com_chave.format(linha="OLD")} BEGIN
+        {remover_antigo};
+        {antigo};
+    END
+    """)
+
+
+def _indice_parametro_data(conn):
+    # Painel do administrador filtrado só por parâmetro, paginado por (data, id)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_analises_parametro_data ON analises (parametro, data)")
+
+
+def _busca_textual(conn):
+    """Índices FTS5 de conteúdo externo sobre anotacoes e analises.nome_amostra."""
+    opcoes = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+    conn.execute(f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS anotacoes_fts USING fts5(
+        titulo, conteudo, content = 'anotacoes', content_rowid = 'id', {opcoes}
+    )
+    """)
+    conn.execute(f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS amostras_fts USING fts5(
+        nome_amostra, content = 'analises', content_rowid = 'id', {opcoes}
+    )
+    """)
+    # Tabelas de conteúdo externo: a remoção precisa repetir os valores indexados
+    gatilhos = {
+        "anotacoes": ("anotacoes_fts", "titulo, conteudo", "UPDATE OF titulo, conteudo"),
+        "analises": ("amostras_fts", "nome_amostra", "UPDATE OF nome_amostra"),
+    }
+    for tabela, (fts, colunas, atualizacao) in gatilhos.items():
+        novos = ", ".join(f"NEW.{coluna}" for coluna in colunas.split(", "))
+        antigos = ", ".join(f"OLD.{coluna}" for coluna in colunas.split(", "))
+        inserir = f"INSERT INTO {fts} (rowid, {colunas}) VALUES (NEW.id, {novos})"
+        remover = f"INSERT INTO {fts} ({fts}, rowid, {colunas}) VALUES ('delete', OLD.id, {antigos})"
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert AFTER INSERT ON {tabela} BEGIN {inserir}; END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete AFTER DELETE ON {tabela} BEGIN {remover}; END")
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_update AFTER {atualizacao} ON {tabela} BEGIN
+            {remover};
+            {inserir};
+        END
+        """)
+    reconstruir_busca(conn)
+
+
+def reconstruir_busca(conn):
+    """Refaz os índices FTS5 a partir das tabelas de conteúdo (manutenção)."""
+    for fts in ("anotacoes_fts", "amostras_fts"):
+        conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def _resumo_diario(conn):
+    """Rollup de analises por (parâmetro, dia, usuário): n, Σmédia e Σmédia² das médias não nulas."""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS resumo_diario (
+        parametro TEXT NOT NULL,
+        dia TEXT NOT NULL,
+        usuario_id INTEGER NOT NULL,
+        n INTEGER NOT NULL,
+        soma REAL NOT NULL,
+        soma_quadrados REAL NOT NULL,
+        PRIMARY KEY (parametro, dia, usuario_id)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_resumo_diario_usuario_dia ON resumo_diario (usuario_id, dia)")
+
+    def chave(linha):
+        return (f"COALESCE({linha}.parametro, '')", f"COALESCE(substr({linha}.data, 1, 10), '')",
+                f"COALESCE({linha}.usuario_id, 0)")
+
+    parametro, dia, usuario = chave("NEW")
+    somar = f"""
+        INSERT INTO resumo_diario (parametro, dia, usuario_id, n, soma, soma_quadrados)
+        SELECT {parametro}, {dia}, {usuario}, 1, NEW.media, NEW.media * NEW.media WHERE NEW.media IS NOT NULL
+        ON CONFLICT (parametro, dia, usuario_id) DO UPDATE SET
+            n = n + 1, soma = soma + excluded.soma, soma_quadrados = soma_quadrados + excluded.soma_quadrados
+    """
+    parametro, dia, usuario = chave("OLD")
+    mesma_chave = f"parametro = {parametro} AND dia = {dia} AND usuario_id = {usuario}"
+    subtrair = f"""
+        UPDATE resumo_diario SET n = n - 1, soma = soma - OLD.media, soma_quadrados = soma_quadrados - OLD.media * OLD.media
+        WHERE {mesma_chave} AND OLD.media IS NOT NULL;
+        DELETE FROM resumo_diario WHERE {mesma_chave} AND n <= 0
+    """
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_resumo_insert AFTER INSERT ON analises BEGIN {somar}; END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_resumo_delete AFTER DELETE ON analises BEGIN {subtrair}; END")
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_resumo_update
+    AFTER UPDATE OF usuario_id, parametro, media, data ON analises BEGIN
+        {subtrair};
+        {somar};
+    END
+    """)
+    reconstruir_resumo_diario(conn)
+
+
+def reconstruir_resumo_diario(conn):
+    """Recalcula o rollup inteiro a partir de ``analises`` (manutenção)."""
+    conn.execute("DELETE FROM resumo_diario")
+    conn.execute("""
+    INSERT INTO resumo_diario (parametro, dia, usuario_id, n, soma, soma_quadrados)
+    SELECT COALESCE(parametro, ''), COALESCE(substr(data, 1, 10), ''), COALESCE(usuario_id, 0),
+           COUNT(*), SUM(media), SUM(media * media)
+    FROM analises WHERE media IS NOT NULL
+    GROUP BY 1, 2, 3
+    """)
+
+
+def _replicatas_variaveis(conn):
+    """Número qualquer de replicatas: BLOB de float64 e contagem (ver centesimais.replicatas)."""
+    colunas = _colunas(conn, "analises")
+    if "replicatas" not in colunas:
+        conn.execute("ALTER TABLE analises ADD COLUMN replicatas BLOB")
+    if "n_replicatas" not in colunas:
+        conn.execute("ALTER TABLE analises ADD COLUMN n_replicatas INTEGER")
+    # As triplicatas existentes viram o BLOB; valor1..valor3 ficam como estão
+    conn.create_function("empacotar_replicatas", 3, lambda *valores: empacotar(valores), deterministic=True)
+    conn.execute("""
+    UPDATE analises SET replicatas = empacotar_replicatas(valor1, valor2, valor3),
+                        n_replicatas = (valor1 IS NOT NULL) + (valor2 IS NOT NULL) + (valor3 IS NOT NULL)
+    WHERE replicatas IS NULL AND COALESCE(valor1, valor2, valor3) IS NOT NULL
+    """)
+
+
+def _replicatas_suspeitas(conn):
+    """Resultado da varredura de discrepantes (ver centesimais.discrepantes) e histórico das execuções."""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS replicatas_suspeitas (
+        analise_id INTEGER PRIMARY KEY,
+        teste TEXT NOT NULL,
+        posicao INTEGER NOT NULL,
+        valor REAL NOT NULL,
+        estatistica REAL NOT NULL,
+        critico REAL NOT NULL,
+        confianca REAL NOT NULL,
+        verificada_em TEXT NOT NULL
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS varreduras (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        executada_em TEXT NOT NULL,
+        confianca REAL NOT NULL,
+        analises_testadas INTEGER NOT NULL,
+        suspeitas INTEGER NOT NULL,
+        segundos REAL NOT NULL
+    )
+    ''')
+    # A marcação vale para as replicatas testadas: some com a análise ou quando elas mudam
+    remover = "DELETE FROM replicatas_suspeitas WHERE analise_id = OLD.id"
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_suspeitas_delete AFTER DELETE ON analises BEGIN {remover}; END")
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_suspeitas_update AFTER UPDATE OF replicatas ON analises
+    WHEN OLD.replicatas IS NOT NEW.replicatas BEGIN
+        {remover};
+    END
+    """)
+
+
+def _cartas_controle(conn):
+    """Materiais de controle e pontos das cartas de Shewhart (ver centesimais.controle)."""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS controles (
+        nome_amostra TEXT PRIMARY KEY,
+        descricao TEXT,
+        criado_em TEXT NOT NULL
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS pontos_controle (
+        analise_id INTEGER PRIMARY KEY,
+        nome_amostra TEXT NOT NULL,
+        parametro TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        data TEXT,
+        valor REAL NOT NULL,
+        n INTEGER,
+        linha_central REAL,
+        variancia REAL,
+        zona INTEGER,
+        regras INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_pontos_controle_serie ON pontos_controle (parametro, nome_amostra, seq)")
+
+    def recalcular(parametro, nome_amostra, desde="1"):
+        return ";\n".join(sql_recalcular_pontos(sql_serie(parametro, nome_amostra, desde)))
+
+    serie_nova = "parametro = NEW.parametro AND nome_amostra = NEW.nome_amostra"
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_controle_insert AFTER INSERT ON analises
+    WHEN NEW.parametro IS NOT NULL AND NEW.media IS NOT NULL
+         AND EXISTS (SELECT 1 FROM controles WHERE nome_amostra = NEW.nome_amostra) BEGIN
+        INSERT INTO pontos_controle (analise_id, nome_amostra, parametro, seq, data, valor)
+        VALUES (NEW.id, NEW.nome_amostra, NEW.parametro,
+                COALESCE((SELECT MAX(seq) FROM pontos_controle WHERE {serie_nova}), 0) + 1, NEW.data, NEW.media);
+        {recalcular("NEW.parametro", "NEW.nome_amostra", "(SELECT seq FROM pontos_controle WHERE analise_id = NEW.id)")};
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_controle_update AFTER UPDATE OF media ON analises
+    WHEN NEW.media IS NOT NULL AND OLD.media IS NOT NEW.media
+         AND EXISTS (SELECT 1 FROM pontos_controle WHERE analise_id = NEW.id) BEGIN
+        UPDATE pontos_controle SET valor = NEW.media WHERE analise_id = NEW.id;
+        {recalcular("NEW.parametro", "NEW.nome_amostra", "(SELECT seq FROM pontos_controle WHERE analise_id = NEW.id)")};
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_controle_delete AFTER DELETE ON analises
+    WHEN EXISTS (SELECT 1 FROM pontos_controle WHERE analise_id = OLD.id) BEGIN
+        DELETE FROM pontos_controle WHERE analise_id = OLD.id;
+        {recalcular("OLD.parametro", "OLD.nome_amostra")};
+    END
+    """)
+
+
+def _ingestao_instrumentos(conn):
+    """Ponto de leitura de cada arquivo, leituras pendentes e linhas rejeitadas (ver centesimais.ingestao)."""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS ingestao_arquivos (
+        caminho TEXT PRIMARY KEY,
+        inode INTEGER NOT NULL,
+        deslocamento INTEGER NOT NULL,
+        linhas INTEGER NOT NULL,
+        cabecalho TEXT,
+        atualizado_em TEXT NOT NULL
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS leituras_pendentes (
+        usuario_id INTEGER NOT NULL,
+        nome_amostra TEXT NOT NULL,
+        parametro TEXT NOT NULL,
+        replicata INTEGER NOT NULL,
+        campo TEXT NOT NULL,
+        valor REAL NOT NULL,
+        data TEXT NOT NULL,
+        arquivo TEXT,
+        linha INTEGER,
+        recebida_em TEXT NOT NULL,
+        PRIMARY KEY (usuario_id, nome_amostra, parametro, replicata, campo)
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS leituras_rejeitadas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        arquivo TEXT,
+        linha INTEGER,
+        conteudo TEXT,
+        motivo TEXT NOT NULL,
+        registrada_em TEXT NOT NULL
+    )
+    ''')
+
+
+def _contador_alteracoes(conn):
+    """Contador de alterações de ``analises``, que versiona o instantâneo do painel (ver centesimais.instantaneo)."""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS alteracoes (
+        tabela TEXT PRIMARY KEY,
+        versao INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO alteracoes (tabela, versao) VALUES ('analises', 0)")
+    for evento in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_alteracoes_{evento.lower()} AFTER {evento} ON analises BEGIN
+            UPDATE alteracoes SET versao = versao + 1 WHERE tabela = 'analises';
+        END
+        """)
+
+
+def _versao_sessao(conn):
+    """Geração das sessões de cada usuário, que entra na assinatura dos tokens (ver centesimais.autenticacao)."""
+    if "versao_sessao" not in _colunas(conn, "usuarios"):
+        conn.execute("ALTER TABLE usuarios ADD COLUMN versao_sessao INTEGER NOT NULL DEFAULT 0")
+
+
+
+def _composicao_sem_chave_nula(conn):
+    """Refaz os gatilhos de composicao ignorando análises sem dono ou sem nome de amostra (esquema original)."""
+    for evento in ("insert", "update", "delete"):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_composicao_{evento}")
+    _gatilhos_composicao(conn)
+
+
+MIGRACOES = [
+    (1, "tabelas usuarios, analises e anotacoes", _tabelas_iniciais),
+    (2, "unifica usuarios.senha_hash e anotacoes.conteudo", _unificar_colunas),
+    (3, "índices compostos de analises e anotacoes", _indices_compostos),
+    (4, "tabela composicao mantida por gatilhos", _composicao_materializada),
+    (5, "índice de analises por parâmetro e data", _indice_parametro_data),
+    (6, "busca textual FTS5 em anotacoes e nomes de amostras", _busca_textual),
+    (7, "rollup resumo_diario mantido por gatilhos", _resumo_diario),
+    (8, "replicatas em número variável (BLOB float64)", _replicatas_variaveis),
+    (9, "tabelas replicatas_suspeitas e varreduras (Dixon/Grubbs)", _replicatas_suspeitas),
+    (10, "cartas de controle de Shewhart mantidas por gatilhos", _cartas_controle),
+    (11, "ingestão de arquivos da balança e do titulador", _ingestao_instrumentos),
+    (12, "contador de alterações de analises (instantâneo do painel)", _contador_alteracoes),
+    (13, "usuarios.versao_sessao para revogar tokens de sessão", _versao_sessao),
+    (14, "gatilhos de composicao ignoram análises sem dono ou sem amostra", _composicao_sem_chave_nula),
+]
+
+
+# ---------------------- EXECUÇÃO ----------------------
+def versao_atual(conn) -> int:
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        versao INTEGER PRIMARY KEY,
+        descricao TEXT NOT NULL,
+        aplicada_em TEXT NOT NULL
+    )
+    ''')
+    return conn.execute("SELECT COALESCE(MAX(versao), 0) FROM schema_version").fetchone()[0]
+
+
+def migrar(conn) -> int:
+    """Aplica as migrações pendentes e retorna a versão final do esquema."""
+    versao = versao_atual(conn)
+    conn.commit()
+    for numero, descricao, passo in MIGRACOES:
+        if numero <= versao:
+            continue
+        # BEGIN IMMEDIATE serializa processos que migram ao mesmo tempo; a versão é relida já com o lock
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if versao_atual(conn) < numero:
+                passo(conn)
+                conn.execute(
+                    "INSERT INTO schema_version (versao, descricao, aplicada_em) VALUES (?, ?, ?)",
+                    (numero, descricao, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                )
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+        versao = numero
+    return versao
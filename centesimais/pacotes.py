@@ -0,0 +1,106 @@
+"""Pacote ZIP com um relatório por usuário × parâmetro, gerado em vários processos.
+
+Cada relatório é uma tarefa independente (uma consulta e um arquivo), então
+as tarefas são distribuídas num ``ProcessPoolExecutor`` com um trabalhador
+por núcleo; cada processo abre a própria conexão somente leitura. O processo
+principal só copia para o ZIP os arquivos que ficam prontos, na ordem em que
+terminam, e avisa o progresso a cada um. PDF e XLSX já saem comprimidos,
+por isso entram no ZIP sem nova compressão.
+
+O pool usa ``spawn``: o processo do Streamlit tem várias threads, e ``fork``
+nessas condições pode herdar locks presos.
+"""
+
+import multiprocessing
+import os
+import sqlite3
+import unicodedata
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from centesimais.relatorios import (
+    ORDEM_PARAMETRO, arquivo_temporario, escrever_excel, escrever_pdf, sql_relatorio
+)
+
+FORMATOS = ("pdf", "xlsx")
+
+SQL_TAREFAS = """
+    SELECT a.usuario_id, COALESCE(u.nome, 'sem usuário') AS usuario, a.parametro, COUNT(*) AS analises
+    FROM analises a LEFT JOIN usuarios u ON u.id = a.usuario_id
+    {filtro}
+    GROUP BY a.usuario_id, a.parametro
+    ORDER BY COUNT(*) DESC
+"""
+
+_conexao = None  # uma por processo trabalhador
+
+
+def _nome_arquivo(texto) -> str:
+    """Trecho de caminho seguro no ZIP: sem acentos, barras nem espaços."""
+    sem_acento = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode()
+    return "".join(c if c.isalnum() or c in "-." else "_" for c in sem_acento).strip("_.") or "sem_nome"
+
+
+def tarefas(banco, usuario_id=None) -> list:
+    """(usuario_id, nome do usuário, parâmetro, nº de análises), das maiores para as menores.
+
+    Começar pelas maiores evita que um relatório grande fique sozinho no fim.
+    """
+    filtro, params = "WHERE a.parametro IS NOT NULL", ()
+    if usuario_id is not None:
+        filtro, params = "WHERE a.parametro IS NOT NULL AND a.usuario_id = ?", (usuario_id,)
+    with banco.leitura() as conn:
+        return conn.execute(SQL_TAREFAS.format(filtro=filtro), params).fetchall()
+
+
+def _inicializar(caminho_banco: str):
+    global _conexao
+    _conexao = sqlite3.connect(f"{Path(caminho_banco).as_uri()}?mode=ro", uri=True)
+
+
+def _gerar(usuario_id, usuario: str, parametro: str, formato: str) -> tuple:
+    """Roda no trabalhador: grava um relatório e devolve (nome no ZIP, arquivo temporário)."""
+    nome = f"{_nome_arquivo(usuario_id)}_{_nome_arquivo(usuario)}/{_nome_arquivo(parametro)}.{formato}"
+    destino = arquivo_temporario(f".{formato}")
+    if formato == "pdf":
+        sql, params = sql_relatorio(usuario_id, parametro)
+        escrever_pdf(_conexao.execute(sql, params), destino, f"{usuario} — {parametro}")
+    else:
+        sql, params = sql_relatorio(usuario_id, parametro, ordem=ORDEM_PARAMETRO)
+        escrever_excel(_conexao.execute(sql, params), destino)
+    return nome, str(destino)
+
+
+def gerar_pacote(banco, usuario_id=None, formatos=FORMATOS, trabalhadores: int | None = None,
+                 progresso=None) -> Path:
+    """ZIP temporário com um relatório por usuário × parâmetro em cada formato.
+
+    ``usuario_id`` restringe a um usuário. ``progresso(feitos, total, nome)`` é
+    chamado no processo atual a cada arquivo adicionado.
+    """
+    trabalhos = [(u, nome, parametro, formato)
+                 for u, nome, parametro, _ in tarefas(banco, usuario_id) for formato in formatos]
+    trabalhadores = max(1, min(trabalhadores or os.cpu_count() or 1, len(trabalhos)))
+    destino = arquivo_temporario(".zip")
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_STORED) as pacote:
+        if not trabalhos:
+            pacote.writestr("LEIAME.txt", "Nenhuma análise encontrada.\n")
+            return destino
+        with ProcessPoolExecutor(trabalhadores, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_inicializar, initargs=(str(banco.caminho),)) as executor:
+            futuros = [executor.submit(_gerar, *trabalho) for trabalho in trabalhos]
+            try:
+                for feitos, futuro in enumerate(as_completed(futuros), start=1):
+                    nome, temporario = futuro.result()
+                    pacote.write(temporario, nome)
+                    os.unlink(temporario)
+                    if progresso:
+                        progresso(feitos, len(trabalhos), nome)
+            except BaseException:
+                for futuro in futuros:
+                    futuro.cancel()
+                pacote.close()
+                destino.unlink(missing_ok=True)
+                raise
+    return destino
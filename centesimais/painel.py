@@ -0,0 +1,192 @@
+"""Consultas do painel do administrador: filtros no SQL e paginação por chave.
+
+A grade percorre ``analises`` da mais recente para a mais antiga, ordenada por
+(data, id). Em vez de ``OFFSET``, que relê todas as linhas das páginas
+anteriores, cada página começa depois da última chave exibida::
+
+    WHERE ... AND (data, id) < (:ultima_data, :ultimo_id)
+    ORDER BY data DESC, id DESC LIMIT :tamanho
+
+Com os índices (data), (usuario_id, data), (parametro, data) e
+(usuario_id, parametro, data) cada página lê só as suas linhas, qualquer que
+seja o tamanho da tabela. O nome da amostra é filtrado pelo índice FTS5
+``amostras_fts``.
+
+O resumo estatístico e a tendência mensal vêm de ``resumo_diario`` (migração
+7), que guarda n, Σmédia e Σmédia² por (parâmetro, dia, usuário) e é mantida
+por gatilhos; só a busca por nome de amostra, que o rollup não conhece,
+agrega direto em ``analises``. Com um ``Instantaneo`` (``centesimais.instantaneo``),
+os dois agregam sobre as colunas mapeadas em memória, sem consultar o SQLite;
+o rollup é o caminho do painel enquanto não há instantâneo publicado.
+"""
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from centesimais.busca import consulta_fts
+from centesimais.replicatas import formatar
+
+TAMANHO_PAGINA = 50
+
+SQL_PAGINA = """
+    SELECT a.id, u.nome AS usuario, a.nome_amostra, a.parametro, a.n_replicatas, a.replicatas,
+           a.media, a.desvio_padrao, a.coef_var, a.data
+    FROM analises a LEFT JOIN usuarios u ON u.id = a.usuario_id
+    {filtro}
+    ORDER BY a.data DESC, a.id DESC
+    LIMIT ?
+"""
+
+# Mesmas colunas de resumo_diario, agregadas na hora a partir de analises
+SQL_RESUMO_ANALISES = """(
+    SELECT a.parametro, substr(a.data, 1, 10) AS dia, a.usuario_id, COUNT(a.media) AS n,
+           SUM(a.media) AS soma, SUM(a.media * a.media) AS soma_quadrados
+    FROM analises a {filtro}
+    GROUP BY 1, 2, 3
+)"""
+
+# Variância amostral por agregação: (Σx² − (Σx)²/n) / (n − 1); a raiz fica no pandas,
+# pois sqrt() só existe no SQLite compilado com as funções matemáticas
+SQL_RESUMO = """
+    SELECT parametro AS "Análise", SUM(n) AS "Total", SUM(soma) / SUM(n) AS "Média Geral",
+           CASE WHEN SUM(n) > 1 THEN
+               max(SUM(soma_quadrados) - SUM(soma) * SUM(soma) / SUM(n), 0) / (SUM(n) - 1)
+           END AS variancia
+    FROM {fonte} r {filtro}
+    GROUP BY parametro
+    HAVING SUM(n) > 0
+    ORDER BY parametro
+"""
+
+SQL_TENDENCIA = """
+    SELECT substr(dia, 1, 7) AS mes, parametro, SUM(n) AS total, SUM(soma) / SUM(n) AS media
+    FROM {fonte} r {filtro}
+    GROUP BY mes, parametro
+    HAVING SUM(n) > 0
+    ORDER BY mes, parametro
+"""
+
+
+@dataclass(frozen=True)
+class FiltrosAnalises:
+    """Filtros da grade; campos vazios não restringem a consulta."""
+
+    amostra: str = ""
+    parametro: str | None = None
+    usuario_id: int | None = None
+    data_inicio: date | None = None
+    data_fim: date | None = None
+
+    def clausula(self) -> tuple:
+        """(condições SQL unidas por AND, parâmetros) sobre o alias ``a`` de analises."""
+        condicoes, params = [], []
+        if self.usuario_id is not None:
+            condicoes.append("a.usuario_id = ?")
+            params.append(self.usuario_id)
+        if self.parametro:
+            condicoes.append("a.parametro = ?")
+            params.append(self.parametro)
+        if self.data_inicio is not None:
+            condicoes.append("a.data >= ?")
+            params.append(self.data_inicio.isoformat())
+        if self.data_fim is not None:
+            # data é "AAAA-MM-DD HH:MM:SS": o dia final entra inteiro
+            condicoes.append("a.data < ?")
+            params.append((self.data_fim + timedelta(days=1)).isoformat())
+        consulta = consulta_fts(self.amostra)
+        if consulta is not None:
+            # Busca por prefixo no índice FTS5 de nomes de amostras (ver centesimais.busca)
+            condicoes.append("a.id IN (SELECT rowid FROM amostras_fts WHERE amostras_fts MATCH ?)")
+            params.append(consulta)
+        return condicoes, params
+
+
+def _onde(condicoes) -> str:
+    return f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+
+
+def sql_pagina(filtros: FiltrosAnalises, apos: tuple | None = None, tamanho: int = TAMANHO_PAGINA) -> tuple:
+    """Consulta de uma página; ``apos`` é a chave (data, id) da última linha da página anterior.
+
+    Pede ``tamanho + 1`` linhas: a linha extra só indica que existe uma próxima página.
+    """
+    condicoes, params = filtros.clausula()
+    if apos is not None:
+        condicoes.append("(a.data, a.id) < (?, ?)")
+        params.extend(apos)
+    return SQL_PAGINA.format(filtro=_onde(condicoes)), (*params, tamanho + 1)
+
+
+def _fonte_resumo(filtros: FiltrosAnalises) -> tuple:
+    """(tabela ou subconsulta com n/soma/soma_quadrados por dia, filtro sobre ela, parâmetros)."""
+    if consulta_fts(filtros.amostra) is not None:
+        condicoes, params = filtros.clausula()
+        return SQL_RESUMO_ANALISES.format(filtro=_onde(condicoes)), "WHERE r.parametro IS NOT NULL", params
+
+    condicoes, params = ["r.parametro <> ''"], []
+    if filtros.usuario_id is not None:
+        condicoes.append("r.usuario_id = ?")
+        params.append(filtros.usuario_id)
+    if filtros.parametro:
+        condicoes.append("r.parametro = ?")
+        params.append(filtros.parametro)
+    if filtros.data_inicio is not None:
+        condicoes.append("r.dia >= ?")
+        params.append(filtros.data_inicio.isoformat())
+    if filtros.data_fim is not None:
+        condicoes.append("r.dia <= ?")
+        params.append(filtros.data_fim.isoformat())
+    return "resumo_diario", _onde(condicoes), params
+
+
+def sql_resumo(filtros: FiltrosAnalises) -> tuple:
+    """Total, média e variância das médias por parâmetro."""
+    fonte, filtro, params = _fonte_resumo(filtros)
+    return SQL_RESUMO.format(fonte=fonte, filtro=filtro), tuple(params)
+
+
+def sql_tendencia(filtros: FiltrosAnalises) -> tuple:
+    """Média e total das análises por mês (AAAA-MM) e parâmetro."""
+    fonte, filtro, params = _fonte_resumo(filtros)
+    return SQL_TENDENCIA.format(fonte=fonte, filtro=filtro), tuple(params)
+
+
+def pagina_analises(banco, filtros: FiltrosAnalises, apos: tuple | None = None,
+                    tamanho: int = TAMANHO_PAGINA) -> tuple:
+    """(DataFrame da página, chave da próxima página ou ``None`` se esta for a última).
+
+    As replicatas (BLOB) saem como texto, prontas para a grade.
+    """
+    sql, params = sql_pagina(filtros, apos, tamanho)
+    df = banco.consultar(sql, params)
+    proxima = None
+    if len(df) > tamanho:
+        df = df.iloc[:tamanho]
+        proxima = (df["data"].iloc[-1], int(df["id"].iloc[-1]))
+    return df.assign(replicatas=df["replicatas"].map(formatar)), proxima
+
+
+def resumo_parametros(banco, filtros: FiltrosAnalises, instantaneo=None) -> pd.DataFrame:
+    """Resumo por parâmetro com o desvio padrão já calculado."""
+    if instantaneo is not None:
+        from centesimais.instantaneo import ids_busca
+
+        return instantaneo.resumo(filtros, ids_busca(banco, filtros.amostra))
+    sql, params = sql_resumo(filtros)
+    resumo = banco.consultar(sql, params)
+    # banco.consultar devolve o DataFrame do cache: gera um novo em vez de alterar
+    return resumo.assign(**{"Desvio Padrão": np.sqrt(resumo["variancia"].astype(float))}).drop(columns="variancia")
+
+
+def tendencia_mensal(banco, filtros: FiltrosAnalises, instantaneo=None) -> pd.DataFrame:
+    """Média mensal por parâmetro em formato largo (meses nas linhas), pronta para gráfico."""
+    if instantaneo is not None:
+        from centesimais.instantaneo import ids_busca
+
+        return instantaneo.tendencia(filtros, ids_busca(banco, filtros.amostra))
+    sql, params = sql_tendencia(filtros)
+    tendencia = banco.consultar(sql, params)
+    return tendencia.pivot(index="mes", columns="parametro", values="media")
@@ -0,0 +1,387 @@
+"""Relatórios de análises gerados em fluxo, com memória constante.
+
+As linhas são lidas do cursor em blocos (``fetchmany``) e cada página do PDF
+é gravada no arquivo assim que fica cheia; em memória ficam apenas a página
+corrente e a tabela de deslocamentos dos objetos. O Excel usa o modo
+``write_only`` do openpyxl, que despeja as linhas de cada aba num arquivo
+temporário em vez de montar as células na memória. O arquivo final é servido
+pelo caminho, sem passar por um ``BytesIO``.
+"""
+
+import tempfile
+import time
+import zlib
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+from centesimais.replicatas import desempacotar, formatar
+
+TAMANHO_LOTE = 2000  # linhas por fetchmany
+PASTA_TEMPORARIA = Path(tempfile.gettempdir()) / "centesimais_relatorios"
+VALIDADE_TEMPORARIOS = 3600  # segundos até um relatório gerado ser apagado
+
+SQL_RELATORIO = """
+    SELECT nome_amostra, parametro, valor1, valor2, valor3, n_replicatas, replicatas, media, desvio_padrao, coef_var, data
+    FROM analises {filtro}
+    ORDER BY {ordem}
+"""
+ORDEM_AMOSTRA = "nome_amostra, parametro, data"
+ORDEM_PARAMETRO = "parametro, nome_amostra, data"  # uma aba por parâmetro numa só passada
+
+
+def arquivo_temporario(sufixo: str) -> Path:
+    """Novo caminho em PASTA_TEMPORARIA, removendo relatórios antigos."""
+    PASTA_TEMPORARIA.mkdir(parents=True, exist_ok=True)
+    limite = time.time() - VALIDADE_TEMPORARIOS
+    for antigo in PASTA_TEMPORARIA.iterdir():
+        try:
+            if antigo.stat().st_mtime < limite:
+                antigo.unlink()
+        except OSError:
+            pass
+    with tempfile.NamedTemporaryFile(dir=PASTA_TEMPORARIA, suffix=sufixo, delete=False) as arquivo:
+        return Path(arquivo.name)
+
+
+def sql_relatorio(usuario_id=None, parametro=None, ordem: str = ORDEM_AMOSTRA) -> tuple:
+    """Consulta do relatório com filtros opcionais, por padrão ordenada por amostra e parâmetro."""
+    condicoes, params = [], []
+    if usuario_id is not None:
+        condicoes.append("usuario_id = ?")
+        params.append(usuario_id)
+    if parametro is not None:
+        condicoes.append("parametro = ?")
+        params.append(parametro)
+    filtro = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+    return SQL_RELATORIO.format(filtro=filtro, ordem=ordem), tuple(params)
+
+
+# ---------------------- ESCRITOR PDF EM FLUXO ----------------------
+def _classe_largura(caractere: str) -> int:
+    if caractere.isdigit():
+        return 556
+    if caractere in " .,:;|!'ijlIt":
+        return 278
+    if caractere in "()-rf":
+        return 333
+    if caractere in "mwMW":
+        return 833
+    return 667 if caractere.isupper() else 556
+
+
+_LARGURAS = {chr(codigo): _classe_largura(chr(codigo)) for codigo in range(32, 256)}
+
+
+@lru_cache(maxsize=8192)
+def _largura_texto(texto: str, tamanho: float) -> float:
+    """Largura aproximada em Helvetica (métricas AFM das classes de caracteres mais comuns)."""
+    return sum(_LARGURAS.get(caractere, 556) for caractere in texto) * tamanho / 1000
+
+
+def _texto_pdf(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+class EscritorPDF:
+    """PDF mínimo (Helvetica, WinAnsi) escrito página a página num arquivo binário."""
+
+    LARGURA = 595.28  # A4 em pontos
+    ALTURA = 841.89
+
+    def __init__(self, arquivo):
+        self._arquivo = arquivo
+        self._posicao = 0
+        self._deslocamentos = [0, 0, 0]  # 0 livre; 1 catálogo e 2 árvore de páginas vão no final
+        self._paginas = []
+        self._operacoes = None
+        self._escrever(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._fonte = self._objeto(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        self._fonte_negrito = self._objeto(
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>"
+        )
+
+    def _escrever(self, dados: bytes):
+        self._arquivo.write(dados)
+        self._posicao += len(dados)
+
+    def _objeto(self, corpo: bytes, numero: int | None = None) -> int:
+        if numero is None:
+            numero = len(self._deslocamentos)
+            self._deslocamentos.append(0)
+        self._deslocamentos[numero] = self._posicao
+        self._escrever(b"%d 0 obj\n" % numero + corpo + b"\nendobj\n")
+        return numero
+
+    def _descarregar_pagina(self):
+        if self._operacoes is None:
+            return
+        conteudo = zlib.compress("\n".join(self._operacoes).encode("cp1252", errors="replace"))
+        fluxo = self._objeto(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(conteudo) + conteudo + b"\nendstream")
+        recursos = b"<< /Font << /F1 %d 0 R /F2 %d 0 R >> >>" % (self._fonte, self._fonte_negrito)
+        pagina = self._objeto(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] /Resources %s /Contents %d 0 R >>"
+            % (self.LARGURA, self.ALTURA, recursos, fluxo)
+        )
+        self._paginas.append(pagina)
+        self._operacoes = None
+
+    def nova_pagina(self):
+        self._descarregar_pagina()
+        self._operacoes = []
+
+    @property
+    def numero_paginas(self) -> int:
+        return len(self._paginas) + (self._operacoes is not None)
+
+    def texto(self, x: float, y: float, texto: str, tamanho: float = 8, negrito: bool = False,
+              largura: float | None = None, alinhamento: str = "esquerda"):
+        """Escreve ``texto``; com ``largura``, corta com reticências e permite alinhar à direita/centro."""
+        if largura is not None:
+            while texto and _largura_texto(texto, tamanho) > largura:
+                texto = texto[:-2] + "…"
+            sobra = largura - _largura_texto(texto, tamanho)
+            x += {"direita": sobra, "centro": sobra / 2}.get(alinhamento, 0)
+        fonte = "/F2" if negrito else "/F1"
+        self._operacoes.append(f"BT {fonte} {tamanho} Tf {x:.2f} {y:.2f} Td ({_texto_pdf(texto)}) Tj ET")
+
+    def retangulo(self, x: float, y: float, largura: float, altura: float, cinza: float = 0.9):
+        self._operacoes.append(f"{cinza} g {x:.2f} {y:.2f} {largura:.2f} {altura:.2f} re f 0 g")
+
+    def linha(self, x1: float, y1: float, x2: float, y2: float, cinza: float = 0.75):
+        self._operacoes.append(f"{cinza} G 0.5 w {x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S 0 G")
+
+    def fechar(self):
+        self._descarregar_pagina()
+        filhos = " ".join(f"{pagina} 0 R" for pagina in self._paginas).encode()
+        self._objeto(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (filhos, len(self._paginas)), numero=2)
+        self._objeto(b"<< /Type /Catalog /Pages 2 0 R >>", numero=1)
+        inicio_xref = self._posicao
+        linhas = [b"xref\n0 %d\n" % len(self._deslocamentos), b"0000000000 65535 f \n"]
+        linhas += [b"%010d 00000 n \n" % deslocamento for deslocamento in self._deslocamentos[1:]]
+        self._escrever(b"".join(linhas))
+        self._escrever(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                       % (len(self._deslocamentos), inicio_xref))
+
+
+# ---------------------- RELATÓRIO DE ANÁLISES (PDF) ----------------------
+# (cabeçalho, largura em pt, alinhamento)
+COLUNAS_PDF = (
+    ("Parâmetro", 120, "esquerda"),
+    ("Replicatas", 135, "esquerda"),
+    ("n", 20, "direita"),
+    ("Média", 50, "direita"),
+    ("DP", 45, "direita"),
+    ("CV (%)", 45, "direita"),
+    ("Data", 90, "direita"),
+)
+MARGEM = 40
+ALTURA_LINHA = 14
+
+
+def _numero(valor) -> str:
+    return "—" if valor is None else f"{valor:.2f}"
+
+
+def _linhas_replicatas(linha: dict, largura: float, tamanho: float = 8) -> list:
+    """Todas as replicatas da análise, quebradas em quantas linhas couberem em ``largura``."""
+    valores = desempacotar(linha["replicatas"]) or [
+        linha[coluna] for coluna in ("valor1", "valor2", "valor3") if linha[coluna] is not None
+    ]
+    linhas = [""]
+    for valor in map(_numero, valores):
+        continuacao = f"{linhas[-1]}; {valor}" if linhas[-1] else valor
+        if linhas[-1] and _largura_texto(continuacao, tamanho) > largura:
+            linhas.append(valor)
+        else:
+            linhas[-1] = continuacao
+    return linhas
+
+
+class _TabelaPDF:
+    """Distribui as linhas em páginas, repetindo cabeçalho e agrupando por amostra/parâmetro."""
+
+    def __init__(self, escritor: EscritorPDF, titulo: str):
+        self.escritor = escritor
+        self.titulo = titulo
+        self.y = 0.0
+        self.amostra = None
+        self.parametro = None
+
+    def _pagina(self):
+        pdf = self.escritor
+        pdf.nova_pagina()
+        topo = pdf.ALTURA - MARGEM
+        if pdf.numero_paginas == 1:
+            pdf.texto(MARGEM, topo - 10, self.titulo, tamanho=14, negrito=True)
+            pdf.texto(MARGEM, topo - 26, f"Gerado em {datetime.now():%d/%m/%Y %H:%M}", tamanho=8)
+            topo -= 40
+        pdf.texto(MARGEM, MARGEM / 2, f"{self.titulo} — página {pdf.numero_paginas}", tamanho=7,
+                  largura=pdf.LARGURA - 2 * MARGEM, alinhamento="centro")
+        pdf.retangulo(MARGEM, topo - ALTURA_LINHA, pdf.LARGURA - 2 * MARGEM, ALTURA_LINHA, cinza=0.8)
+        x = MARGEM
+        for cabecalho, largura, alinhamento in COLUNAS_PDF:
+            pdf.texto(x + 2, topo - 10, cabecalho, negrito=True, largura=largura - 4, alinhamento=alinhamento)
+            x += largura
+        self.y = topo - ALTURA_LINHA
+        self.parametro = None  # repete o parâmetro no topo de cada página
+
+    def _reservar(self, linhas: int):
+        if self.escritor.numero_paginas == 0 or self.y - linhas * ALTURA_LINHA < MARGEM:
+            self._pagina()
+
+    def adicionar(self, linha: dict):
+        pdf = self.escritor
+        replicatas = _linhas_replicatas(linha, COLUNAS_PDF[1][1] - 4)
+        if linha["nome_amostra"] != self.amostra:
+            self._reservar(1 + len(replicatas))  # não deixa o título da amostra sozinho no pé da página
+            self.amostra, self.parametro = linha["nome_amostra"], None
+            self.y -= ALTURA_LINHA
+            pdf.retangulo(MARGEM, self.y, pdf.LARGURA - 2 * MARGEM, ALTURA_LINHA, cinza=0.93)
+            pdf.texto(MARGEM + 2, self.y + 4, f"Amostra: {self.amostra}", negrito=True,
+                      largura=pdf.LARGURA - 2 * MARGEM - 4)
+        else:
+            self._reservar(len(replicatas))
+
+        self.y -= ALTURA_LINHA
+        celulas = [
+            linha["parametro"] if linha["parametro"] != self.parametro else "",
+            replicatas[0],
+            linha["n_replicatas"] or "",
+            _numero(linha["media"]), _numero(linha["desvio_padrao"]), _numero(linha["coef_var"]),
+            linha["data"] or "",
+        ]
+        self.parametro = linha["parametro"]
+        x = MARGEM
+        for texto, (_, largura, alinhamento) in zip(celulas, COLUNAS_PDF):
+            pdf.texto(x + 2, self.y + 4, str(texto), largura=largura - 4, alinhamento=alinhamento)
+            x += largura
+        for continuacao in replicatas[1:]:  # séries longas continuam abaixo, na mesma coluna
+            self.y -= ALTURA_LINHA
+            pdf.texto(MARGEM + COLUNAS_PDF[0][1] + 2, self.y + 4, continuacao, largura=COLUNAS_PDF[1][1] - 4)
+        pdf.linha(MARGEM, self.y, pdf.LARGURA - MARGEM, self.y)
+
+
+def escrever_pdf(cursor, destino, titulo: str = "Relatório de Análises", tamanho_lote: int = TAMANHO_LOTE) -> int:
+    """Consome ``cursor`` em blocos e grava o relatório em ``destino``; retorna o nº de linhas."""
+    colunas = [descricao[0] for descricao in cursor.description]
+    total = 0
+    with open(destino, "wb") as arquivo:
+        escritor = EscritorPDF(arquivo)
+        tabela = _TabelaPDF(escritor, titulo)
+        while True:
+            bloco = cursor.fetchmany(tamanho_lote)
+            if not bloco:
+                break
+            for registro in bloco:
+                tabela.adicionar(dict(zip(colunas, registro)))
+            total += len(bloco)
+        if total == 0:
+            tabela._pagina()
+            escritor.texto(MARGEM, tabela.y - 20, "Nenhuma análise encontrada.")
+        escritor.fechar()
+    return total
+
+
+def exportar_pdf(banco, usuario_id=None, parametro=None, titulo: str = "Relatório de Análises") -> Path:
+    """Gera o PDF das análises filtradas num arquivo temporário e devolve o caminho."""
+    sql, params = sql_relatorio(usuario_id, parametro)
+    destino = arquivo_temporario(".pdf")
+    with banco.leitura() as conn:
+        escrever_pdf(conn.execute(sql, params), destino, titulo)
+    return destino
+
+
+# ---------------------- RELATÓRIO DE ANÁLISES (EXCEL) ----------------------
+# (cabeçalho, coluna da consulta, largura em caracteres)
+COLUNAS_EXCEL = (
+    ("Amostra", "nome_amostra", 30),
+    ("Parâmetro", "parametro", 18),
+    ("R1", "valor1", 10),
+    ("R2", "valor2", 10),
+    ("R3", "valor3", 10),
+    ("n", "n_replicatas", 5),
+    ("Replicatas", "replicatas", 36),
+    ("Média", "media", 10),
+    ("Desvio Padrão", "desvio_padrao", 14),
+    ("CV (%)", "coef_var", 10),
+    ("Data", "data", 20),
+)
+# Colunas que não vão para a planilha como vieram do banco
+CONVERSOES_EXCEL = {"replicatas": formatar}
+LINHAS_POR_ABA = 1_048_575  # limite do Excel, sem contar o cabeçalho
+_CARACTERES_INVALIDOS_ABA = str.maketrans({caractere: "_" for caractere in "[]:*?/\\"})
+
+
+def _nome_aba(parametro, usados: set) -> str:
+    """Nome de aba válido (até 31 caracteres, sem []:*?/\\) e único no arquivo."""
+    base = (str(parametro or "Sem parâmetro").translate(_CARACTERES_INVALIDOS_ABA).strip("'") or "Análises")[:31]
+    nome, sufixo = base, 2
+    while nome.lower() in usados:
+        nome = f"{base[:31 - len(str(sufixo)) - 3]} ({sufixo})"
+        sufixo += 1
+    usados.add(nome.lower())
+    return nome
+
+
+def escrever_excel(cursor, destino, tamanho_lote: int = TAMANHO_LOTE) -> int:
+    """Grava as linhas de ``cursor`` (ordenado por parâmetro) com uma aba por parâmetro.
+
+    Retorna o nº de linhas. A pasta de trabalho é ``write_only``: cada aba é
+    escrita sequencialmente e não pode ser revisitada, daí a ordenação.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    colunas = [descricao[0] for descricao in cursor.description]
+    indices = [colunas.index(coluna) for _, coluna, _ in COLUNAS_EXCEL]
+    conversoes = [(posicao, CONVERSOES_EXCEL[coluna]) for posicao, (_, coluna, _) in enumerate(COLUNAS_EXCEL)
+                  if coluna in CONVERSOES_EXCEL]
+    indice_parametro = colunas.index("parametro")
+
+    livro = Workbook(write_only=True)
+    usados = set()
+    aba, parametro_atual, linhas_aba, total = None, object(), 0, 0
+
+    def abrir_aba(parametro):
+        nova = livro.create_sheet(_nome_aba(parametro, usados))
+        for posicao, (_, _, largura) in enumerate(COLUNAS_EXCEL):
+            nova.column_dimensions[chr(ord("A") + posicao)].width = largura
+        nova.freeze_panes = "A2"
+        cabecalho = []
+        for titulo, _, _ in COLUNAS_EXCEL:
+            celula = WriteOnlyCell(nova, value=titulo)
+            celula.font = Font(bold=True)
+            cabecalho.append(celula)
+        nova.append(cabecalho)
+        return nova
+
+    while True:
+        bloco = cursor.fetchmany(tamanho_lote)
+        if not bloco:
+            break
+        for registro in bloco:
+            parametro = registro[indice_parametro]
+            if parametro != parametro_atual or linhas_aba >= LINHAS_POR_ABA:
+                aba, parametro_atual, linhas_aba = abrir_aba(parametro), parametro, 0
+            valores = [registro[indice] for indice in indices]
+            for posicao, converter in conversoes:
+                valores[posicao] = converter(valores[posicao])
+            aba.append(valores)
+            linhas_aba += 1
+        total += len(bloco)
+
+    if aba is None:
+        abrir_aba("Análises").append(["Nenhuma análise encontrada."])
+    livro.save(destino)
+    return total
+
+
+def exportar_excel(banco, usuario_id=None, parametro=None) -> Path:
+    """Gera o Excel das análises filtradas num arquivo temporário e devolve o caminho."""
+    sql, params = sql_relatorio(usuario_id, parametro, ordem=ORDEM_PARAMETRO)
+    destino = arquivo_temporario(".xlsx")
+    with banco.leitura() as conn:
+        escrever_excel(conn.execute(sql, params), destino)
+    return destino
@@ -0,0 +1,54 @@
+"""Replicatas em número variável, guardadas como float64 empacotados.
+
+``analises.replicatas`` é um BLOB com os valores em ordem, 8 bytes cada
+(IEEE 754, little-endian), e ``analises.n_replicatas`` é a contagem. Duplicatas
+e séries de 5–10 replicatas cabem na mesma coluna, e a leitura vira um
+``np.frombuffer`` sem cópia. ``valor1``..``valor3`` continuam preenchidos com
+as três primeiras, para telas e relatórios antigos.
+
+Este módulo não importa NumPy no carregamento: as migrações o usam na tela
+de login.
+"""
+
+import struct
+
+REPLICATAS_MINIMAS = 2
+REPLICATAS_MAXIMAS = 10
+REPLICATAS_PADRAO = 3
+COLUNAS_LEGADO = 3  # valor1, valor2, valor3
+
+
+def empacotar(valores) -> bytes:
+    """BLOB com os valores não nulos, na ordem."""
+    valores = [float(v) for v in valores if v is not None]
+    return struct.pack(f"<{len(valores)}d", *valores)
+
+
+def desempacotar(blob) -> tuple:
+    """Valores de um BLOB de ``empacotar`` (tupla vazia para ``None``)."""
+    if not blob:
+        return ()
+    return struct.unpack(f"<{len(blob) // 8}d", blob)
+
+
+def colunas_legado(valores) -> tuple:
+    """(valor1, valor2, valor3): as três primeiras replicatas, ``None`` nas que faltam."""
+    valores = list(valores)[:COLUNAS_LEGADO]
+    return (*valores, *[None] * (COLUNAS_LEGADO - len(valores)))
+
+
+def matriz(blobs):
+    """(valores, n): array ``(len(blobs), maior n)`` completado com NaN e a contagem de cada linha."""
+    import numpy as np
+
+    n = np.array([len(blob) // 8 if blob else 0 for blob in blobs], dtype=np.int64)
+    valores = np.full((len(blobs), int(n.max(initial=0))), np.nan)
+    for linha, blob in enumerate(blobs):
+        if blob:
+            valores[linha, :n[linha]] = np.frombuffer(blob, dtype="<f8")
+    return valores, n
+
+
+def formatar(blob, casas: int = 2, separador: str = "; ") -> str:
+    """Texto das replicatas para tabelas e relatórios."""
+    return separador.join(f"{valor:.{casas}f}" for valor in desempacotar(blob))